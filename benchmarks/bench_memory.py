@@ -0,0 +1,119 @@
+"""
+bench_memory.py – Per-port memory cost of SonarTrace's result types.
+
+Compares three representations of the same synthetic port list:
+- legacy:   the original un-slotted PortInfo dataclass with per-port string copies
+- slotted:  the current PortInfo (__slots__ + interned repeated strings)
+- columnar: PortTable (typed arrays + 16-bit string codes)
+
+Usage (from the repository root):
+    python -m benchmarks.bench_memory [--ports 200000]
+"""
+
+import argparse
+import gc
+import random
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from src.result_objects import HostResult, PortInfo, PortTable
+
+
+@dataclass
+class LegacyPortInfo:
+    """Copy of PortInfo before __slots__/interning, for comparison."""
+    port: int
+    protocol: str
+    state: str
+    reason: Optional[str] = None
+    service: Optional[str] = None
+    product: Optional[str] = None
+    version: Optional[str] = None
+
+
+SERVICES = [
+    ("ssh", "OpenSSH", "8.9p1"),
+    ("http", "nginx", "1.24.0"),
+    ("https", "Apache httpd", "2.4.57"),
+    ("microsoft-ds", None, None),
+    ("msrpc", "Microsoft Windows RPC", None),
+    ("rdp", None, None),
+]
+
+
+def _fresh(value: Optional[str]) -> Optional[str]:
+    # The XML parser hands out a new string object per attribute; mimic that.
+    return None if value is None else "".join(list(value))
+
+
+def _port_fields(count: int, seed: int = 7) -> List[tuple]:
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        service, product, version = rng.choice(SERVICES)
+        rows.append((rng.randint(1, 65535), service, product, version))
+    return rows
+
+
+def _measure(build: Callable[[], object], count: int) -> float:
+    """Bytes allocated per port by ``build`` (result kept alive while measuring)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return (after - before) / count
+
+
+def run(count: int) -> dict:
+    rows = _port_fields(count)
+
+    def legacy():
+        return [
+            LegacyPortInfo(port, _fresh("tcp"), _fresh("open"), _fresh("syn-ack"),
+                           _fresh(service), _fresh(product), _fresh(version))
+            for port, service, product, version in rows
+        ]
+
+    def slotted():
+        return [
+            PortInfo(port, _fresh("tcp"), _fresh("open"), _fresh("syn-ack"),
+                     _fresh(service), _fresh(product), _fresh(version))
+            for port, service, product, version in rows
+        ]
+
+    def columnar():
+        host = HostResult(ip="10.0.0.1", hostname="", status="up")
+        host.ports = [
+            PortInfo(port, "tcp", "open", "syn-ack", service, product, version)
+            for port, service, product, version in rows
+        ]
+        table = PortTable.from_hosts([host])
+        host.ports = []
+        return table
+
+    return {
+        "ports": count,
+        "legacy_bytes_per_port": round(_measure(legacy, count), 1),
+        "slotted_bytes_per_port": round(_measure(slotted, count), 1),
+        "columnar_bytes_per_port": round(_measure(columnar, count), 1),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--ports", type=int, default=200_000, help="Number of synthetic ports.")
+    args = p.parse_args()
+
+    result = run(args.ports)
+    print(f"Ports measured:          {result['ports']}")
+    print(f"Legacy dataclass:        {result['legacy_bytes_per_port']:>8} bytes/port")
+    print(f"Slotted + interned:      {result['slotted_bytes_per_port']:>8} bytes/port")
+    print(f"Columnar PortTable:      {result['columnar_bytes_per_port']:>8} bytes/port")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+fake_nmap.py – Offline stand-in for the nmap binary.
+
+Accepts the arguments NmapHandler.build_command produces and prints
+deterministic synthetic XML (see synthetic.py) for the requested targets,
+so the whole pipeline can be run and load-tested without a network:
+
+    python -m src 10.0.0.0/16 --shard-prefix 24 --workers 8 \\
+        --nmap-binary "python -m benchmarks.fake_nmap --fake-rate 500"
+
+Behaviour is tuned with --fake-* options (placed before the nmap
+arguments) or the matching FAKE_NMAP_* environment variables:
+
+    --fake-latency SEC     delay before any output        (FAKE_NMAP_LATENCY, 0)
+    --fake-jitter SEC      extra random delay, 0..SEC     (FAKE_NMAP_JITTER, 0)
+    --fake-rate N          hosts emitted per second, 0=max (FAKE_NMAP_RATE, 0)
+    --fake-up-ratio R      fraction of addresses that are up (FAKE_NMAP_UP_RATIO, 0.3)
+    --fake-fail-rate R     chance of failing with no output (FAKE_NMAP_FAIL_RATE, 0)
+    --fake-partial-rate R  chance of dying mid-document    (FAKE_NMAP_PARTIAL_RATE, 0)
+    --fake-seed N          seed; same seed + targets = same output (FAKE_NMAP_SEED, 1)
+    --fake-capacity PPS    simulated network capacity, 0=unlimited (FAKE_NMAP_CAPACITY, 0);
+                           scans with a higher (or no) --max-rate report inflated
+                           round-trip times (<times srtt>) for their hosts and,
+                           with --host-timeout, some hosts as timedout="true"
+
+With --stats-every, <taskprogress> elements are written into the XML at
+that interval, where nmap puts them under -oX -.
+
+Random decisions are seeded from the seed and the target list, so a given
+shard always behaves the same way. Each host is seeded from its address,
+and -sn, -p, -sV and -O shape the output like they would with nmap, so
+a host looks the same in every scan that covers it.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from typing import List, Set, Tuple
+
+from src.targets import TargetSet
+
+from .synthetic import host_xml, xml_footer, xml_header
+
+# nmap options that consume the following argument
+VALUE_OPTIONS = {
+    "-oX", "-oN", "-oG", "-oA", "-p", "-iL", "--exclude", "--excludefile",
+    "--min-rate", "--max-rate", "--host-timeout", "--stats-every", "--max-retries",
+    "--min-hostgroup", "--max-hostgroup", "--scan-delay", "--max-scan-delay",
+    "--script", "--script-args", "-e", "-S", "--top-ports", "--dns-servers",
+}
+
+# Reported host names, dropped under -n
+_PTR_RE = re.compile(r"<hostnames>.*?</hostnames>")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _fake_options(argv: List[str]) -> Tuple[argparse.Namespace, List[str]]:
+    p = argparse.ArgumentParser(add_help=False)
+    p.add_argument("--fake-latency", type=float, default=_env_float("FAKE_NMAP_LATENCY", 0.0))
+    p.add_argument("--fake-jitter", type=float, default=_env_float("FAKE_NMAP_JITTER", 0.0))
+    p.add_argument("--fake-rate", type=float, default=_env_float("FAKE_NMAP_RATE", 0.0))
+    p.add_argument("--fake-up-ratio", type=float, default=_env_float("FAKE_NMAP_UP_RATIO", 0.3))
+    p.add_argument("--fake-fail-rate", type=float, default=_env_float("FAKE_NMAP_FAIL_RATE", 0.0))
+    p.add_argument("--fake-partial-rate", type=float,
+                   default=_env_float("FAKE_NMAP_PARTIAL_RATE", 0.0))
+    p.add_argument("--fake-seed", type=int, default=int(_env_float("FAKE_NMAP_SEED", 1)))
+    p.add_argument("--fake-capacity", type=float, default=_env_float("FAKE_NMAP_CAPACITY", 0.0))
+    return p.parse_known_args(argv)
+
+
+def parse_nmap_args(argv: List[str]) -> Tuple[List[str], List[str], List[str]]:
+    """Splits nmap argv into (targets, excludes, flags)."""
+    targets: List[str] = []
+    excludes: List[str] = []
+    flags: List[str] = []
+
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in VALUE_OPTIONS:
+            value = argv[i + 1] if i + 1 < len(argv) else ""
+            if arg == "--exclude":
+                excludes.extend(v for v in value.split(",") if v)
+            elif arg == "--excludefile":
+                with open(value, "r", encoding="utf-8") as f:
+                    excludes.extend(line.strip() for line in f if line.strip())
+            elif arg == "-iL":
+                with open(value, "r", encoding="utf-8") as f:
+                    targets.extend(line.strip() for line in f if line.strip())
+            flags.extend([arg, value])
+            i += 2
+            continue
+        if arg.startswith("-"):
+            flags.append(arg)
+        else:
+            targets.append(arg)
+        i += 1
+
+    return targets, excludes, flags
+
+
+def parse_port_list(spec: str) -> Set[int]:
+    """TCP ports selected by an nmap -p spec such as "22,80,1000-2000,T:443,U:53"."""
+    ports: Set[int] = set()
+    proto = "T"
+    for item in spec.split(","):
+        if ":" in item:
+            proto, item = item.split(":", 1)
+        if proto.upper() != "T" or not item:
+            continue
+        low, _, high = item.partition("-")
+        ports.update(range(int(low or 1), int(high or low or 65535) + 1))
+    return ports
+
+
+def parse_interval(value: str) -> float:
+    """nmap time spec ("10", "10s", "500ms", "2m", "1h") in seconds."""
+    for suffix, scale in (("ms", 0.001), ("s", 1), ("m", 60), ("h", 3600)):
+        if value.endswith(suffix):
+            return float(value[: -len(suffix)]) * scale
+    return float(value)
+
+
+def _write_progress(out, started: float, done: int, total: int) -> None:
+    elapsed = time.monotonic() - started
+    percent = done / total * 100
+    remaining = elapsed * (total - done) / done if done else 0
+    now = int(time.time())
+    out.write(
+        f'<taskprogress task="SYN Stealth Scan" time="{now}" percent="{percent:.2f}" '
+        f'remaining="{remaining:.0f}" etc="{now + int(remaining)}"/>\n'
+    )
+
+
+def run(argv: List[str]) -> int:
+    opts, nmap_argv = _fake_options(argv)
+    targets, excludes, flags = parse_nmap_args(nmap_argv)
+    if not targets:
+        sys.stderr.write("WARNING: No targets were specified, so 0 hosts scanned.\n")
+        return 1
+
+    try:
+        # IPv6 excludes cannot match the IPv4 addresses the fake scans
+        v4_excludes = [e for item in excludes for e in item.split(",") if ":" not in e]
+        scan_set = TargetSet.from_items(targets) - TargetSet.from_items(v4_excludes)
+    except ValueError as e:
+        sys.stderr.write(f"Failed to resolve given hostname/IP: {e}\n")
+        return 1
+
+    # What nmap would report given the scan flags
+    detail = {
+        "port_scan": "-sn" not in flags,
+        "version_detect": "-sV" in flags or "-A" in flags,
+        "os_detect": "-O" in flags or "-A" in flags,
+        "only_ports": parse_port_list(flags[flags.index("-p") + 1]) if "-p" in flags else None,
+    }
+
+    max_rate = float(flags[flags.index("--max-rate") + 1]) if "--max-rate" in flags else None
+    # Share of probes dropped because the scan is faster than the network allows
+    overload = 0.0
+    if opts.fake_capacity > 0:
+        overload = 1.0 if max_rate is None else max(0.0, 1 - opts.fake_capacity / max_rate)
+
+    stats_every = parse_interval(flags[flags.index("--stats-every") + 1]) if "--stats-every" in flags else 0
+    started = last_stats = time.monotonic()
+
+    rng = random.Random(f"{opts.fake_seed}|{' '.join(targets)}")
+    time.sleep(opts.fake_latency + rng.uniform(0, opts.fake_jitter))
+
+    if rng.random() < opts.fake_fail_rate:
+        sys.stderr.write("fake_nmap: simulated failure\n")
+        return 1
+
+    # Where a partial run dies, as a fraction of the address space
+    cut_at = rng.random() if rng.random() < opts.fake_partial_rate else None
+    address_count = max(1, scan_set.address_count())
+    interval = 1.0 / opts.fake_rate if opts.fake_rate > 0 else 0.0
+
+    out = sys.stdout
+    out.write(xml_header("nmap " + " ".join(nmap_argv)))
+    out.flush()
+
+    up = total = 0
+    for ip in scan_set:
+        if cut_at is not None and total / address_count >= cut_at:
+            # Die mid-element, like a killed nmap would
+            out.write(
+                f'<host><status state="up" reason="syn-ack"/>'
+                f'<address addr="{ip}" addrtype="ipv4"/><ports><port protocol="tcp"'
+            )
+            out.flush()
+            sys.stderr.write("fake_nmap: simulated crash\n")
+            return 2
+
+        if stats_every and time.monotonic() - last_stats >= stats_every:
+            last_stats = time.monotonic()
+            _write_progress(out, started, total, address_count)
+
+        total += 1
+        host_rng = random.Random(f"{opts.fake_seed}|{ip}")
+        if host_rng.random() >= opts.fake_up_ratio:
+            continue
+
+        up += 1
+        if overload and "--host-timeout" in flags and rng.random() < overload / 5:
+            # Retransmissions pile up until nmap gives up on the host
+            out.write(
+                f'<host starttime="1700000000" endtime="1700000900" timedout="true">'
+                f'<status state="up" reason="echo-reply"/><address addr="{ip}" addrtype="ipv4"/>'
+                f"<hostnames/></host>\n"
+            )
+            continue
+        xml = host_xml(host_rng, ip, down_ratio=0.0, **detail)
+        # Round-trip times in microseconds. On an overloaded path a queue
+        # builds up over the first part of the run, delaying later probes
+        queued = overload * min(1.0, total / max(1, address_count / 8))
+        srtt = int(host_rng.uniform(800, 3000) * (1 + 20 * queued))
+        xml = xml.replace(
+            "</host>", f'<times srtt="{srtt}" rttvar="{srtt // 4}" to="{max(100000, srtt * 2)}"/></host>'
+        )
+        if "-n" in flags:
+            # No reverse DNS: nmap reports no PTR names
+            xml = _PTR_RE.sub("<hostnames/>", xml)
+        out.write(xml)
+        out.flush()
+        if interval:
+            time.sleep(interval)
+
+    out.write(xml_footer(up, total))
+    out.flush()
+    return 0
+
+
+def main() -> None:
+    sys.exit(run(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    main()
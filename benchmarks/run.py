@@ -0,0 +1,186 @@
+"""
+run.py – Performance benchmark suite for SonarTrace's hot paths.
+
+Times and memory-profiles, on synthetic nmap XML:
+- parse:       NmapParser.parse on the full document
+- iter_parse:  NmapParser.iter_parse fed in 64 KiB chunks
+- regex:       NmapParser._extract_via_regex over every host's scripts
+- windows:     WindowsEnumerator.enumerate with network probes stubbed out
+- report:      ReportBuilder.build_text_report
+- index:       building a ResultIndex over the parsed hosts
+- query:       ResultIndex.select for open 445 on Windows hosts
+
+Results are compared against benchmarks/baseline.json; a case that is
+slower (or uses more peak memory) than baseline by more than --tolerance
+is reported as a regression and the exit code is 1.
+
+Usage (from the repository root):
+    python -m benchmarks.run                       # compare with baseline
+    python -m benchmarks.run --hosts 100 1000 100000
+    python -m benchmarks.run --save-baseline       # record a new baseline
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from src.nmap_parser import NmapParser
+from src.report_builder import ReportBuilder
+from src.result_index import ResultIndex
+from src.windows_enum import WindowsEnumerator
+
+from .synthetic import generate_nmap_xml
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+DEFAULT_SIZES = [100, 1000, 10000]
+
+
+class StubbedWindowsEnumerator(WindowsEnumerator):
+    """WindowsEnumerator that never touches the network."""
+
+    def _run_probes(self, pairs):
+        return {
+            pair: ("reachable (no immediate banner)",
+                   "TCP handshake to SMB port succeeded, but no banner within timeout.")
+            for pair in pairs
+        }
+
+
+def _cases(xml: str) -> Dict[str, Tuple[Callable[[], object], Callable[[object], None]]]:
+    """name -> (setup, run). setup builds fresh input outside the timed region."""
+    parser = NmapParser()
+
+    def fresh_hosts():
+        return parser.parse(xml)
+
+    def chunks():
+        return [xml[i:i + 65536] for i in range(0, len(xml), 65536)]
+
+    return {
+        "parse": (lambda: None, lambda _: parser.parse(xml)),
+        "iter_parse": (chunks, lambda c: sum(1 for _ in parser.iter_parse(c))),
+        "regex": (
+            lambda: [h.scripts for h in fresh_hosts()],
+            lambda scripts: [parser._extract_via_regex(s) for s in scripts],
+        ),
+        "windows": (fresh_hosts, lambda hosts: StubbedWindowsEnumerator().enumerate(hosts)),
+        "report": (
+            fresh_hosts,
+            lambda hosts: ReportBuilder().build_text_report(
+                hosts, ["10.0.0.0/8"], [], "nmap -oX - -sS -sV -O 10.0.0.0/8", xml
+            ),
+        ),
+        "index": (fresh_hosts, ResultIndex),
+        "query": (
+            lambda: ResultIndex(fresh_hosts()),
+            lambda index: index.select(port=445, os="windows"),
+        ),
+    }
+
+
+def _time_case(setup, run, repeats: int) -> float:
+    """Best wall time over ``repeats`` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        data = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_case(setup, run) -> int:
+    """Peak traced memory of one run (input excluded), in bytes."""
+    data = setup()
+    gc.collect()
+    tracemalloc.start()
+    run(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def run_suite(sizes: List[int], repeats: int, seed: int) -> Dict[str, Dict[str, dict]]:
+    results: Dict[str, Dict[str, dict]] = {}
+    for size in sizes:
+        xml = generate_nmap_xml(size, seed)
+        results[str(size)] = {}
+        for name, (setup, run) in _cases(xml).items():
+            seconds = _time_case(setup, run, repeats)
+            peak = _peak_case(setup, run)
+            results[str(size)][name] = {
+                "seconds": round(seconds, 6),
+                "peak_bytes": peak,
+                "hosts_per_second": round(size / seconds) if seconds else None,
+            }
+            print(
+                f"{size:>8} hosts  {name:<11} {seconds * 1000:>10.1f} ms"
+                f"  peak {peak / 1024 / 1024:>8.1f} MiB"
+            )
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Returns a description of every case that regressed beyond ``tolerance``."""
+    regressions = []
+    for size, cases in results.items():
+        for name, current in cases.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                if base[metric] and current[metric] > base[metric] * (1 + tolerance):
+                    change = (current[metric] / base[metric] - 1) * 100
+                    regressions.append(
+                        f"{name} @ {size} hosts: {metric} {base[metric]} -> "
+                        f"{current[metric]} (+{change:.0f}%)"
+                    )
+    return regressions
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--hosts", type=int, nargs="+", default=DEFAULT_SIZES,
+                   help="Synthetic scan sizes to benchmark (default: 100 1000 10000).")
+    p.add_argument("--repeats", type=int, default=3, help="Timed runs per case (best is kept).")
+    p.add_argument("--seed", type=int, default=1, help="Seed for the synthetic XML.")
+    p.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON file.")
+    p.add_argument("--save-baseline", action="store_true",
+                   help="Write the results as the new baseline instead of comparing.")
+    p.add_argument("--tolerance", type=float, default=0.25,
+                   help="Allowed slowdown/memory growth before flagging (default: 0.25 = 25%%).")
+    args = p.parse_args()
+
+    results = run_suite(args.hosts, args.repeats, args.seed)
+
+    if args.save_baseline:
+        payload = {
+            "python": sys.version.split()[0],
+            "seed": args.seed,
+            "results": results,
+        }
+        args.baseline.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return
+
+    regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
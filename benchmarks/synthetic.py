@@ -0,0 +1,230 @@
+"""
+synthetic.py – Deterministic generator of realistic-looking nmap XML.
+
+Produces nmaprun documents with anywhere from a handful to millions of
+hosts. Port counts, services, OS matches and hostscripts follow rough
+real-world distributions (mostly Linux/Windows, a few open ports per host,
+SMB scripts on Windows boxes), and the same seed always yields the same XML.
+
+Usage (from the repository root):
+    python -m benchmarks.synthetic --hosts 10000 -o scan.xml
+"""
+
+import argparse
+import ipaddress
+import random
+import sys
+from typing import Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+from xml.sax.saxutils import quoteattr
+
+# (weight, osmatch name, family)
+OS_PROFILES = [
+    (45, "Linux 5.0 - 5.14", "linux"),
+    (30, "Microsoft Windows 10 1607 - 11", "windows"),
+    (10, "Microsoft Windows Server 2016 - 2019", "windows"),
+    (8, "FreeBSD 12.0-RELEASE - 13.0-RELEASE", "bsd"),
+    (7, "Cisco IOS 15.X", "network"),
+]
+
+# family -> [(weight, port, service, product, version)]
+SERVICE_PROFILES = {
+    "linux": [
+        (40, 22, "ssh", "OpenSSH", "8.9p1 Ubuntu 3ubuntu0.6"),
+        (25, 80, "http", "nginx", "1.24.0"),
+        (20, 443, "https", "Apache httpd", "2.4.57"),
+        (8, 3306, "mysql", "MySQL", "8.0.35"),
+        (5, 5432, "postgresql", "PostgreSQL DB", "15.4"),
+        (2, 6379, "redis", "Redis key-value store", "7.2.3"),
+    ],
+    "windows": [
+        (30, 445, "microsoft-ds", None, None),
+        (25, 139, "netbios-ssn", "Microsoft Windows netbios-ssn", None),
+        (25, 135, "msrpc", "Microsoft Windows RPC", None),
+        (15, 3389, "ms-wbt-server", "Microsoft Terminal Services", None),
+        (5, 80, "http", "Microsoft IIS httpd", "10.0"),
+    ],
+    "bsd": [
+        (60, 22, "ssh", "OpenSSH", "9.3"),
+        (40, 80, "http", "lighttpd", "1.4.71"),
+    ],
+    "network": [
+        (50, 23, "telnet", "Cisco router telnetd", None),
+        (30, 22, "ssh", "Cisco SSH", "1.25"),
+        (20, 161, "snmp", None, None),
+    ],
+}
+
+REASONS = {"open": "syn-ack", "closed": "reset", "filtered": "no-response"}
+
+
+def _weighted(rng: random.Random, items: List[tuple]) -> tuple:
+    return rng.choices(items, weights=[i[0] for i in items])[0]
+
+
+def _attr(name: str, value: Optional[str]) -> str:
+    return f" {name}={quoteattr(value)}" if value is not None else ""
+
+
+def host_xml(
+    rng: random.Random,
+    ip: str,
+    down_ratio: float = 0.1,
+    port_scan: bool = True,
+    version_detect: bool = True,
+    os_detect: bool = True,
+    only_ports: Optional[Set[int]] = None,
+) -> str:
+    """
+    One <host> element for ``ip`` with randomised ports, OS and scripts.
+
+    The flags mimic what nmap leaves out without -p/-sV/-O (``port_scan``
+    False is a -sn ping sweep); ``only_ports`` restricts the reported ports
+    like a -p list. The same rng draws are made either way, so a host looks
+    the same across differently-flagged scans.
+    """
+    if rng.random() < down_ratio:
+        return (
+            f'<host><status state="down" reason="no-response"/>'
+            f'<address addr="{ip}" addrtype="ipv4"/><hostnames/></host>\n'
+        )
+
+    _, os_name, family = _weighted(rng, OS_PROFILES)
+    short = ip.replace(".", "-")
+    parts = [
+        '<host starttime="1700000000" endtime="1700000042">',
+        '<status state="up" reason="syn-ack"/>',
+        f'<address addr="{ip}" addrtype="ipv4"/>',
+        f'<hostnames><hostname name="host-{short}.corp.example" type="PTR"/></hostnames>',
+        "<ports>",
+    ]
+
+    # Geometric-ish number of interesting ports (most hosts have 1-4)
+    chosen = {}
+    while not chosen or (len(chosen) < 12 and rng.random() < 0.55):
+        _, port, service, product, version = _weighted(rng, SERVICE_PROFILES[family])
+        chosen[port] = (service, product, version)
+
+    for port in sorted(chosen):
+        service, product, version = chosen[port]
+        state = "open" if rng.random() < 0.85 else rng.choice(("closed", "filtered"))
+        if only_ports is not None and port not in only_ports:
+            continue
+        if not version_detect:
+            product = version = None
+        parts.append(
+            f'<port protocol="tcp" portid="{port}">'
+            f'<state state="{state}" reason="{REASONS[state]}" reason_ttl="64"/>'
+            f'<service name="{service}"{_attr("product", product)}{_attr("version", version)}'
+            f' method="{"probed" if version_detect else "table"}" conf="{10 if version_detect else 3}"/></port>'
+        )
+    parts.append("</ports>")
+
+    if not port_scan:
+        # Ping sweep: status, address and hostnames only
+        del parts[4:]
+
+    if rng.random() < 0.8:
+        accuracy = rng.randint(85, 100)
+        if port_scan and os_detect:
+            parts.append(f'<os><osmatch name="{os_name}" accuracy="{accuracy}" line="1"/></os>')
+
+    if family == "windows":
+        domain = rng.choice(("CORP", "LAB", "FINANCE"))
+        output = (
+            f"OS: {os_name.replace('Microsoft ', '')}&#xa;"
+            f"Computer name: HOST-{short}&#xa;Domain: {domain}.example&#xa;"
+            f"Workgroup: {domain}&#xa;System time: 2025-01-01T00:00:00"
+        )
+        if port_scan:
+            parts.append(
+                f'<hostscript><script id="smb-os-discovery" output="{output}"/>'
+                f'<script id="nbstat" output="NetBIOS name: HOST-{short}, NetBIOS user: '
+                f'&lt;unknown&gt;, NetBIOS MAC: 00:50:56:aa:bb:cc"/></hostscript>'
+            )
+
+    parts.append("</host>\n")
+    return "".join(parts)
+
+
+def _default_ips(count: int, start: str = "10.0.0.0") -> Iterator[str]:
+    base = int(ipaddress.IPv4Address(start))
+    for i in range(count):
+        yield str(ipaddress.IPv4Address(base + i))
+
+
+def iter_nmap_xml(
+    hosts: int = 0,
+    seed: int = 1,
+    ips: Optional[Iterable[str]] = None,
+    args: str = "nmap -oX - -sS -sV -O 10.0.0.0/8",
+    down_ratio: float = 0.1,
+) -> Iterator[str]:
+    """
+    Yields a complete nmaprun document piece by piece (header, one chunk per
+    host, footer), so even million-host documents never sit in memory.
+
+    Either ``hosts`` (addresses counted up from 10.0.0.0) or an explicit
+    iterable of ``ips`` selects the hosts.
+    """
+    rng = random.Random(seed)
+    yield xml_header(args)
+
+    up = total = 0
+    for ip in (ips if ips is not None else _default_ips(hosts)):
+        chunk = host_xml(rng, ip, down_ratio)
+        total += 1
+        up += '<status state="up"' in chunk
+        yield chunk
+
+    yield xml_footer(up, total)
+
+
+def xml_header(args: str) -> str:
+    """Everything before the first <host> element."""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        "<!DOCTYPE nmaprun>\n"
+        f'<nmaprun scanner="nmap" args={quoteattr(args)} start="1700000000" '
+        'version="7.94" xmloutputversion="1.05">\n'
+        '<scaninfo type="syn" protocol="tcp" numservices="1000" services="1-1000"/>\n'
+    )
+
+
+def xml_footer(up: int, total: int) -> str:
+    """Run statistics and the closing </nmaprun>."""
+    return (
+        '<runstats><finished time="1700000100" elapsed="100.00" exit="success"/>'
+        f'<hosts up="{up}" down="{total - up}" total="{total}"/></runstats>\n'
+        "</nmaprun>\n"
+    )
+
+
+def generate_nmap_xml(hosts: int, seed: int = 1, **kwargs) -> str:
+    """Whole document as one string (convenient for small/medium sizes)."""
+    return "".join(iter_nmap_xml(hosts, seed, **kwargs))
+
+
+def write_nmap_xml(fh: TextIO, hosts: int, seed: int = 1, **kwargs) -> Tuple[int, int]:
+    """Streams a document to ``fh``; returns (hosts written, bytes written)."""
+    written = 0
+    for chunk in iter_nmap_xml(hosts, seed, **kwargs):
+        written += fh.write(chunk)
+    return hosts, written
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--hosts", type=int, default=1000, help="Number of hosts to generate.")
+    p.add_argument("--seed", type=int, default=1, help="Random seed (same seed, same XML).")
+    p.add_argument("-o", "--output", help="Output file (default: stdout).")
+    args = p.parse_args()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            write_nmap_xml(f, args.hosts, args.seed)
+    else:
+        write_nmap_xml(sys.stdout, args.hosts, args.seed)
+
+
+if __name__ == "__main__":
+    main()
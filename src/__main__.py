@@ -1,16 +1,37 @@
+import sys
+import time
 from pathlib import Path
 from datetime import datetime
+from contextlib import ExitStack, nullcontext
+from typing import Any, Dict, List, Optional
 
-from .cli import _build_arg_parser
-from .nmap_handler import NmapHandler, NmapExecutionError
-from .enumerator import enumerate_hosts
-from .report_builder import ReportBuilder
+from .cli import (
+    _build_arg_parser,
+    _build_query_arg_parser,
+    _build_raw_arg_parser,
+    _build_serve_arg_parser,
+    _build_worker_arg_parser,
+)
+from .nmap_handler import NmapHandler, NmapExecutionError, is_nmap_time
+from .enumerator import enumerate_hosts, describe_command, iter_hosts
+from .report_builder import ReportBuilder, ReportPipeline, open_raw_sidecar
+from .result_store import ResultStore
+from .progress import ProgressTracker
+from .metrics import RunMetrics, stage
+from .checkpoint import DEFAULT_CHECKPOINT_SHARD_SIZE, RunDirectory
+from .distributed import Coordinator, run_worker
+from .daemon import ScanPolicy, ScanService, serve
+from .fingerprint_cache import FingerprintCache
+from .dns_resolver import DnsCache, DnsResolver, default_cache_path, resolve_handler
+from .xml_archive import XmlArchive
+from .result_index import ResultIndex, load_results
+from .targets import TargetSet
 from .logger_setup import get_logger
 
 logger = get_logger("main")
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """
     Main entry point for the SonarTrace network enumeration and reporting application.
     This function orchestrates the entire workflow of the SonarTrace tool:
@@ -23,50 +44,154 @@ def main():
     The function handles Nmap execution errors and logs all major operations
     for debugging and audit purposes. The output filename defaults to a UTC-timestamped
     format to ensure chronological organization and compliance with reporting standards.
+    Args:
+        argv: Command-line arguments without the program name (default: sys.argv[1:]).
     Raises:
         NmapExecutionError: If the underlying Nmap command fails during host enumeration.
     Returns:
         None: This function serves as the application entry point and does not return
         a value; instead, it performs side effects (file I/O and logging).
     """
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["worker"]:
+        _worker_main(argv[1:])
+        return
+    if argv[:1] == ["serve"]:
+        _serve_main(argv[1:])
+        return
+    if argv[:1] == ["raw"]:
+        _raw_main(argv[1:])
+        return
+    if argv[:1] == ["query"]:
+        _query_main(argv[1:])
+        return
+
     parser = _build_arg_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    checkpoint = None
+    if args.resume:
+        try:
+            checkpoint = RunDirectory.open(args.resume)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot resume from {args.resume}: {e}")
+        # Same options as the interrupted run
+        args = parser.parse_args(checkpoint.argv)
+        args.run_dir = str(checkpoint.path)
+
+    if not args.targets:
+        parser.error("the following arguments are required: targets")
 
     logger.info("Starting SonarTrace scan process...")
 
-    handler = NmapHandler(
-        targets=args.targets,
-        ports=args.ports,
-        rate_limit=args.rate,
-        extra_args=args.nmap_args,
-        excludes=args.exclude,
-    )
+    if args.stats_every is not None and args.stats_every < 1:
+        parser.error("--stats-every must be at least 1 second")
+    if args.shard_prefix is not None and not 0 <= args.shard_prefix <= 32:
+        parser.error("--shard-prefix must be between 0 and 32")
+    if args.shard_size is not None and args.shard_size < 1:
+        parser.error("--shard-size must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    progress = None
+    if args.stats_every or args.status_file:
+        progress = ProgressTracker(interval=args.stats_every or 10, status_path=args.status_file)
+    metrics = RunMetrics() if args.metrics_json or args.metrics_prom else None
 
     try:
-        # Centralized enumeration (via enumerator.py)
-        hosts, raw_xml_output, executed_command = enumerate_hosts(handler)
-    except NmapExecutionError as e:
-        logger.error(f"Nmap failed: {e}")
-        return
+        handler = NmapHandler(
+            targets=args.targets,
+            ports=args.ports,
+            rate_limit=args.rate,
+            extra_args=args.nmap_args,
+            excludes=args.exclude,
+            shard_prefix=args.shard_prefix,
+            shard_size=args.shard_size,
+            workers=args.workers,
+            exclude_files=args.exclude_file,
+            nmap_binary=args.nmap_binary,
+            min_rate=args.min_rate,
+            progress=progress,
+            metrics=metrics,
+            host_timeout=args.host_timeout,
+            scan_timeout=args.scan_timeout,
+        )
+    except (OSError, ValueError) as e:
+        parser.error(f"invalid exclusions: {e}")
 
-    # -----------------------------
-    # Metadata passed into report
-    # -----------------------------
-    metadata = {
-        "targets": ", ".join(args.targets),
-        "excludes": ", ".join(args.exclude) if args.exclude else "(none)",
-        "nmap_command": executed_command,
-        "raw_nmap_output": raw_xml_output,  # REQUIRED for rubric
-    }
+    target_set = handler.target_set()
+    if progress is not None and target_set is not None:
+        progress.total_addresses = (target_set - handler.exclusions).address_count()
 
-    builder = ReportBuilder()
-    text_report = builder.build_text_report(
-        hosts=hosts,
-        targets=args.targets,
-        excludes=args.exclude,
-        nmap_command=executed_command,
-        raw_output=raw_xml_output
-    )
+    # Exclude files are listed by path so the report stays readable
+    excludes = args.exclude + [f"file:{path}" for path in args.exclude_file]
+
+    if any(rate is not None and rate < 1 for rate in (args.rate, args.min_rate)):
+        parser.error("--rate and --min-rate must be at least 1")
+    if args.rate is not None and args.min_rate is not None and args.min_rate > args.rate:
+        parser.error("--min-rate cannot be higher than --rate")
+    if args.host_timeout is not None and not is_nmap_time(args.host_timeout):
+        parser.error("--host-timeout must be an nmap time value such as 900, 90s, 15m or 1h")
+    if args.scan_timeout < 0:
+        parser.error("--scan-timeout cannot be negative")
+    if args.render_workers < 1:
+        parser.error("--render-workers must be at least 1")
+    if args.render_workers > 1 and args.stream_report:
+        parser.error("--render-workers cannot be combined with --stream-report")
+    if args.raw_archive and args.inline_raw:
+        parser.error("--raw-archive cannot be combined with --inline-raw")
+    if args.incremental and not args.store:
+        parser.error("--incremental requires --store")
+    if args.stream_report and (args.store or args.inline_raw or args.staged):
+        parser.error("--stream-report cannot be combined with --store, --inline-raw or --staged")
+    if args.coordinator and (args.stream_report or args.staged):
+        parser.error("--coordinator cannot be combined with --stream-report or --staged")
+    if args.max_attempts < 1 or args.lease_seconds <= 0:
+        parser.error("--max-attempts and --lease-seconds must be positive")
+    if args.run_dir and (args.stream_report or args.staged):
+        parser.error("--run-dir/--resume cannot be combined with --stream-report or --staged")
+    if args.fingerprint_cache and not args.staged:
+        parser.error("--fingerprint-cache requires --staged")
+    if args.fingerprint_ttl <= 0:
+        parser.error("--fingerprint-ttl must be positive")
+    if args.ptr and not args.resolve_dns:
+        parser.error("--ptr requires --resolve-dns")
+    if args.dns_concurrency < 1:
+        parser.error("--dns-concurrency must be at least 1")
+
+    resolver = None
+    if args.resolve_dns:
+        cache_path = None if args.no_dns_cache else (args.dns_cache or default_cache_path())
+        resolver = DnsResolver(
+            servers=args.dns_servers,
+            cache=DnsCache(cache_path),
+            concurrency=args.dns_concurrency,
+            ptr=args.ptr,
+        )
+
+    if args.run_dir and checkpoint is None:
+        try:
+            checkpoint = RunDirectory.create(args.run_dir, argv)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot use run directory: {e}")
+    if checkpoint is not None:
+        logger.info(f"Checkpointing to {checkpoint.path}")
+    if (checkpoint is not None or args.coordinator) and not handler.is_sharded:
+        # Checkpoints and work units are per shard; one shard would not split anything
+        handler.shard_size = DEFAULT_CHECKPOINT_SHARD_SIZE
+
+    coordinator = None
+    if args.coordinator:
+        try:
+            coordinator = Coordinator(
+                args.coordinator,
+                lease_seconds=args.lease_seconds,
+                max_attempts=args.max_attempts,
+                token=args.cluster_token,
+                progress=progress,
+            )
+        except ValueError as e:
+            parser.error(f"--coordinator: {e}")
 
     # ----------------------------------------
     # DEFAULT OUTPUT FILE (UTC, rubric-required)
@@ -77,10 +202,333 @@ def main():
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M_UTC")
         output_path = Path.cwd() / f"host_enumeration_report_{timestamp}.md"
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(text_report)
+    if progress is not None and progress.status_path:
+        logger.info(f"Writing live status to {progress.status_path}")
+
+    # Raw XML goes to a compressed sidecar unless it should be inlined
+    raw_suffix = ".raw.sxa" if args.raw_archive else ".raw.xml.gz"
+    raw_path = None if args.inline_raw else output_path.with_suffix(raw_suffix)
+    raw_ref = raw_path.name if raw_path else None
+
+    builder = ReportBuilder()
+
+    if args.stream_report:
+        with progress or nullcontext(), stage(metrics, "scan_and_report"):
+            _write_streaming_report(builder, handler, args, excludes, output_path, raw_path, resolver)
+        _export_metrics(metrics, args)
+        return
+
+    store = ResultStore(args.store) if args.store else None
+    fingerprints = None
+    if args.fingerprint_cache:
+        fingerprints = FingerprintCache(args.fingerprint_cache, ttl=args.fingerprint_ttl * 3600)
+    max_age = args.fresh_for * 3600 if args.incremental else None
+    sidecar = open_raw_sidecar(raw_path) if raw_path else None
+
+    try:
+        # Centralized enumeration (via enumerator.py)
+        with progress or nullcontext():
+            hosts, raw_xml_output, executed_command = enumerate_hosts(
+                handler,
+                store=store,
+                max_age=max_age,
+                raw_sink=(lambda _shard, text: sidecar.write(text)) if sidecar else None,
+                staged=args.staged,
+                checkpoint=checkpoint,
+                coordinator=coordinator,
+                resolver=resolver,
+                fingerprints=fingerprints,
+            )
+    except NmapExecutionError as e:
+        logger.error(f"Nmap failed: {e}")
+        _export_metrics(metrics, args)
+        return
+    except OSError as e:
+        if coordinator is None:
+            raise
+        logger.error(f"Coordinator failed: {e}")
+        _export_metrics(metrics, args)
+        return
+    finally:
+        if store is not None:
+            store.close()
+        if sidecar is not None:
+            sidecar.close()
+
+    metadata = _report_metadata(args.targets, excludes, executed_command, raw_ref)
+
+    with ExitStack() as stack:
+        stack.enter_context(stage(metrics, "report"))
+        f = stack.enter_context(open(output_path, "w", encoding="utf-8"))
+        writer = builder.open_writer(f)
+        writer.write_header(
+            args.targets, excludes, executed_command,
+            raw_output=raw_xml_output, raw_output_ref=raw_ref,
+        )
+        pipeline = ReportPipeline([writer] + _open_format_writers(builder, args, stack, metadata))
+        pipeline.write_hosts(hosts, render_workers=args.render_workers)
+        pipeline.close()
+
+    logger.info(f"Report written to {output_path}")
+    if raw_path:
+        logger.info(f"Raw Nmap XML written to {raw_path}")
+    _log_format_outputs(args)
+    _export_metrics(metrics, args)
+
+
+def _worker_main(argv: List[str]) -> None:
+    """``python -m src worker --connect HOST:PORT``: scan units for a coordinator."""
+    parser = _build_worker_arg_parser()
+    args = parser.parse_args(argv)
+    try:
+        run_worker(
+            args.connect,
+            nmap_binary=args.nmap_binary,
+            token=args.cluster_token,
+            name=args.name,
+            connect_timeout=args.connect_timeout,
+            allow_nmap_args=args.allow_nmap_args,
+        )
+    except (OSError, ValueError) as e:
+        logger.error(f"Worker stopped: {e}")
+        sys.exit(1)
+
+
+def _serve_main(argv: List[str]) -> None:
+    """``python -m src serve``: run scan jobs submitted over the local API."""
+    parser = _build_serve_arg_parser()
+    args = parser.parse_args(argv)
+    if args.max_concurrent < 1:
+        parser.error("--max-concurrent must be at least 1")
+    try:
+        policy = ScanPolicy.load(args.policy)
+    except (OSError, ValueError, TypeError) as e:
+        parser.error(f"invalid policy: {e}")
+
+    store = ResultStore(args.store) if args.store else None
+    service = ScanService(
+        args.jobs_dir,
+        policy,
+        max_concurrent=args.max_concurrent,
+        nmap_binary=args.nmap_binary,
+        store=store,
+        dns_cache=DnsCache(args.dns_cache or default_cache_path()),
+        fingerprints=FingerprintCache(args.fingerprint_cache),
+    )
+    try:
+        serve(args.listen, service, api_token=args.api_token)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot listen on {args.listen}: {e}")
+    finally:
+        if store is not None:
+            store.close()
+
+
+def _raw_main(argv: List[str]) -> None:
+    """``python -m src raw ARCHIVE [IP...]``: read raw XML back from an archive."""
+    parser = _build_raw_arg_parser()
+    args = parser.parse_args(argv)
+    try:
+        archive = XmlArchive(args.archive)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot open archive: {e}")
+
+    with archive:
+        if args.list:
+            for address in archive.addresses():
+                print(address)
+        elif not args.addresses:
+            for text in archive.iter_text():
+                sys.stdout.write(text)
+        else:
+            missing = False
+            for address in args.addresses:
+                try:
+                    elements = archive.host_xml(address)
+                except ValueError as e:
+                    parser.error(str(e))
+                if not elements:
+                    print(f"{address} is not in {args.archive}", file=sys.stderr)
+                    missing = True
+                for element in elements:
+                    print(element)
+            if missing:
+                sys.exit(1)
+
+
+def _query_main(argv: List[str]) -> None:
+    """``python -m src query SOURCE... [criteria]``: search saved scan results."""
+    parser = _build_query_arg_parser()
+    args = parser.parse_args(argv)
+    try:
+        within = TargetSet.from_string(args.within) if args.within else None
+    except ValueError as e:
+        parser.error(f"invalid --within: {e}")
+
+    by_ip: Dict[str, Any] = {}
+    for source in args.sources:
+        try:
+            hosts = load_results(source)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read {source}: {e}")
+        by_ip.update((h.ip, h) for h in hosts)
+
+    started = time.perf_counter()
+    index = ResultIndex(by_ip.values())
+    criteria = {
+        "port": args.port,
+        "service": args.service,
+        "product": args.product,
+        "version": args.product_version,
+    }
+    matches = index.select(
+        os=args.os, script=args.script, within=within, up_only=args.up, **criteria
+    )
+    # stderr: the logger writes to stdout, which carries the results here
+    print(
+        f"{len(matches)} of {len(index)} host(s) match "
+        f"(indexed and queried in {(time.perf_counter() - started) * 1000:.0f} ms)",
+        file=sys.stderr,
+    )
+
+    if args.count_by:
+        for value, count in index.count_by(args.count_by, matches).most_common():
+            print(f"{count:>8}  {value}")
+        return
+
+    builder = ReportBuilder({"query": vars(args)})
+    if args.format == "json":
+        writer = builder.open_json_writer(sys.stdout)
+        writer.write_header(builder.metadata)
+    elif args.format == "ndjson":
+        writer = builder.open_ndjson_writer(sys.stdout)
+    elif args.format == "csv":
+        writer = builder.open_csv_writer(sys.stdout)
+        writer.write_header(builder.metadata)
+    else:
+        writer = None
+
+    for host in matches:
+        if writer is not None:
+            writer.write_host(host)
+        elif args.format == "ips":
+            print(host.ip)
+        else:
+            ports = index.matching_ports(host, **criteria) if any(criteria.values()) else [
+                p for p in host.ports if p.state == "open"
+            ]
+            described = ", ".join(
+                f"{p.port}/{p.protocol} " + " ".join(v for v in (p.service, p.product, p.version) if v)
+                for p in ports
+            )
+            print(f"{host.ip:<15}  {host.hostname or '-':<30}  {host.os_name or '-':<35}  {described}")
+    if writer is not None:
+        writer.close()
+
+
+def _report_metadata(
+    targets: List[str],
+    excludes: List[str],
+    nmap_command: str,
+    raw_ref: Optional[str],
+) -> Dict[str, Any]:
+    """Scan metadata for machine-readable reports."""
+    return {
+        "targets": targets,
+        "excludes": excludes,
+        "nmap_command": nmap_command,
+        "raw_output": raw_ref,
+    }
+
+
+def _open_format_writers(
+    builder: ReportBuilder,
+    args,
+    stack: ExitStack,
+    metadata: Dict[str, Any],
+) -> List:
+    """Open the JSON / NDJSON / CSV / HTML writers requested on the command line."""
+    writers = []
+    for path, open_writer, newline in (
+        (args.json_output, builder.open_json_writer, None),
+        (args.ndjson_output, builder.open_ndjson_writer, None),
+        (args.csv_output, builder.open_csv_writer, ""),
+        (args.html_output, builder.open_html_writer, None),
+    ):
+        if path:
+            fh = stack.enter_context(open(path, "w", encoding="utf-8", newline=newline))
+            writers.append(open_writer(fh))
+
+    for writer in writers:
+        writer.write_header(metadata)
+    return writers
+
+
+def _log_format_outputs(args) -> None:
+    if args.json_output:
+        logger.info(f"JSON report written to {args.json_output}")
+    if args.ndjson_output:
+        logger.info(f"NDJSON report written to {args.ndjson_output}")
+    if args.csv_output:
+        logger.info(f"CSV port list written to {args.csv_output}")
+    if args.html_output:
+        logger.info(f"HTML summary written to {args.html_output}")
+
+
+def _export_metrics(metrics: Optional[RunMetrics], args) -> None:
+    """Write the run metrics to the files requested on the command line."""
+    if metrics is None:
+        return
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+        logger.info(f"Metrics written to {args.metrics_json}")
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
+        logger.info(f"Prometheus metrics written to {args.metrics_prom}")
+
+
+def _write_streaming_report(
+    builder: ReportBuilder,
+    handler: NmapHandler,
+    args,
+    excludes: List[str],
+    output_path: Path,
+    raw_path: Path,
+    resolver: Optional[DnsResolver] = None,
+) -> None:
+    """Scan and write the reports at the same time, one host at a time."""
+    names: Dict[str, List[str]] = {}
+    if resolver is not None:
+        # Resolve first so the header shows the command that actually runs
+        handler, names = resolve_handler(handler, resolver)
+    nmap_command = describe_command(handler)
+    metadata = _report_metadata(args.targets, excludes, nmap_command, raw_path.name)
+
+    with ExitStack() as stack:
+        f = stack.enter_context(open(output_path, "w", encoding="utf-8"))
+        sidecar = stack.enter_context(open_raw_sidecar(raw_path))
+
+        writer = builder.open_writer(f)
+        writer.write_header(args.targets, excludes, nmap_command, raw_output_ref=raw_path.name)
+        pipeline = ReportPipeline([writer] + _open_format_writers(builder, args, stack, metadata))
+
+        try:
+            hosts = iter_hosts(
+                handler,
+                raw_sink=lambda _shard, text: sidecar.write(text),
+                resolver=resolver,
+                names=names,
+            )
+            pipeline.write_hosts(hosts)
+        except NmapExecutionError as e:
+            logger.error(f"Nmap failed: {e} (reports at {output_path} etc. are incomplete)")
+            return
+        finally:
+            pipeline.close()
 
     logger.info(f"Report written to {output_path}")
+    logger.info(f"Raw Nmap XML written to {raw_path}")
+    _log_format_outputs(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+"""
+checkpoint.py – Run directories for checkpointed, resumable scans.
+
+A run directory records a scan while it happens, so a crash (SSH drop,
+OOM, timeout) only loses the shards that were still running:
+
+    plan.json       command line of the run
+    shards/*.xml    raw nmap XML of every completed shard
+    shards.ndjson   journal: one line per completed shard (targets + file)
+    hosts.ndjson    every host result, as soon as it is parsed
+
+A shard counts as done once its journal line exists. Its XML file is
+written (and renamed into place) and all of its hosts are flushed to disk
+before that line is written. Hosts from shards that never finished are
+ignored on resume, and their targets are scanned again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Set, Union
+
+from .result_objects import HostResult
+from .targets import TargetSet, partition_targets
+
+PLAN_VERSION = 1
+
+# Shard size used for checkpointed runs that did not ask for sharding,
+# so there is something to resume from
+DEFAULT_CHECKPOINT_SHARD_SIZE = 256
+
+
+def shard_key(targets: List[str]) -> str:
+    """Stable id of a shard, derived from its target specs."""
+    return hashlib.sha1(" ".join(targets).encode("utf-8")).hexdigest()[:16]
+
+
+class RunDirectory:
+    """
+    Checkpoint files of one run (see module docstring).
+
+    Use :meth:`create` for a new run and :meth:`open` to resume one.
+    Recording methods are thread-safe; shards finish on worker threads.
+    """
+
+    def __init__(self, path: Union[str, Path], plan: Dict[str, Any]) -> None:
+        self.path = Path(path)
+        self.plan = plan
+        self.shard_dir = self.path / "shards"
+        self.journal_path = self.path / "shards.ndjson"
+        self.hosts_path = self.path / "hosts.ndjson"
+        self._lock = threading.Lock()
+        self._shards: List[List[str]] = []
+        # Shards of this attempt whose XML file is in place
+        self._saved: Set[int] = set()
+
+    @classmethod
+    def create(cls, path: Union[str, Path], argv: List[str]) -> "RunDirectory":
+        """Starts a new run directory; refuses to reuse one that has a plan."""
+        path = Path(path)
+        if (path / "plan.json").exists():
+            raise ValueError(f"{path} already holds a run; use --resume {path} to continue it")
+        (path / "shards").mkdir(parents=True, exist_ok=True)
+
+        plan = {"version": PLAN_VERSION, "created": time.time(), "argv": list(argv)}
+        (path / "plan.json").write_text(json.dumps(plan, indent=2) + "\n", encoding="utf-8")
+        return cls(path, plan)
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> "RunDirectory":
+        """Opens an existing run directory for resuming."""
+        path = Path(path)
+        plan = json.loads((path / "plan.json").read_text(encoding="utf-8"))
+        if plan.get("version") != PLAN_VERSION:
+            raise ValueError(f"unsupported run directory version: {plan.get('version')}")
+        (path / "shards").mkdir(exist_ok=True)
+        return cls(path, plan)
+
+    @property
+    def argv(self) -> List[str]:
+        """Command line arguments of the original run."""
+        return list(self.plan["argv"])
+
+    # ------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------
+    def begin(self, shards: List[List[str]]) -> None:
+        """Sets the shards of this attempt; indexes refer to this list."""
+        self._shards = [list(s) for s in shards]
+        self._saved = set()
+
+    def record_host(self, shard_idx: int, host: HostResult) -> None:
+        line = json.dumps({"shard": shard_key(self._shards[shard_idx]), "host": host.to_dict()})
+        with self._lock, open(self.hosts_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def save_shard_xml(self, shard_idx: int, xml: str) -> None:
+        """Saves a completed shard's XML; :meth:`shard_done` marks it as done."""
+        key = shard_key(self._shards[shard_idx])
+        xml_path = self.shard_dir / f"{key}.xml"
+        tmp = xml_path.with_name(xml_path.name + ".tmp")
+        tmp.write_text(xml, encoding="utf-8")
+        os.replace(tmp, xml_path)
+        with self._lock:
+            self._saved.add(shard_idx)
+
+    def shard_done(self, shard_idx: int) -> None:
+        """
+        Marks a shard as done. Call it only after every host of the shard
+        went through :meth:`record_host`; shards without saved XML are skipped.
+        """
+        targets = self._shards[shard_idx]
+        key = shard_key(targets)
+        entry = {"shard": key, "targets": targets, "file": f"shards/{key}.xml",
+                 "finished": time.time()}
+        with self._lock:
+            if shard_idx not in self._saved:
+                return
+            # The shard's hosts must be on disk before the journal says so
+            with open(self.hosts_path, "a", encoding="utf-8") as f:
+                os.fsync(f.fileno())
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    # ------------------------------------------------------------
+    # Resuming
+    # ------------------------------------------------------------
+    def completed_shards(self) -> List[Dict[str, Any]]:
+        """Journal entries of all completed shards, in completion order."""
+        if not self.journal_path.exists():
+            return []
+        entries = []
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid-write: shard not done
+                    continue
+        return entries
+
+    def done_coverage(self) -> TargetSet:
+        """Targets of every completed shard (IPv4 and hostnames; see partition_targets)."""
+        specs, _ = partition_targets(
+            spec for entry in self.completed_shards() for spec in entry["targets"]
+        )
+        return TargetSet.from_items(specs)
+
+    def completed_hosts(self) -> List[HostResult]:
+        """Host results of completed shards (first result per IP)."""
+        done = {entry["shard"] for entry in self.completed_shards()}
+        if not done or not self.hosts_path.exists():
+            return []
+
+        hosts: List[HostResult] = []
+        seen = set()
+        with open(self.hosts_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record["shard"] not in done:
+                    continue
+                host = HostResult.from_dict(record["host"])
+                if host.ip != "unknown":
+                    if host.ip in seen:
+                        continue
+                    seen.add(host.ip)
+                hosts.append(host)
+        return hosts
+
+    def completed_xml(self) -> List[str]:
+        """Raw XML of every completed shard, in completion order."""
+        texts = []
+        for entry in self.completed_shards():
+            texts.append((self.path / entry["file"]).read_text(encoding="utf-8"))
+        return texts
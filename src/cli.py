@@ -1,14 +1,11 @@
 import argparse
 import ipaddress
+import os
 import platform
 import subprocess
 import re
 from typing import List, Optional
 
-from .nmap_handler import NmapHandler, NmapExecutionError
-from .nmap_parser import NmapParser
-from .report_builder import ReportBuilder
-from .windows_enum import WindowsEnumerator
 from . import __version__, __app_name__
 
 
@@ -176,8 +173,11 @@ def _build_arg_parser() -> argparse.ArgumentParser:
 
     p.add_argument(
         "targets",
-        nargs="+",
-        help="List of target IPs / CIDR ranges (or hostnames if --allow-dns is set)."
+        nargs="*",
+        help=(
+            "List of target IPs / CIDR ranges (or hostnames if --allow-dns is set). "
+            "Required unless --resume is used."
+        ),
     )
     p.add_argument(
         "-p", "--ports",
@@ -191,14 +191,101 @@ def _build_arg_parser() -> argparse.ArgumentParser:
         "--json-output",
         help="Optional path for a JSON report (in addition to the text report)."
     )
+    p.add_argument(
+        "--ndjson-output",
+        help="Optional path for newline-delimited JSON (one host object per line)."
+    )
+    p.add_argument(
+        "--csv-output",
+        help="Optional path for a CSV with one row per reported port."
+    )
+    p.add_argument(
+        "--html-output",
+        help="Optional path for a static HTML summary (one table row per host)."
+    )
+    p.add_argument(
+        "--inline-raw", action="store_true",
+        help=(
+            "Embed the full raw Nmap XML in the Markdown report instead of writing it "
+            "to a gzip-compressed sidecar file next to the report."
+        ),
+    )
+    p.add_argument(
+        "--raw-archive", action="store_true",
+        help=(
+            "Write the raw Nmap XML to an indexed archive (.raw.sxa) instead of the gzip "
+            "sidecar, so single hosts can be read back with 'python -m src raw'."
+        ),
+    )
+    p.add_argument(
+        "--render-workers", type=int, default=1,
+        help=(
+            "Processes used to render the Markdown report of large scans (default: 1). "
+            "The output is identical to rendering in one process."
+        ),
+    )
+    p.add_argument(
+        "--stream-report", action="store_true",
+        help=(
+            "Write each host to the report as soon as it is scanned (hosts appear in "
+            "scan completion order; cannot be combined with --store, --inline-raw or --staged)."
+        ),
+    )
+    p.add_argument(
+        "--stats-every", type=float, default=None, metavar="SECONDS",
+        help=(
+            "Show live progress (percent done, hosts, open ports/s, ETA) every SECONDS, "
+            "based on nmap's --stats-every output."
+        ),
+    )
+    p.add_argument(
+        "--status-file", default=None,
+        help="Keep a JSON status file with the live progress up to date (implies --stats-every 10).",
+    )
+    p.add_argument(
+        "--metrics-json", default=None,
+        help="Write timing/resource metrics per pipeline stage and per nmap process to this JSON file.",
+    )
+    p.add_argument(
+        "--metrics-prom", default=None,
+        help="Write the run metrics as a Prometheus textfile-collector file (e.g. sonartrace.prom).",
+    )
     p.add_argument(
         "--rate", type=int, default=None,
-        help="Rough rate control. Values <= 2000 imply a more polite Nmap timing template."
+        help=(
+            "Maximum packets per second for the whole scan (nmap --max-rate, split across "
+            "parallel shards; lowered automatically when nmap reports dropped probes)."
+        ),
+    )
+    p.add_argument(
+        "--min-rate", type=int, default=None,
+        help="Minimum packets per second for the whole scan (nmap --min-rate, split like --rate).",
+    )
+    p.add_argument(
+        "--host-timeout", default=None, metavar="TIME",
+        help=(
+            "Give up on a single host after TIME (nmap --host-timeout, e.g. 90s, 15m). "
+            "Results found so far are kept and the host is marked incomplete."
+        ),
+    )
+    p.add_argument(
+        "--scan-timeout", type=int, default=0, metavar="SECONDS",
+        help=(
+            "Kill each nmap process after SECONDS (default: no limit). Hosts it already "
+            "reported are kept; the rest of its targets are reported as not scanned."
+        ),
     )
     p.add_argument(
         "-x", "--exclude", action="append", default=[],
         help="Host(s) or network(s) to exclude from the scan. Can be used multiple times."
     )
+    p.add_argument(
+        "--exclude-file", action="append", default=[],
+        help=(
+            "File of hosts/networks to exclude (one or more per line, '#' comments). "
+            "Can be used multiple times."
+        ),
+    )
     p.add_argument(
         "--allow-dns", action="store_true",
         help=(
@@ -206,10 +293,129 @@ def _build_arg_parser() -> argparse.ArgumentParser:
             "DNS leakage safety check; the DNS resolver confirmation prompt still applies)."
         ),
     )
+    p.add_argument(
+        "--resolve-dns", action="store_true",
+        help=(
+            "Resolve hostname targets/excludes up front in concurrent, cached batches and "
+            "run nmap with -n (no DNS lookups by nmap itself)."
+        ),
+    )
+    p.add_argument(
+        "--ptr", action="store_true",
+        help="With --resolve-dns: look up PTR names of the live hosts in one batch.",
+    )
+    p.add_argument(
+        "--dns-server", dest="dns_servers", action="append", default=[],
+        help="DNS server for --resolve-dns (default: the system resolvers). Can be repeated.",
+    )
+    p.add_argument(
+        "--dns-cache", default=None, metavar="PATH",
+        help=(
+            "TTL-aware cache file for --resolve-dns answers "
+            "(default: $XDG_CACHE_HOME/sonartrace/dns-cache.json)."
+        ),
+    )
+    p.add_argument(
+        "--no-dns-cache", action="store_true",
+        help="Do not read or write the DNS cache file.",
+    )
+    p.add_argument(
+        "--dns-concurrency", type=int, default=64,
+        help="DNS lookups in flight at once with --resolve-dns (default: 64).",
+    )
     p.add_argument(
         "--nmap-arg", dest="nmap_args", action="append", default=[],
         help="Additional raw nmap arguments to append (advanced use only)."
     )
+    p.add_argument(
+        "--nmap-binary", default=os.environ.get("SONARTRACE_NMAP", "nmap"),
+        help=(
+            "Command used to run nmap, may include arguments (default: $SONARTRACE_NMAP "
+            "or 'nmap'). Useful for offline testing with benchmarks/fake-nmap."
+        ),
+    )
+    p.add_argument(
+        "--workers", type=int, default=1,
+        help="Maximum number of concurrent nmap processes when sharding (default: 1)."
+    )
+    p.add_argument(
+        "--shard-prefix", type=int, default=None,
+        help="Split targets into per-subnet shards of this prefix length (e.g. 24 for per-/24)."
+    )
+    p.add_argument(
+        "--shard-size", type=int, default=None,
+        help="Split targets into shards of at most this many addresses."
+    )
+    p.add_argument(
+        "--staged", action="store_true",
+        help=(
+            "Scan in phases: ping sweep, then a port scan of live hosts only, then "
+            "version/OS detection on the open ports of each host."
+        ),
+    )
+    p.add_argument(
+        "--fingerprint-cache", default=None, metavar="PATH",
+        help=(
+            "With --staged: cache file of service/OS fingerprints. Hosts whose open ports "
+            "are unchanged since they were fingerprinted skip -sV/-O detection."
+        ),
+    )
+    p.add_argument(
+        "--fingerprint-ttl", type=float, default=168.0,
+        help="Hours a cached fingerprint stays valid (default: 168).",
+    )
+    p.add_argument(
+        "--store",
+        help="SQLite database to save scan results to (created if missing)."
+    )
+    p.add_argument(
+        "--incremental", action="store_true",
+        help=(
+            "Skip targets already scanned with the same ports/nmap arguments within "
+            "--fresh-for hours and reuse their stored results (requires --store)."
+        ),
+    )
+    p.add_argument(
+        "--fresh-for", type=float, default=24.0,
+        help="Freshness window in hours for --incremental (default: 24)."
+    )
+    p.add_argument(
+        "--run-dir", default=None,
+        help=(
+            "Checkpoint the scan to this directory (completed shards and host results), "
+            "so it can be continued with --resume after a crash."
+        ),
+    )
+    p.add_argument(
+        "--resume", default=None, metavar="RUN_DIR",
+        help=(
+            "Continue the checkpointed run in RUN_DIR with its original options, "
+            "scanning only the shards that had not completed."
+        ),
+    )
+    p.add_argument(
+        "--coordinator", default=None, metavar="ADDRESS",
+        help=(
+            "Do not scan locally: listen on ADDRESS (host:port or unix:/path; host defaults "
+            "to 127.0.0.1) and hand the shards to 'worker' processes instead (--workers = "
+            "units scanned at a time). Addresses other than loopback need --cluster-token."
+        ),
+    )
+    p.add_argument(
+        "--lease-seconds", type=float, default=300,
+        help="Seconds a worker may hold a work unit without a heartbeat (default: 300).",
+    )
+    p.add_argument(
+        "--max-attempts", type=int, default=3,
+        help="How often a failed or abandoned work unit is tried in total (default: 3).",
+    )
+    p.add_argument(
+        "--cluster-token", default=os.environ.get("SONARTRACE_CLUSTER_TOKEN"),
+        help=(
+            "Shared secret workers must present (default: $SONARTRACE_CLUSTER_TOKEN); "
+            "required unless --coordinator listens on loopback or a Unix socket."
+        ),
+    )
     p.add_argument(
         "--version", action="version",
         version=f"%(prog)s {__version__}",
@@ -217,61 +423,155 @@ def _build_arg_parser() -> argparse.ArgumentParser:
     return p
 
 
-def main(argv: Optional[List[str]] = None) -> None:
-    parser = _build_arg_parser()
-    print(ASCII_BANNER)
-    args = parser.parse_args(argv)
+def _build_serve_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog=f"{__app_name__} serve",
+        description="Run SonarTrace as a daemon that takes scan jobs over a local HTTP API.",
+    )
+    p.add_argument(
+        "--listen", default="127.0.0.1:7800", metavar="ADDRESS",
+        help="Where to serve the API: host:port or unix:/path (default: 127.0.0.1:7800).",
+    )
+    p.add_argument(
+        "--policy", default=None,
+        help=(
+            "JSON file with the safety policy for jobs (allow_dns, allowed_networks, "
+            "max_rate, max_workers, allow_nmap_args). Default: IP targets only, no raw nmap args."
+        ),
+    )
+    p.add_argument(
+        "--jobs-dir", default="sonartrace-jobs",
+        help="Directory for the reports of each job (default: ./sonartrace-jobs).",
+    )
+    p.add_argument(
+        "--max-concurrent", type=int, default=1,
+        help="Number of jobs that may run at the same time (default: 1).",
+    )
+    p.add_argument(
+        "--store", default=None,
+        help="SQLite result store shared by all jobs (enables incremental jobs).",
+    )
+    p.add_argument(
+        "--fingerprint-cache", default=None, metavar="PATH",
+        help="Service/OS fingerprint cache shared by staged jobs (default: in memory only).",
+    )
+    p.add_argument(
+        "--dns-cache", default=None, metavar="PATH",
+        help=(
+            "DNS answer cache shared by jobs with resolve_dns "
+            "(default: $XDG_CACHE_HOME/sonartrace/dns-cache.json)."
+        ),
+    )
+    p.add_argument(
+        "--nmap-binary", default=os.environ.get("SONARTRACE_NMAP", "nmap"),
+        help="Command used to run nmap (default: $SONARTRACE_NMAP or 'nmap').",
+    )
+    p.add_argument(
+        "--api-token", default=os.environ.get("SONARTRACE_API_TOKEN"),
+        help="Require 'Authorization: Bearer TOKEN' on every request (default: $SONARTRACE_API_TOKEN).",
+    )
+    return p
 
-    # Very explicit legality warning
-    print("[!] Use this tool ONLY against hosts and networks you are explicitly authorized to test.")
-    print("[!] The authors take no responsibility for misuse.\n")
 
-    # DNS Safety Check – detect resolver(s) and ask user to confirm
-    _dns_safety_prompt()
+def _build_worker_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog=f"{__app_name__} worker",
+        description="Scan work units handed out by a SonarTrace coordinator (--coordinator).",
+    )
+    p.add_argument(
+        "--connect", required=True, metavar="ADDRESS",
+        help="Coordinator address (host:port or unix:/path).",
+    )
+    p.add_argument(
+        "--nmap-binary", default=os.environ.get("SONARTRACE_NMAP", "nmap"),
+        help="Command used to run nmap on this machine (default: $SONARTRACE_NMAP or 'nmap').",
+    )
+    p.add_argument(
+        "--cluster-token", default=os.environ.get("SONARTRACE_CLUSTER_TOKEN"),
+        help="Shared secret of the coordinator (default: $SONARTRACE_CLUSTER_TOKEN).",
+    )
+    p.add_argument(
+        "--name", default=None,
+        help="Worker name shown in the coordinator's log and report (default: hostname).",
+    )
+    p.add_argument(
+        "--connect-timeout", type=float, default=30.0,
+        help="Seconds to keep trying to reach the coordinator (default: 30).",
+    )
+    p.add_argument(
+        "--allow-nmap-args", action="store_true",
+        help=(
+            "Run units that carry extra nmap arguments (the coordinator's --nmap-arg). "
+            "Off by default: the coordinator decides which options nmap runs with here."
+        ),
+    )
+    return p
+
+
+def _build_raw_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog=f"{__app_name__} raw",
+        description="Print raw Nmap XML from an indexed archive (--raw-archive).",
+    )
+    p.add_argument("archive", help="Archive file (*.raw.sxa; its .idx file must be next to it).")
+    p.add_argument(
+        "addresses", nargs="*", metavar="IP",
+        help="Print only the <host> elements of these addresses (default: the whole archive).",
+    )
+    p.add_argument(
+        "--list", action="store_true",
+        help="List the addresses in the archive instead of printing XML.",
+    )
+    return p
 
-    # Existing target validation (CIDR breadth + hostname safety)
-    _validate_targets(args.targets, allow_dns=args.allow_dns)
 
-    handler = NmapHandler(
-        targets=args.targets,
-        ports=args.ports,
-        rate_limit=args.rate,
-        extra_args=args.nmap_args,
-        excludes=args.exclude,
+def _build_query_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog=f"{__app_name__} query",
+        description=(
+            "Find hosts in saved scan results. Criteria of different kinds must all match; "
+            "repeating one (e.g. --port 139 --port 445) matches any of its values."
+        ),
+    )
+    p.add_argument(
+        "sources", nargs="+", metavar="SOURCE",
+        help=(
+            "JSON/NDJSON report, raw nmap XML (.xml, .raw.xml.gz, .raw.sxa) or result store "
+            "database. Later sources replace earlier results for the same address."
+        ),
+    )
+    p.add_argument("--port", type=int, action="append", help="Open port number.")
+    p.add_argument("--service", action="append", help="Service name on an open port, e.g. microsoft-ds.")
+    p.add_argument("--product", action="append", help="Substring of the detected product, e.g. Samba.")
+    p.add_argument("--version", dest="product_version", action="append",
+                   help="Substring of the detected version, e.g. 3.0.")
+    p.add_argument(
+        "--os", action="append",
+        help="OS family: windows, linux, macos, bsd, network, solaris, other or unknown.",
     )
+    p.add_argument("--script", action="append", help="NSE script id with output, e.g. smb-os-discovery.")
+    p.add_argument("--within", default=None, help="Only addresses in these IPs/CIDR ranges (comma-separated).")
+    p.add_argument("--up", action="store_true", help="Only hosts reported up.")
+    p.add_argument(
+        "--format", choices=("text", "ips", "json", "ndjson", "csv"), default="text",
+        help=(
+            "Output: one line per host (default), addresses only, JSON / NDJSON host "
+            "records or CSV port rows."
+        ),
+    )
+    p.add_argument(
+        "--count-by", choices=("port", "service", "product", "version", "os", "script"),
+        help="Print the number of matching hosts per value of this field instead of the hosts.",
+    )
+    return p
 
-    try:
-        xml_output = handler.run_scan()
-    except NmapExecutionError as e:
-        parser.exit(status=1, message=f"[!] Nmap error: {e}\n")
-
-    parser_obj = NmapParser()
-    hosts = parser_obj.parse(xml_output)
-
-    win_enum = WindowsEnumerator()
-    win_enum.enumerate(hosts)
-
-    metadata = {
-        "targets": ", ".join(args.targets),
-        "excluded": ", ".join(args.exclude) if args.exclude else "(none)",
-        # If you later want to show the exact command + raw XML in the report,
-        # you can also add e.g. "nmap_command" and "raw_nmap_output" here.
-    }
-    builder = ReportBuilder(metadata=metadata)
-    text_report = builder.build_text_report(hosts)
-
-    if args.output:
-        with open(args.output, "w", encoding="utf-8") as f:
-            f.write(text_report)
-        print(f"[+] Text report written to {args.output}")
-    else:
-        print(text_report)
 
-    if args.json_output:
-        json_report = builder.build_json_report(hosts)
-        with open(args.json_output, "w", encoding="utf-8") as f:
-            f.write(json_report)
-        print(f"[+] JSON report written to {args.json_output}")
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run SonarTrace with ``argv``; same as ``python -m src``."""
+    # Imported here: __main__ builds its parsers from this module
+    from .__main__ import main as _main
+
+    _main(argv)
 
 
 if __name__ == "__main__":  # pragma: no cover
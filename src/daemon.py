@@ -0,0 +1,659 @@
+"""
+daemon.py – Long-running scan service with a job queue and a local HTTP API.
+
+``python -m src serve`` keeps one process (and its imports) alive and runs
+scan jobs submitted over HTTP, on TCP (``host:port``) or a Unix socket
+(``unix:/path``):
+
+    POST   /jobs               submit a scan (JSON body, see ScanRequest)
+    GET    /jobs               status of all jobs
+    GET    /jobs/<id>          status of one job (with live progress)
+    GET    /jobs/<id>/result   JSON report of a finished job
+    GET    /jobs/<id>/report   Markdown report of a finished job
+    GET    /jobs/<id>/raw/<ip> raw nmap XML of one host of a finished job
+    DELETE /jobs/<id>          cancel a queued job
+    GET    /health             liveness check
+
+Jobs wait in a priority queue (higher ``priority`` first, then submission
+order) and at most ``max_concurrent`` of them run at the same time, each
+through enumerator.enumerate_hosts. Reports are written to
+``<jobs dir>/<id>/``.
+
+There is no interactive DNS prompt: what a job may do is decided up front
+by a JSON policy file (see ScanPolicy), and requests that break it are
+rejected with 400.
+"""
+
+import heapq
+import hmac
+import itertools
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .cli import _validate_targets
+from .distributed import is_loopback, parse_address
+from .dns_resolver import DnsCache, DnsResolver
+from .enumerator import enumerate_hosts
+from .fingerprint_cache import FingerprintCache
+from .metrics import RunMetrics
+from .nmap_handler import NmapHandler, NmapExecutionError, is_nmap_time
+from .progress import ProgressTracker
+from .report_builder import ReportBuilder, ReportPipeline, open_raw_sidecar
+from .xml_archive import XmlArchive
+from .result_store import ResultStore
+from .targets import TargetSet, check_target_items
+from .logger_setup import get_logger
+
+log = get_logger("daemon")
+
+# Largest request body accepted (target lists can be long, reports are not sent in)
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class RequestError(ValueError):
+    """A scan request that is malformed or not allowed by the policy."""
+
+
+@dataclass
+class ScanPolicy:
+    """
+    What submitted jobs are allowed to do (loaded from ``--policy``).
+
+    :param allow_dns: Hostname targets are allowed (the DNS leakage risk
+        is accepted once, here, instead of per scan).
+    :param allowed_networks: If set, every target must lie inside them.
+    :param max_rate: Upper bound (and default) for a job's ``rate``.
+    :param max_workers: Upper bound for a job's ``workers``.
+    :param allow_nmap_args: Jobs may pass raw ``nmap_args``.
+    """
+    allow_dns: bool = False
+    allowed_networks: List[str] = field(default_factory=list)
+    max_rate: Optional[int] = None
+    max_workers: int = 4
+    allow_nmap_args: bool = False
+
+    @classmethod
+    def load(cls, path: Optional[Union[str, Path]]) -> "ScanPolicy":
+        if path is None:
+            return cls()
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        unknown = set(data) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"unknown policy key(s): {', '.join(sorted(unknown))}")
+        policy = cls(**data)
+        # Fail at startup, not on the first job
+        TargetSet.from_items(policy.allowed_networks)
+        return policy
+
+    def allowed_set(self) -> Optional[TargetSet]:
+        return TargetSet.from_items(self.allowed_networks) if self.allowed_networks else None
+
+
+@dataclass
+class ScanRequest:
+    """Validated body of ``POST /jobs``."""
+    targets: List[str]
+    ports: Optional[str] = None
+    excludes: List[str] = field(default_factory=list)
+    nmap_args: List[str] = field(default_factory=list)
+    rate: Optional[int] = None
+    min_rate: Optional[int] = None
+    workers: int = 1
+    shard_size: Optional[int] = None
+    shard_prefix: Optional[int] = None
+    staged: bool = False
+    host_timeout: Optional[str] = None
+    scan_timeout: int = 0
+    incremental: bool = False
+    fresh_for: float = 24.0
+    resolve_dns: bool = False
+    ptr: bool = False
+    priority: int = 0
+
+    @classmethod
+    def from_json(cls, data: Any, policy: ScanPolicy) -> "ScanRequest":
+        if not isinstance(data, dict):
+            raise RequestError("request body must be a JSON object")
+        unknown = set(data) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise RequestError(f"unknown field(s): {', '.join(sorted(unknown))}")
+        try:
+            request = cls(**data)
+        except TypeError as e:
+            raise RequestError(str(e)) from e
+        request._check_types()
+        request._check_policy(policy)
+        return request
+
+    def _check_types(self) -> None:
+        def str_list(name: str) -> None:
+            value = getattr(self, name)
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise RequestError(f"{name} must be a list of strings")
+
+        str_list("targets")
+        str_list("excludes")
+        str_list("nmap_args")
+        if not self.targets:
+            raise RequestError("targets must not be empty")
+        for name in ("rate", "min_rate", "shard_size", "shard_prefix"):
+            value = getattr(self, name)
+            if value is not None and (not isinstance(value, int) or value < 1):
+                raise RequestError(f"{name} must be a positive integer")
+        if self.shard_prefix is not None and self.shard_prefix > 32:
+            raise RequestError("shard_prefix must be between 1 and 32")
+        if not isinstance(self.workers, int) or self.workers < 1:
+            raise RequestError("workers must be a positive integer")
+        if not isinstance(self.scan_timeout, int) or self.scan_timeout < 0:
+            raise RequestError("scan_timeout must be a non-negative integer")
+        if not isinstance(self.priority, int):
+            raise RequestError("priority must be an integer")
+        if self.ports is not None and not isinstance(self.ports, str):
+            raise RequestError("ports must be a string")
+        if self.host_timeout is not None and not is_nmap_time(str(self.host_timeout)):
+            raise RequestError("host_timeout must be an nmap time value such as 90s or 15m")
+        if self.rate is not None and self.min_rate is not None and self.min_rate > self.rate:
+            raise RequestError("min_rate cannot be higher than rate")
+        if not isinstance(self.resolve_dns, bool) or not isinstance(self.ptr, bool):
+            raise RequestError("resolve_dns and ptr must be booleans")
+        if self.ptr and not self.resolve_dns:
+            raise RequestError("ptr requires resolve_dns")
+
+    def _check_policy(self, policy: ScanPolicy) -> None:
+        # Targets and excludes end up on nmap's command line: every item must
+        # be a real target spec, whatever the DNS policy, never an option
+        _check_target_items("target", self.targets)
+        _check_target_items("exclude", self.excludes)
+        try:
+            # Same guard as the CLI (broad ranges, hostnames without allow_dns)
+            _validate_targets(self.targets, allow_dns=policy.allow_dns)
+        except SystemExit as e:
+            raise RequestError(str(e)) from e
+
+        allowed = policy.allowed_set()
+        if allowed is not None:
+            try:
+                requested = TargetSet.from_items(self.targets)
+            except ValueError as e:
+                raise RequestError(f"invalid target: {e}") from e
+            outside = requested - allowed
+            if outside.address_count() or outside.hostnames:
+                raise RequestError(
+                    "targets outside the allowed networks: " + ", ".join(outside.to_specs()[:10])
+                )
+
+        if self.resolve_dns and not policy.allow_dns:
+            raise RequestError("resolve_dns is not allowed by the policy (allow_dns)")
+        if self.nmap_args and not policy.allow_nmap_args:
+            raise RequestError("nmap_args are not allowed by the policy")
+        if policy.max_rate is not None:
+            if self.rate is None:
+                self.rate = policy.max_rate
+            if self.rate > policy.max_rate:
+                raise RequestError(f"rate is limited to {policy.max_rate} by the policy")
+        if self.workers > policy.max_workers:
+            raise RequestError(f"workers is limited to {policy.max_workers} by the policy")
+
+
+def _check_target_items(kind: str, values: List[str]) -> None:
+    try:
+        check_target_items(kind, values)
+    except ValueError as e:
+        raise RequestError(str(e)) from None
+
+
+@dataclass
+class Job:
+    """One submitted scan and its state."""
+    id: str
+    request: ScanRequest
+    seq: int
+    state: str = "queued"     # queued, running, done, failed, cancelled
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    command: Optional[str] = None
+    hosts: Optional[int] = None
+    progress: Optional[ProgressTracker] = None
+    metrics: Optional[RunMetrics] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "state": self.state,
+            "priority": self.request.priority,
+            "targets": self.request.targets,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+            "nmap_command": self.command,
+            "hosts": self.hosts,
+        }
+        if self.state == "running" and self.progress is not None:
+            data["progress"] = self.progress.snapshot()
+        if self.metrics is not None and self.state in ("done", "failed"):
+            data["metrics"] = self.metrics.to_dict()
+        return data
+
+
+class ScanService:
+    """
+    The job queue and its runner threads (the HTTP layer is in ScanAPIHandler).
+
+    :param jobs_dir: Directory for per-job reports.
+    :param policy: Limits for submitted jobs.
+    :param max_concurrent: Jobs running at the same time.
+    :param nmap_binary: Command used to run nmap.
+    :param store: Optional shared ResultStore; enables ``incremental`` jobs.
+    :param dns_cache: DNS answers shared by ``resolve_dns`` jobs.
+    :param fingerprints: Service/OS fingerprints shared by ``staged`` jobs.
+    """
+
+    def __init__(
+        self,
+        jobs_dir: Union[str, Path],
+        policy: ScanPolicy,
+        max_concurrent: int = 1,
+        nmap_binary: str = "nmap",
+        store: Optional[ResultStore] = None,
+        dns_cache: Optional[DnsCache] = None,
+        fingerprints: Optional[FingerprintCache] = None,
+    ) -> None:
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.policy = policy
+        self.max_concurrent = max(1, max_concurrent)
+        self.nmap_binary = nmap_binary
+        self.store = store
+        self.dns_cache = dns_cache or DnsCache()
+        self.fingerprints = fingerprints or FingerprintCache()
+        self.jobs: Dict[str, Job] = {}
+        self._queue: List[Tuple[int, int, str]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._runners: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.max_concurrent):
+            runner = threading.Thread(target=self._run, name=f"job-runner-{i}", daemon=True)
+            runner.start()
+            self._runners.append(runner)
+
+    def stop(self) -> None:
+        """Lets running jobs finish; queued jobs stay queued (and are lost)."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for runner in self._runners:
+            runner.join()
+
+    # ------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------
+    def submit(self, data: Any) -> Job:
+        if self.store is None and isinstance(data, dict) and data.get("incremental"):
+            raise RequestError("incremental jobs need the daemon to run with --store")
+        request = ScanRequest.from_json(data, self.policy)
+        with self._cond:
+            job = Job(id=uuid.uuid4().hex[:12], request=request, seq=next(self._seq))
+            self.jobs[job.id] = job
+            heapq.heappush(self._queue, (-request.priority, job.seq, job.id))
+            self._cond.notify()
+        log.info(f"Job {job.id} queued (priority {request.priority}): {' '.join(request.targets)}")
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        with self._cond:
+            job = self.jobs[job_id]
+            if job.state != "queued":
+                raise RequestError(f"job is {job.state}; only queued jobs can be cancelled")
+            job.state = "cancelled"
+            job.finished = time.time()
+        log.info(f"Job {job.id} cancelled")
+        return job
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            jobs = list(self.jobs.values())
+        counts: Dict[str, int] = {}
+        for job in jobs:
+            counts[job.state] = counts.get(job.state, 0) + 1
+        return {"max_concurrent": self.max_concurrent, "jobs": counts}
+
+    def job_path(self, job: Job, name: str) -> Path:
+        return self.jobs_dir / job.id / name
+
+    def _next_job(self) -> Optional[Job]:
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None
+                while self._queue:
+                    _, _, job_id = heapq.heappop(self._queue)
+                    job = self.jobs[job_id]
+                    if job.state == "queued":
+                        job.state = "running"
+                        job.started = time.time()
+                        return job
+                self._cond.wait()
+
+    def _run(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._execute(job)
+                job.state = "done"
+                log.info(f"Job {job.id} done: {job.hosts} host(s)")
+            except (NmapExecutionError, OSError, ValueError) as e:
+                job.state = "failed"
+                job.error = str(e).strip()
+                log.error(f"Job {job.id} failed: {job.error}")
+            except Exception as e:  # keep the runner alive whatever a job does
+                job.state = "failed"
+                job.error = f"internal error: {e!r}"
+                log.exception(f"Job {job.id} crashed")
+            finally:
+                job.finished = time.time()
+                job.progress = None
+
+    # ------------------------------------------------------------
+    # Running a job
+    # ------------------------------------------------------------
+    def _execute(self, job: Job) -> None:
+        req = job.request
+        job.progress = ProgressTracker()
+        job.metrics = RunMetrics()
+        handler = NmapHandler(
+            targets=req.targets,
+            ports=req.ports,
+            rate_limit=req.rate,
+            extra_args=req.nmap_args,
+            excludes=req.excludes,
+            shard_prefix=req.shard_prefix,
+            shard_size=req.shard_size,
+            workers=req.workers,
+            nmap_binary=self.nmap_binary,
+            min_rate=req.min_rate,
+            progress=job.progress,
+            metrics=job.metrics,
+            host_timeout=req.host_timeout,
+            scan_timeout=req.scan_timeout,
+        )
+        target_set = handler.target_set()
+        if target_set is not None:
+            job.progress.total_addresses = (target_set - handler.exclusions).address_count()
+
+        out_dir = self.jobs_dir / job.id
+        out_dir.mkdir(parents=True, exist_ok=True)
+        raw_path = out_dir / "raw.sxa"
+
+        with open_raw_sidecar(raw_path) as sidecar:
+            hosts, _, command = enumerate_hosts(
+                handler,
+                store=self.store,
+                max_age=req.fresh_for * 3600 if req.incremental else None,
+                raw_sink=lambda _shard, text: sidecar.write(text),
+                staged=req.staged,
+                fingerprints=self.fingerprints,
+                resolver=DnsResolver(cache=self.dns_cache, ptr=req.ptr) if req.resolve_dns else None,
+            )
+        job.command = command
+        job.hosts = len(hosts)
+
+        metadata = {
+            "targets": req.targets,
+            "excludes": req.excludes,
+            "nmap_command": command,
+            "raw_output": raw_path.name,
+        }
+        builder = ReportBuilder(metadata)
+        with job.metrics.stage("report"):
+            with open(out_dir / "report.md", "w", encoding="utf-8") as md, \
+                    open(out_dir / "result.json", "w", encoding="utf-8") as js:
+                markdown = builder.open_writer(md)
+                markdown.write_header(
+                    req.targets, req.excludes, command, raw_output_ref=raw_path.name
+                )
+                result = builder.open_json_writer(js)
+                result.write_header(metadata)
+                pipeline = ReportPipeline([markdown, result])
+                pipeline.write_hosts(hosts)
+                pipeline.close()
+
+
+class ScanAPIHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a ScanService (``self.server.service``)."""
+
+    server_version = "SonarTrace"
+
+    def do_GET(self) -> None:
+        service: ScanService = self.server.service
+        parts = self._route()
+        if parts is None:
+            return
+        if parts == ["health"]:
+            self._send_json(HTTPStatus.OK, {"ok": True, **service.status()})
+        elif parts == ["jobs"]:
+            with service._cond:
+                jobs = sorted(service.jobs.values(), key=lambda j: j.seq)
+            self._send_json(HTTPStatus.OK, {"jobs": [j.to_dict() for j in jobs]})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self._job(parts[1])
+            if job is not None:
+                self._send_json(HTTPStatus.OK, job.to_dict())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] in ("result", "report"):
+            job = self._job(parts[1])
+            if job is None:
+                return
+            if job.state != "done":
+                self._send_json(HTTPStatus.CONFLICT, {"error": f"job is {job.state}"})
+                return
+            if parts[2] == "result":
+                self._send_file(service.job_path(job, "result.json"), "application/json")
+            else:
+                self._send_file(service.job_path(job, "report.md"), "text/markdown; charset=utf-8")
+        elif len(parts) == 4 and parts[0] == "jobs" and parts[2] == "raw":
+            job = self._job(parts[1])
+            if job is None:
+                return
+            if job.state != "done":
+                self._send_json(HTTPStatus.CONFLICT, {"error": f"job is {job.state}"})
+                return
+            self._send_host_xml(service.job_path(job, "raw.sxa"), parts[3])
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        parts = self._route()
+        if parts is None:
+            return
+        if parts != ["jobs"]:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+
+        header = self.headers.get("Content-Length")
+        if header is None:
+            self._send_json(HTTPStatus.LENGTH_REQUIRED, {"error": "Content-Length required"})
+            return
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "invalid Content-Length"})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request too large"})
+            return
+        try:
+            data = json.loads(self.rfile.read(length) or b"null")
+            job = self.server.service.submit(data)
+        except json.JSONDecodeError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"invalid JSON: {e}"})
+            return
+        except RequestError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        self._send_json(HTTPStatus.ACCEPTED, job.to_dict(), location=f"/jobs/{job.id}")
+
+    def do_DELETE(self) -> None:
+        parts = self._route()
+        if parts is None:
+            return
+        if len(parts) != 2 or parts[0] != "jobs":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+        if self._job(parts[1]) is None:
+            return
+        try:
+            job = self.server.service.cancel(parts[1])
+        except RequestError as e:
+            self._send_json(HTTPStatus.CONFLICT, {"error": str(e)})
+            return
+        self._send_json(HTTPStatus.OK, job.to_dict())
+
+    # ------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------
+    def _route(self) -> Optional[List[str]]:
+        """Path segments of an authorized request, or None (already answered)."""
+        token = self.server.api_token
+        if token is not None:
+            supplied = self.headers.get("Authorization", "")
+            if not hmac.compare_digest(supplied, f"Bearer {token}"):
+                self._send_json(HTTPStatus.UNAUTHORIZED, {"error": "missing or wrong API token"})
+                return None
+        path = self.path.split("?", 1)[0]
+        return [p for p in path.split("/") if p]
+
+    def _job(self, job_id: str) -> Optional[Job]:
+        job = self.server.service.jobs.get(job_id)
+        if job is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"no job {job_id}"})
+        return job
+
+    def _send_json(self, status: HTTPStatus, data: Any, location: Optional[str] = None) -> None:
+        body = (json.dumps(data, indent=2) + "\n").encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if location:
+            self.send_header("Location", location)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_host_xml(self, archive_path: Path, ip: str) -> None:
+        try:
+            with XmlArchive(archive_path) as archive:
+                elements = archive.host_xml(ip)
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        except OSError as e:
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+            return
+        if not elements:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"{ip} is not in the raw output"})
+            return
+        self._send_body("\n".join(elements).encode("utf-8") + b"\n", "application/xml")
+
+    def _send_file(self, path: Path, content_type: str) -> None:
+        try:
+            body = path.read_bytes()
+        except OSError as e:
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+            return
+        self._send_body(body, content_type)
+
+    def _send_body(self, body: bytes, content_type: str) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port)
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        log.info(f"{self.address_string()} {format % args}")
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        def server_bind(self) -> None:
+            socketserver.UnixStreamServer.server_bind(self)
+            # BaseHTTPRequestHandler expects these
+            self.server_name, self.server_port = "localhost", 0
+
+
+def make_server(
+    listen: str,
+    service: ScanService,
+    api_token: Optional[str] = None,
+) -> socketserver.BaseServer:
+    """HTTP server for ``service`` on ``host:port`` or ``unix:/path``."""
+    kind, address = parse_address(listen)
+    if kind == "unix":
+        if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+            raise OSError("Unix sockets are not supported on this platform")
+        if os.path.exists(address):
+            os.unlink(address)
+        server = _UnixHTTPServer(address, ScanAPIHandler)
+        os.chmod(address, 0o600)
+    else:
+        host = address[0]
+        if not is_loopback(host) and api_token is None:
+            log.warning(f"Listening on {host} without --api-token; anyone who can reach it can scan")
+        server = ThreadingHTTPServer(address, ScanAPIHandler)
+    server.service = service
+    server.api_token = api_token
+    return server
+
+
+def serve(
+    listen: str,
+    service: ScanService,
+    api_token: Optional[str] = None,
+) -> None:
+    """Runs the API until Ctrl+C or SIGTERM, then lets running jobs finish."""
+    server = make_server(listen, service, api_token)
+    if threading.current_thread() is threading.main_thread():
+        # shutdown() blocks until serve_forever returns, so not from this thread
+        signal.signal(
+            signal.SIGTERM,
+            lambda *_: threading.Thread(target=server.shutdown, daemon=True).start(),
+        )
+    service.start()
+    log.info(f"SonarTrace daemon listening on {listen} ({service.max_concurrent} concurrent job(s))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Shutting down; waiting for running jobs")
+    finally:
+        server.server_close()
+        service.stop()
+        kind, address = parse_address(listen)
+        if kind == "unix":
+            try:
+                os.unlink(address)
+            except OSError:
+                pass
@@ -0,0 +1,689 @@
+"""
+distributed.py – Coordinator/worker mode for scanning from several machines.
+
+The coordinator plans the scan as usual (targets minus exclusions, split
+into shards) and hands the shards out as work units to ``sonartrace
+worker`` processes that connect to it. Each worker runs nmap for one unit
+at a time with its own local nmap and sends the raw XML back; the
+coordinator parses it and merges everything into one report.
+
+Protocol: one JSON object per line over TCP (``host:port``) or a Unix
+socket (``unix:/path``). The worker speaks first.
+
+    worker -> {"type": "hello", "worker": NAME, "nonce": NONCE}
+    coord  -> {"type": "challenge", "nonce": NONCE, "proof": HMAC}
+    worker -> {"type": "auth", "proof": HMAC}
+    worker -> {"type": "request"}
+    coord  -> {"type": "unit", "id": N, "targets": [...], "options": {...}, "lease": SEC}
+            | {"type": "wait", "seconds": SEC}     (all units leased, try again)
+            | {"type": "done"}                     (nothing left, disconnect)
+    worker -> {"type": "heartbeat", "id": N}       (renews the lease while scanning)
+    worker -> {"type": "result", "id": N, "xml": ..., "command": ..., "error": ...,
+               "congestion": {...}}
+    coord  -> {"type": "ack"}
+
+A unit whose lease runs out, or whose worker disconnects, goes back to the
+queue. Units that come back without any host output are retried as well,
+on a different worker where possible, up to ``max_attempts`` times in
+total. A unit that returns some hosts but then failed (nmap timed out or
+crashed) is kept as it is, like a failed local shard.
+
+Workers receive target lists and nmap options and send back results, so
+a coordinator only listens beyond loopback with a shared token. The token
+itself never goes over the wire: in the handshake the coordinator proves
+it knows the token first (HMAC over both nonces), then the worker does.
+A worker with a token refuses coordinators that cannot prove it. The
+connection is not encrypted, so targets and results can still be read
+on the way. Workers check every unit before running nmap: targets and
+excludes must be target specs, and extra nmap arguments are refused
+unless the worker allows them.
+"""
+
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import re
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .nmap_handler import NmapHandler, NmapExecutionError, is_nmap_time
+from .nmap_parser import NmapParser
+from .progress import ProgressTracker, ScanProgress
+from .rate_control import CongestionReport, split_rate
+from .result_objects import HostResult
+from .targets import check_target_items
+from .logger_setup import get_logger
+
+log = get_logger("distributed")
+
+DEFAULT_PORT = 7700
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Receives (unit index, raw XML text) once a unit has been returned
+RawSink = Callable[[int, str], None]
+
+# nmap -p values: numbers, ranges, protocol prefixes (T:, U:) and service names
+_PORTS_RE = re.compile(r"^[A-Za-z0-9,:\-\[\]\*\?]+$")
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """
+    ``("unix", path)`` for ``unix:/path``, else ``("tcp", (host, port))``
+    for ``host:port``, ``[v6]:port`` or a bare ``host``. An empty host
+    (``:7700``) means 127.0.0.1.
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+
+    host, sep, port = address.rpartition(":")
+    if not sep or "]" in port:
+        host, port = address, str(DEFAULT_PORT)
+    host = host.strip("[]") or "127.0.0.1"
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"invalid port in address {address!r}")
+    return "tcp", (host, int(port))
+
+
+def handshake_proof(token: Optional[str], role: str, *nonces: str) -> Optional[str]:
+    """HMAC proving knowledge of ``token`` for one side of the handshake."""
+    if not token:
+        return None
+    message = "|".join((role,) + nonces).encode("utf-8")
+    return hmac.new(token.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def _proof_matches(expected: Optional[str], proof: Any) -> bool:
+    return expected is None or hmac.compare_digest(str(proof or ""), expected)
+
+
+def is_loopback(host: str) -> bool:
+    """True if ``host`` only accepts connections from this machine."""
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+@dataclass
+class WorkUnit:
+    """One shard and its lease state."""
+    idx: int
+    targets: List[str]
+    attempts: int = 0
+    owner: Optional[str] = None       # worker holding the lease
+    expires: float = 0.0              # monotonic lease deadline
+    rate: Optional[int] = None        # --max-rate it was handed out with
+    progress: Optional[ScanProgress] = None
+    done: bool = False
+    failed_on: Set[str] = field(default_factory=set)  # workers it already failed on
+
+
+class Coordinator:
+    """
+    Hands out the shards of a scan to remote workers and collects the results.
+
+    :param address: Where to listen (``host:port`` or ``unix:/path``).
+    :param lease_seconds: How long a worker may hold a unit without a
+        heartbeat before it is handed to someone else.
+    :param max_attempts: How often a unit is tried before it counts as failed.
+    :param token: Shared secret workers must present. Required unless
+        listening on a Unix socket or a loopback address.
+    :param progress: Optional tracker; leased units are reported as scans.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        token: Optional[str] = None,
+        progress: Optional[ProgressTracker] = None,
+    ) -> None:
+        self.kind, self.address = parse_address(address)
+        if self.kind == "tcp" and not token and not is_loopback(self.address[0]):
+            raise ValueError(
+                f"listening on {self.address[0]} needs a cluster token (--cluster-token or "
+                "$SONARTRACE_CLUSTER_TOKEN); without one anyone who can connect could "
+                "fetch targets, forge results or run scans as a worker"
+            )
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.token = token
+        self.progress = progress
+        self.units: List[WorkUnit] = []
+        self._results: Dict[int, List[HostResult]] = {}
+        self._finishing = 0
+        self._workers: Set[str] = set()
+        self._connections = 0
+        self._cond = threading.Condition()
+        self._parser = NmapParser()
+
+    # ------------------------------------------------------------
+    # Running a scan
+    # ------------------------------------------------------------
+    def scan(
+        self,
+        handler: NmapHandler,
+        raw_sink: RawSink,
+        commands: Dict[int, str],
+        failed: Dict[int, List[str]],
+        on_host: Optional[Callable[[int, HostResult], None]] = None,
+        on_shard_done: Optional[Callable[[int], None]] = None,
+    ) -> List[HostResult]:
+        """
+        Distributes ``handler.plan_shards()`` and returns the unique hosts in
+        shard order, like a local sharded scan. ``commands``/``failed``
+        receive the command each unit ran and the targets of failed units;
+        ``on_shard_done`` is called for a unit once ``on_host`` saw its hosts.
+        At most ``handler.workers`` units are leased at the same time, so
+        ``handler.rate_limit`` stays a global budget across all workers.
+        """
+        shards = handler.plan_shards()
+        if not shards:
+            log.warning("No targets left to scan (all excluded, recently scanned or already done)")
+            return []
+
+        self.units = [WorkUnit(idx, targets) for idx, targets in enumerate(shards)]
+        self._results = {}
+        self._finishing = 0
+        self._raw_sink = raw_sink
+        self._commands = commands
+        self._failed = failed
+        self._on_host = on_host
+        self._on_shard_done = on_shard_done
+        self._max_leases = max(1, handler.workers)
+        self._controller = handler.rate_controller()
+        self._options = {
+            "ports": handler.ports,
+            "extra_args": handler.extra_args,
+            # Address excludes are already subtracted from the units, except
+            # where nmap itself expands a target (hostnames, nmap ranges)
+            "excludes": handler.nmap_excludes(),
+            "min_rate": split_rate(handler.min_rate, self._max_leases),
+            "host_timeout": handler.host_timeout,
+            "scan_timeout": handler.scan_timeout,
+            "reverse_dns": handler.reverse_dns,
+        }
+
+        server = self._make_server()
+        serve_thread = threading.Thread(target=server.serve_forever, name="coordinator", daemon=True)
+        serve_thread.start()
+        log.info(
+            f"Coordinator listening on {self.describe_address(server)}: "
+            f"{len(self.units)} work unit(s), up to {self._max_leases} at a time"
+        )
+        try:
+            with self._cond:
+                while self._finishing or not all(u.done for u in self.units):
+                    self._expire_leases()
+                    self._cond.wait(1.0)
+        finally:
+            server.shutdown()
+            server.server_close()
+            if self.kind == "unix":
+                try:
+                    os.unlink(self.address)
+                except OSError:
+                    pass
+
+        hosts: List[HostResult] = []
+        seen = set()
+        for idx in sorted(self._results):
+            for host in self._results[idx]:
+                # Overlapping units can report the same host twice
+                if host.ip != "unknown":
+                    if host.ip in seen:
+                        continue
+                    seen.add(host.ip)
+                hosts.append(host)
+
+        if failed and len(failed) == len(self.units) and not hosts:
+            raise NmapExecutionError(f"all {len(self.units)} work unit(s) failed")
+        log.info(f"Completed {len(self.units)} work unit(s), {len(failed)} of them incomplete")
+        return hosts
+
+    def describe_address(self, server: Optional[socketserver.BaseServer] = None) -> str:
+        if self.kind == "unix":
+            return f"unix:{self.address}"
+        host, port = server.server_address[:2] if server is not None else self.address
+        return f"{host}:{port}"
+
+    def _make_server(self) -> socketserver.BaseServer:
+        if self.kind == "unix":
+            if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+                raise OSError("Unix sockets are not supported on this platform")
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            server = socketserver.ThreadingUnixStreamServer(self.address, _ConnectionHandler)
+            server.daemon_threads = True
+        else:
+            server = _CoordinatorTCPServer(self.address, _ConnectionHandler)
+        server.coordinator = self
+        return server
+
+    # ------------------------------------------------------------
+    # Lease bookkeeping (called from connection threads)
+    # ------------------------------------------------------------
+    def challenge(self, hello: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Answer to a worker's hello (proving the token), or None to reject it."""
+        if hello is None or hello.get("type") != "hello" or not hello.get("nonce"):
+            return None
+        nonce = secrets.token_hex(16)
+        return {
+            "type": "challenge",
+            "nonce": nonce,
+            "proof": handshake_proof(self.token, "coordinator", str(hello["nonce"]), nonce),
+        }
+
+    def connect(
+        self,
+        hello: Dict[str, Any],
+        challenge: Dict[str, Any],
+        auth: Optional[Dict[str, Any]],
+        peer: str,
+    ) -> Optional[str]:
+        """Checks a worker's proof of the token; returns its unique id, or None to reject it."""
+        if auth is None or auth.get("type") != "auth":
+            return None
+        expected = handshake_proof(self.token, "worker", challenge["nonce"], str(hello["nonce"]))
+        if not _proof_matches(expected, auth.get("proof")):
+            return None
+        with self._cond:
+            self._connections += 1
+            worker = f"{hello.get('worker') or 'worker'}@{peer}#{self._connections}"
+            self._workers.add(worker)
+        return worker
+
+    def lease(self, worker: str) -> Dict[str, Any]:
+        """Next message for a worker asking for work."""
+        with self._cond:
+            if all(u.done for u in self.units):
+                return {"type": "done"}
+            leased = sum(1 for u in self.units if u.owner is not None)
+            pending = [u for u in self.units if not u.done and u.owner is None]
+            # Retries go to another worker, unless this one is all there is
+            unit = next((u for u in pending if worker not in u.failed_on), None)
+            if unit is None and pending and self._workers <= {worker}:
+                unit = pending[0]
+            if unit is None or leased >= self._max_leases:
+                return {"type": "wait", "seconds": 1}
+
+            unit.owner = worker
+            unit.attempts += 1
+            unit.expires = time.monotonic() + self.lease_seconds
+            unit.rate = self._controller.rate if self._controller else None
+            if self.progress is not None:
+                unit.progress = self.progress.scan_started(unit.targets)
+            log.info(
+                f"Unit {unit.idx} ({' '.join(unit.targets)}) -> {worker} "
+                f"(attempt {unit.attempts}/{self.max_attempts})"
+            )
+            return {
+                "type": "unit",
+                "id": unit.idx,
+                "targets": unit.targets,
+                "options": dict(self._options, max_rate=unit.rate),
+                "lease": self.lease_seconds,
+            }
+
+    def renew(self, worker: str, idx: int) -> None:
+        with self._cond:
+            unit = self._unit(idx)
+            if unit is not None and unit.owner == worker:
+                unit.expires = time.monotonic() + self.lease_seconds
+
+    def complete(self, worker: str, message: Dict[str, Any]) -> None:
+        """Takes in a worker's result for a unit."""
+        xml = message.get("xml") or ""
+        error = message.get("error")
+        hosts = self._parser.parse(xml) if "<host" in xml else []
+
+        with self._cond:
+            unit = self._unit(message.get("id"))
+            if unit is None or unit.done:
+                # Lease expired and someone else finished it first
+                log.info(f"Ignoring late result for unit {message.get('id')} from {worker}")
+                return
+            if unit.owner not in (worker, None):
+                log.info(f"Unit {unit.idx}: accepting result from {worker} after its lease expired")
+            unit.owner = None
+
+            if self._controller is not None:
+                report = CongestionReport(**message.get("congestion", {}))
+                self._controller.record(report, unit.rate)
+
+            if error and not hosts and unit.attempts < self.max_attempts:
+                log.warning(f"Unit {unit.idx} failed on {worker}, retrying: {error}")
+                unit.failed_on.add(worker)
+                self._finish_progress(unit, ok=False)
+                self._cond.notify_all()
+                return
+
+            if error:
+                log.warning(
+                    f"Unit {unit.idx} ({' '.join(unit.targets)}) failed on {worker}"
+                    + (f" after reporting {len(hosts)} host(s), keeping them" if hosts else "")
+                    + f": {error}"
+                )
+                self._failed[unit.idx] = unit.targets
+            if message.get("command"):
+                self._commands[unit.idx] = f"[{worker}] {message['command']}"
+            if unit.progress is not None:
+                for line in xml.splitlines():
+                    unit.progress.stdout_line(line)
+            self._finish_progress(unit, ok=not error)
+            self._results[unit.idx] = hosts
+            unit.done = True
+            self._finishing += 1
+
+        # Sinks may write files; keep them out of the lock
+        try:
+            if xml:
+                self._raw_sink(unit.idx, xml)
+            if self._on_host is not None:
+                for host in hosts:
+                    self._on_host(unit.idx, host)
+            if self._on_shard_done is not None:
+                self._on_shard_done(unit.idx)
+        finally:
+            with self._cond:
+                self._finishing -= 1
+                self._cond.notify_all()
+
+    def release(self, worker: str) -> None:
+        """A worker disconnected: its units go back to the queue."""
+        with self._cond:
+            self._workers.discard(worker)
+            for unit in self.units:
+                if unit.owner == worker and not unit.done:
+                    log.warning(f"Worker {worker} went away; unit {unit.idx} goes back to the queue")
+                    self._requeue(unit)
+            self._cond.notify_all()
+
+    def _expire_leases(self) -> None:
+        now = time.monotonic()
+        for unit in self.units:
+            if unit.owner is not None and not unit.done and unit.expires < now:
+                log.warning(f"Lease of unit {unit.idx} held by {unit.owner} expired")
+                self._requeue(unit)
+
+    def _requeue(self, unit: WorkUnit) -> None:
+        unit.owner = None
+        self._finish_progress(unit, ok=False)
+        if unit.attempts >= self.max_attempts:
+            log.warning(f"Unit {unit.idx} ({' '.join(unit.targets)}) failed {unit.attempts} time(s), giving up")
+            self._failed[unit.idx] = unit.targets
+            self._results[unit.idx] = []
+            unit.done = True
+
+    def _finish_progress(self, unit: WorkUnit, ok: bool) -> None:
+        if unit.progress is not None:
+            unit.progress.finish(ok=ok)
+            unit.progress = None
+
+    def _unit(self, idx: Any) -> Optional[WorkUnit]:
+        if isinstance(idx, int) and 0 <= idx < len(self.units):
+            return self.units[idx]
+        return None
+
+
+class _CoordinatorTCPServer(socketserver.ThreadingTCPServer):
+    # Restarting a coordinator must not wait for TIME_WAIT to clear
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _ConnectionHandler(socketserver.StreamRequestHandler):
+    """One worker connection on the coordinator side."""
+
+    def handle(self) -> None:
+        coordinator: Coordinator = self.server.coordinator
+        peer = _format_peer(self.client_address)
+        try:
+            hello = _read_message(self.rfile)
+            challenge = coordinator.challenge(hello)
+            if challenge is not None:
+                _send_message(self.wfile, challenge)
+                auth = _read_message(self.rfile)
+        except (OSError, ValueError):
+            return
+        # Unique per connection, so a reconnecting worker gets a fresh identity
+        worker = coordinator.connect(hello, challenge, auth, peer) if challenge else None
+        if worker is None:
+            log.warning(f"Rejected worker connection from {peer}")
+            return
+        log.info(f"Worker {worker} connected")
+        try:
+            while True:
+                message = _read_message(self.rfile)
+                if message is None:
+                    break
+                kind = message.get("type")
+                if kind == "request":
+                    reply = coordinator.lease(worker)
+                    _send_message(self.wfile, reply)
+                    if reply["type"] == "done":
+                        break
+                elif kind == "heartbeat":
+                    coordinator.renew(worker, message.get("id"))
+                elif kind == "result":
+                    coordinator.complete(worker, message)
+                    _send_message(self.wfile, {"type": "ack"})
+        except (OSError, ValueError) as e:
+            log.warning(f"Connection to worker {worker} lost: {e}")
+        finally:
+            coordinator.release(worker)
+
+
+# ------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------
+def run_worker(
+    address: str,
+    nmap_binary: str = "nmap",
+    token: Optional[str] = None,
+    name: Optional[str] = None,
+    connect_timeout: float = 30.0,
+    allow_nmap_args: bool = False,
+) -> int:
+    """
+    Connects to a coordinator and scans work units until it says done.
+
+    Retries connecting for up to ``connect_timeout`` seconds, so workers
+    can be started before the coordinator. With a ``token``, the
+    coordinator has to prove it knows the token before the worker takes
+    any unit. Units are checked before nmap runs (see :func:`check_unit`);
+    extra nmap arguments are only run with ``allow_nmap_args``. Returns
+    the number of units scanned.
+    """
+    name = name or socket.gethostname()
+    sock = _connect(address, connect_timeout)
+    rfile = sock.makefile("rb")
+    wfile = sock.makefile("wb")
+    send_lock = threading.Lock()
+
+    def send(message: Dict[str, Any]) -> None:
+        with send_lock:
+            _send_message(wfile, message)
+
+    scanned = 0
+    try:
+        nonce = secrets.token_hex(16)
+        send({"type": "hello", "worker": name, "nonce": nonce})
+        challenge = _read_message(rfile)
+        if challenge is None or challenge.get("type") != "challenge":
+            raise ValueError(f"coordinator at {address} did not answer the handshake")
+        expected = handshake_proof(token, "coordinator", nonce, str(challenge.get("nonce")))
+        if not _proof_matches(expected, challenge.get("proof")):
+            raise ValueError(f"coordinator at {address} could not prove the cluster token")
+        send({
+            "type": "auth",
+            "proof": handshake_proof(token, "worker", str(challenge.get("nonce")), nonce),
+        })
+        while True:
+            send({"type": "request"})
+            reply = _read_message(rfile)
+            if reply is None or reply.get("type") == "done":
+                break
+            if reply.get("type") == "wait":
+                time.sleep(float(reply.get("seconds", 1)))
+                continue
+
+            try:
+                check_unit(reply, allow_nmap_args)
+            except ValueError as e:
+                log.warning(f"Refusing unit {reply.get('id')}: {e}")
+                result = {"type": "result", "id": reply.get("id"), "xml": "",
+                          "error": f"refused by worker: {e}"}
+            else:
+                result = _scan_unit(reply, nmap_binary, send)
+            send(result)
+            if _read_message(rfile) is None:
+                break
+            scanned += 1
+    finally:
+        rfile.close()
+        wfile.close()
+        sock.close()
+
+    log.info(f"Worker {name} finished after {scanned} work unit(s)")
+    return scanned
+
+
+def check_unit(unit: Dict[str, Any], allow_nmap_args: bool = False) -> None:
+    """
+    Raises ValueError unless a work unit is safe to turn into an nmap
+    command line: only target specs as targets/excludes, well-formed
+    option values, and extra nmap arguments only if ``allow_nmap_args``.
+    """
+    options = unit.get("options")
+    if not isinstance(unit.get("targets"), list) or not isinstance(options, dict):
+        raise ValueError("malformed work unit")
+    excludes = options.get("excludes") or []
+    extra_args = options.get("extra_args") or []
+    for kind, values in (("target", unit["targets"]), ("exclude", excludes),
+                         ("nmap argument", extra_args)):
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError(f"malformed {kind} list")
+    check_target_items("target", unit["targets"])
+    check_target_items("exclude", excludes)
+    if extra_args and not allow_nmap_args:
+        raise ValueError(
+            f"extra nmap arguments {' '.join(extra_args)!r} are not allowed (--allow-nmap-args)"
+        )
+
+    ports = options.get("ports")
+    if ports is not None and not (isinstance(ports, str) and _PORTS_RE.match(ports)):
+        raise ValueError(f"invalid port spec {ports!r}")
+    host_timeout = options.get("host_timeout")
+    if host_timeout is not None and not is_nmap_time(str(host_timeout)):
+        raise ValueError(f"invalid host timeout {host_timeout!r}")
+    for key in ("max_rate", "min_rate", "scan_timeout"):
+        value = options.get(key)
+        if value is not None and (not isinstance(value, int) or value < 0):
+            raise ValueError(f"invalid {key} {value!r}")
+
+
+def _scan_unit(
+    unit: Dict[str, Any],
+    nmap_binary: str,
+    send: Callable[[Dict[str, Any]], None],
+) -> Dict[str, Any]:
+    """Runs nmap for one work unit and builds the result message."""
+    options = unit["options"]
+    handler = NmapHandler(
+        targets=unit["targets"],
+        ports=options.get("ports"),
+        rate_limit=options.get("max_rate"),
+        extra_args=options.get("extra_args"),
+        excludes=options.get("excludes"),
+        nmap_binary=nmap_binary,
+        min_rate=options.get("min_rate"),
+        host_timeout=options.get("host_timeout"),
+        scan_timeout=options.get("scan_timeout") or 0,
+    )
+    handler.reverse_dns = options.get("reverse_dns", True)
+    log.info(f"Scanning unit {unit['id']}: {' '.join(unit['targets'])}")
+
+    # Renew the lease well before it runs out while nmap is busy
+    stop = threading.Event()
+
+    def _heartbeat() -> None:
+        interval = max(1.0, float(unit.get("lease", DEFAULT_LEASE_SECONDS)) / 3)
+        while not stop.wait(interval):
+            try:
+                send({"type": "heartbeat", "id": unit["id"]})
+            except OSError:
+                return
+
+    beat = threading.Thread(target=_heartbeat, name="heartbeat", daemon=True)
+    beat.start()
+
+    lines: List[str] = []
+    error = None
+    try:
+        for line in handler.stream_scan():
+            lines.append(line)
+    except NmapExecutionError as e:
+        error = str(e).strip()
+    finally:
+        stop.set()
+        beat.join()
+
+    return {
+        "type": "result",
+        "id": unit["id"],
+        "xml": "".join(lines),
+        "command": " ".join(handler.build_command()),
+        "error": error,
+        "congestion": asdict(CongestionReport.from_xml("".join(lines))),
+    }
+
+
+def _connect(address: str, timeout: float) -> socket.socket:
+    kind, target = parse_address(address)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if kind == "unix":
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(target)
+                return sock
+            return socket.create_connection(target)
+        except OSError as e:
+            if time.monotonic() >= deadline:
+                raise OSError(f"cannot connect to coordinator at {address}: {e}") from e
+            time.sleep(1.0)
+
+
+# ------------------------------------------------------------
+# Framing
+# ------------------------------------------------------------
+def _send_message(wfile, message: Dict[str, Any]) -> None:
+    wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+    wfile.flush()
+
+
+def _read_message(rfile) -> Optional[Dict[str, Any]]:
+    """Next message, or None at end of stream. Raises ValueError on garbage."""
+    line = rfile.readline()
+    if not line:
+        return None
+    message = json.loads(line.decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("protocol error: expected a JSON object")
+    return message
+
+
+def _format_peer(peer: Any) -> str:
+    if isinstance(peer, tuple) and len(peer) >= 2:
+        return f"{peer[0]}:{peer[1]}"
+    return str(peer or "") or "local"
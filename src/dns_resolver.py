@@ -0,0 +1,338 @@
+"""
+dns_resolver.py – Batched, cached DNS resolution ahead of the nmap scan.
+
+nmap resolves hostname targets one at a time and, unless run with -n,
+does a reverse lookup for every host it reports. With a resolver stage:
+
+1. Hostname targets and excludes are resolved up front, concurrently,
+   against the system's DNS servers (cli._detect_system_dns_servers).
+2. nmap is handed plain addresses and runs with -n, so it sends no DNS
+   queries of its own and scan time no longer depends on DNS latency.
+3. Reported hosts get their hostname back from the forward lookups and,
+   optionally, from one batch of PTR lookups for the hosts found up.
+
+Answers are kept in a JSON cache file for as long as their TTL allows;
+names that do not exist are cached for NEGATIVE_TTL. Lookups use
+dnspython's asyncio resolver when it is installed and otherwise fall back
+to the system resolver on a thread pool (with DEFAULT_TTL).
+"""
+
+import asyncio
+import copy
+import json
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+try:  # optional dependency (requirements.txt)
+    import dns.asyncresolver
+    import dns.exception
+    import dns.resolver
+except ImportError:  # pragma: no cover - depends on the environment
+    dns = None
+
+from .cli import _detect_system_dns_servers
+from .nmap_handler import NmapHandler
+from .result_objects import HostResult
+from .targets import TargetSet, classify, split_items
+from .logger_setup import get_logger
+
+log = get_logger("dns_resolver")
+
+# TTL for answers from the system resolver, which does not report one
+DEFAULT_TTL = 300
+# How long "no such name" / "no PTR record" is remembered
+NEGATIVE_TTL = 300
+CACHE_VERSION = 1
+# nmap octet ranges (10.0.0.1-20, 10.0.*.1) look like hostnames to classify()
+_NMAP_RANGE_RE = re.compile(r"^[0-9.*-]+$")
+
+
+def default_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "sonartrace" / "dns-cache.json"
+
+
+class DnsCache:
+    """
+    TTL-aware cache of DNS answers, optionally persisted to a JSON file.
+
+    Keys are ``"A <name>"`` and ``"PTR <ip>"``; values are what the lookup
+    returned (an empty list/string for a negative answer). Thread-safe.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None) -> None:
+        self.path = Path(path) if path else None
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            log.warning(f"Ignoring unreadable DNS cache {self.path}: {e}")
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        now = time.time()
+        self._entries = {
+            key: (expires, value)
+            for key, (expires, value) in data.get("entries", {}).items()
+            if expires > now
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value, or None if unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                return None
+            return entry[1]
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + max(0.0, ttl), value)
+            self._dirty = True
+
+    def save(self) -> None:
+        """Writes the unexpired entries back to the cache file (if any)."""
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            data = {
+                "version": CACHE_VERSION,
+                "entries": {k: [e, v] for k, (e, v) in self._entries.items() if e > now},
+            }
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Write-then-rename so a crash never leaves a torn cache
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                tmp.write_text(json.dumps(data) + "\n", encoding="utf-8")
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except OSError as e:
+                log.warning(f"Could not write DNS cache {self.path}: {e}")
+
+
+class DnsResolver:
+    """
+    Concurrent forward (A) and reverse (PTR) lookups with caching.
+
+    :param servers: DNS servers to ask; defaults to the system's resolvers.
+    :param cache: Answer cache (default: in-memory only).
+    :param concurrency: Lookups in flight at the same time.
+    :param timeout: Seconds per lookup before it counts as failed.
+    :param ptr: Also look up PTR names for the hosts found up.
+    """
+
+    def __init__(
+        self,
+        servers: Optional[List[str]] = None,
+        cache: Optional[DnsCache] = None,
+        concurrency: int = 64,
+        timeout: float = 5.0,
+        ptr: bool = False,
+    ) -> None:
+        self.servers = list(servers) if servers else _detect_system_dns_servers()
+        self.cache = cache or DnsCache()
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.ptr = ptr
+
+    @property
+    def backend(self) -> str:
+        return "dnspython" if dns is not None else "system"
+
+    # ------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------
+    def resolve(self, names: Iterable[str]) -> Dict[str, List[str]]:
+        """IPv4 addresses of each name ([] if it does not exist or failed)."""
+        return self._lookup("A", names, self._forward_dnspython, self._forward_system)
+
+    def reverse(self, ips: Iterable[str]) -> Dict[str, str]:
+        """PTR name of each address ("" if there is none or the lookup failed)."""
+        return self._lookup("PTR", ips, self._reverse_dnspython, self._reverse_system)
+
+    def _lookup(self, rtype: str, items: Iterable[str], async_query, sync_query) -> Dict[str, Any]:
+        empty: Any = [] if rtype == "A" else ""
+        results: Dict[str, Any] = {}
+        missing: List[str] = []
+        for item in dict.fromkeys(items):
+            cached = self.cache.get(f"{rtype} {item}")
+            if cached is None:
+                missing.append(item)
+            else:
+                results[item] = cached
+
+        if missing:
+            started = time.perf_counter()
+            if dns is not None:
+                answers = asyncio.run(self._gather_async(missing, async_query))
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.concurrency, len(missing))) as pool:
+                    answers = dict(zip(missing, pool.map(sync_query, missing)))
+
+            failed = 0
+            for item, answer in answers.items():
+                if answer is None:
+                    # Timeout/SERVFAIL: not cached, so the next run asks again
+                    failed += 1
+                    results[item] = empty
+                    continue
+                value, ttl = answer
+                self.cache.put(f"{rtype} {item}", value, ttl)
+                results[item] = value
+            # Streaming reports label one host at a time; keep that quiet
+            (log.info if len(missing) > 1 else log.debug)(
+                f"DNS: {len(missing)} {rtype} lookup(s) in {time.perf_counter() - started:.2f}s "
+                f"via {self.backend}, {len(results) - len(missing)} cached"
+                + (f", {failed} failed" if failed else "")
+            )
+        self.cache.save()
+        return results
+
+    async def _gather_async(self, items: List[str], query) -> Dict[str, Any]:
+        resolver = dns.asyncresolver.Resolver(configure=not self.servers)
+        if self.servers:
+            resolver.nameservers = self.servers
+        resolver.lifetime = self.timeout
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def one(item: str) -> Tuple[str, Any]:
+            async with limit:
+                return item, await query(resolver, item)
+
+        return dict(await asyncio.gather(*(one(item) for item in items)))
+
+    @staticmethod
+    async def _forward_dnspython(resolver, name: str) -> Optional[Tuple[List[str], float]]:
+        try:
+            answer = await resolver.resolve(name, "A")
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return [], NEGATIVE_TTL
+        except dns.exception.DNSException:
+            return None
+        return sorted({r.address for r in answer}), answer.rrset.ttl
+
+    @staticmethod
+    async def _reverse_dnspython(resolver, ip: str) -> Optional[Tuple[str, float]]:
+        try:
+            answer = await resolver.resolve_address(ip)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return "", NEGATIVE_TTL
+        except dns.exception.DNSException:
+            return None
+        return answer[0].target.to_text(omit_final_dot=True), answer.rrset.ttl
+
+    @staticmethod
+    def _forward_system(name: str) -> Optional[Tuple[List[str], float]]:
+        try:
+            infos = socket.getaddrinfo(name, None, socket.AF_INET, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if e.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)):
+                return [], NEGATIVE_TTL
+            return None
+        return sorted({info[4][0] for info in infos}), DEFAULT_TTL
+
+    @staticmethod
+    def _reverse_system(ip: str) -> Optional[Tuple[str, float]]:
+        try:
+            return socket.gethostbyaddr(ip)[0], DEFAULT_TTL
+        except socket.herror:
+            return "", NEGATIVE_TTL
+        except OSError:
+            return None
+
+
+# ------------------------------------------------------------
+# Pipeline integration (see enumerator.enumerate_hosts)
+# ------------------------------------------------------------
+def resolve_handler(
+    handler: NmapHandler,
+    resolver: DnsResolver,
+) -> Tuple[NmapHandler, Dict[str, List[str]]]:
+    """
+    Returns a copy of ``handler`` that scans addresses instead of hostnames,
+    with nmap's own DNS resolution off (-n), plus the name -> addresses map.
+
+    Names that cannot be resolved are dropped with a warning; nmap could
+    not have scanned them either.
+    """
+    target_names = _hostnames(handler.targets)
+    names = resolver.resolve(target_names + list(handler.exclusions.hostnames))
+
+    resolved = copy.copy(handler)
+    resolved.reverse_dns = False
+    if target_names:
+        targets: List[str] = []
+        for item in handler.targets:
+            for part in split_items(item):
+                if part.lower() in names:
+                    targets.extend(names[part.lower()])
+                else:
+                    targets.append(part)
+        resolved.targets = targets
+
+    unresolved = [n for n in target_names if not names.get(n)]
+    if unresolved:
+        log.warning(f"Could not resolve {', '.join(unresolved)}; not scanned")
+
+    excluded = [ip for name in handler.exclusions.hostnames for ip in names.get(name, [])]
+    if handler.exclusions.hostnames:
+        resolved.exclusions = TargetSet(handler.exclusions.intervals()) | TargetSet.from_items(excluded)
+        lost = [n for n in handler.exclusions.hostnames if not names.get(n)]
+        if lost:
+            log.warning(f"Could not resolve excluded name(s) {', '.join(lost)}; they exclude nothing")
+    return resolved, names
+
+
+def label_hosts(
+    hosts: List[HostResult],
+    names: Dict[str, List[str]],
+    resolver: DnsResolver,
+) -> None:
+    """
+    Fills in hostnames nmap no longer reports under -n: the target name an
+    address was resolved from, else (with ``resolver.ptr``) its PTR name.
+    """
+    by_address: Dict[str, str] = {}
+    for name, addresses in names.items():
+        for ip in addresses:
+            by_address.setdefault(ip, name)
+
+    for host in hosts:
+        if not host.hostname and host.ip in by_address:
+            host.hostname = by_address[host.ip]
+
+    if resolver.ptr:
+        pending = [h for h in hosts if not h.hostname and h.is_up and h.ip != "unknown"]
+        ptr_names = resolver.reverse(h.ip for h in pending)
+        for host in pending:
+            host.hostname = ptr_names.get(host.ip, "")
+
+
+def _hostnames(targets: Iterable[str]) -> List[str]:
+    """Hostname targets (lower-cased, first-seen order)."""
+    found: List[str] = []
+    for item in targets:
+        for part in split_items(item):
+            try:
+                kind = classify(part)
+            except ValueError:
+                # Not something we can resolve (e.g. IPv6): left to nmap
+                continue
+            if kind == "dns" and not _NMAP_RANGE_RE.match(part):
+                found.append(part.lower())
+    return list(dict.fromkeys(found))
@@ -12,42 +12,664 @@ This file is intentionally used by __main__.py as the single
 enumeration entry point to avoid duplicated scan logic.
 """
 
-from typing import List, Tuple
+import copy
+import ipaddress
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .nmap_handler import NmapHandler, NmapExecutionError
+from .checkpoint import RunDirectory
+from .distributed import Coordinator
+from .dns_resolver import DnsResolver, label_hosts, resolve_handler
+from .fingerprint_cache import FingerprintCache
+from .metrics import RunMetrics, stage
 from .nmap_parser import NmapParser
+from .rate_control import CongestionMonitor
+from .result_objects import HostResult
+from .result_store import ResultStore, scan_profile
+from .targets import TargetSet, partition_targets
 from .windows_enum import WindowsEnumerator
 from .logger_setup import get_logger
 
 log = get_logger("enumerator")
 
+# Receives (shard index, raw XML text) as nmap output becomes available
+RawSink = Callable[[int, str], None]
+
+
+@dataclass
+class ShardLog:
+    """What happened to the shards of a scan; filled in while scanning."""
+    commands: Dict[int, str] = field(default_factory=dict)  # exact command per shard
+    failed: Dict[int, List[str]] = field(default_factory=dict)  # targets of failed shards
+
+    def failed_coverage(self) -> TargetSet:
+        """Targets of the shards that timed out or crashed (IPv4 and hostnames)."""
+        known, _ = partition_targets(t for targets in self.failed.values() for t in targets)
+        return TargetSet.from_items(known)
+
 
 def enumerate_hosts(
     handler: NmapHandler,
+    store: Optional[ResultStore] = None,
+    max_age: Optional[float] = None,
+    raw_sink: Optional[RawSink] = None,
+    staged: bool = False,
+    checkpoint: Optional[RunDirectory] = None,
+    coordinator: Optional[Coordinator] = None,
+    resolver: Optional[DnsResolver] = None,
+    fingerprints: Optional[FingerprintCache] = None,
 ) -> Tuple[List, str, str]:
     """
     Runs the full enumeration pipeline and returns:
     - Parsed HostResult objects
     - Raw Nmap XML output
     - Exact Nmap command used (string)
+
+    If a ResultStore is given, the scanned hosts are saved to it. With
+    ``max_age`` (seconds) set as well, the run is incremental: targets scanned
+    with the same port spec/nmap arguments within that window are skipped
+    and their stored results are returned instead.
+
+    If ``raw_sink`` is given, raw XML is handed to it as it arrives (e.g. to
+    write a sidecar file) instead of being collected, and "" is returned.
+
+    With ``staged`` the scan runs in three phases instead of one: a ping
+    sweep (-sn), a port scan of live hosts only, then version/OS detection
+    restricted to each host's open ports. See :func:`_run_staged`. A
+    ``fingerprints`` cache lets phase 3 skip hosts whose open ports have not
+    changed since they were last fingerprinted.
+
+    If the handler carries RunMetrics, each stage is timed and the hosts,
+    ports and SMB probes are counted.
+
+    A shard that times out or crashes does not fail the run: the hosts it
+    reported (plus the one it was writing, marked ``incomplete``) are kept
+    and a warning is logged. Its targets are left out of the store's
+    coverage and are not checkpointed, so they are scanned again next time.
+    Only when every shard fails without reporting any host is
+    NmapExecutionError raised.
+
+    With a ``coordinator``, the shards are scanned by remote workers (see
+    distributed.py) instead of local nmap processes. Everything else,
+    including checkpointing and the store, works the same way.
+
+    With a ``checkpoint`` run directory, every parsed host and every
+    completed shard is saved to it as soon as it is available. Shards that
+    a previous attempt completed are not scanned again; their saved
+    results are used instead. Not supported together with ``staged``.
+
+    With a ``resolver``, hostname targets and excludes are resolved in one
+    concurrent batch before scanning and nmap runs with -n; hostnames are
+    put back on the results afterwards (see dns_resolver.py).
     """
 
     log.info("Starting centralized enumeration pipeline")
+    started_at = time.time()
+    metrics = handler.metrics
 
-    # Run Nmap once
-    raw_xml_output = handler.run_scan()
+    names: Dict[str, List[str]] = {}
+    if resolver is not None:
+        with stage(metrics, "dns"):
+            handler, names = resolve_handler(handler, resolver)
 
-    # Capture the exact command used (rubric requirement)
-    executed_command = " ".join(handler.build_command())
+    cached: List[HostResult] = []
+    if store is not None and max_age is not None:
+        handler, cached = _apply_fresh_results(handler, store, max_age)
 
-    # Parse XML into HostResult objects
-    parser = NmapParser()
-    hosts = parser.parse(raw_xml_output)
+    raw_parts: Dict[int, List[str]] = {}
+
+    def _collect(shard_idx: int, text: str) -> None:
+        raw_parts.setdefault(shard_idx, []).append(text)
+
+    sink = raw_sink or _collect
+    shard_log = ShardLog()
 
-    # Perform Windows-specific enumeration
+    # Everything below is recorded against the scope before resuming
+    scope_handler = handler
+    resumed: List[HostResult] = []
+    on_host = None
+    on_shard_done = None
+    earlier_shards = 0
+    if checkpoint is not None:
+        earlier_shards = len(checkpoint.completed_shards())
+        handler, resumed = _resume_from(handler, checkpoint)
+        # Earlier attempts' XML goes first (negative indexes sort first)
+        previous_xml = checkpoint.completed_xml()
+        for i, text in enumerate(previous_xml):
+            sink(i - len(previous_xml), text)
+        checkpoint.begin(handler.plan_shards())
+        on_host = checkpoint.record_host
+        sink = _checkpointing_sink(checkpoint, sink, shard_log)
+        on_shard_done = _checkpointing_shard_done(checkpoint, shard_log)
+
+    with stage(metrics, "scan"):
+        if staged:
+            hosts, executed_command = _run_staged(handler, sink, shard_log, fingerprints)
+        elif coordinator is not None:
+            hosts = coordinator.scan(
+                handler, sink, shard_log.commands, shard_log.failed, on_host, on_shard_done
+            )
+            executed_command = _executed_commands(handler, shard_log.commands)
+        else:
+            # Capture the exact command(s) used (rubric requirement)
+            hosts = _scan_in_order(handler, sink, shard_log, on_host, on_shard_done)
+            executed_command = _executed_commands(handler, shard_log.commands)
+
+    incomplete = [h for h in hosts if h.incomplete]
+    if shard_log.failed or incomplete:
+        executed_command = (
+            f"(incomplete: {len(shard_log.failed)} nmap process(es) failed, "
+            f"{len(incomplete)} host(s) not fully scanned); {executed_command}"
+        )
+
+    if earlier_shards:
+        executed_command = (
+            f"(resumed: {earlier_shards} shard(s) completed in an earlier attempt, "
+            f"see {checkpoint.journal_path}); {executed_command}"
+        )
+    if resumed:
+        hosts = sorted(hosts + resumed, key=_ip_sort_key)
+
+    if resolver is not None:
+        with stage(metrics, "dns_labels"):
+            label_hosts(hosts, names, resolver)
+
+    # Windows enumeration probes all hosts concurrently in one batch
     win_enum = WindowsEnumerator()
-    win_enum.enumerate(hosts)
+    with stage(metrics, "windows_enum"):
+        win_enum.enumerate(hosts)
+
+    raw_xml_output = "\n".join("".join(raw_parts[i]) for i in sorted(raw_parts))
+
+    if store is not None:
+        target_set = scope_handler.target_set()
+        coverage = target_set - scope_handler.exclusions if target_set is not None else TargetSet()
+        # Unfinished targets must not count as fresh for --incremental
+        coverage = coverage - shard_log.failed_coverage()
+        incomplete_ips, _ = partition_targets(h.ip for h in incomplete if h.ip != "unknown")
+        coverage = coverage - TargetSet.from_items(incomplete_ips)
+        with stage(metrics, "store"):
+            store.record_scan(
+                [h for h in hosts if not h.incomplete],
+                coverage,
+                port_spec=scope_handler.ports,
+                nmap_args=scope_handler.extra_args,
+                command=executed_command,
+                started_at=started_at,
+            )
+
+    if metrics is not None:
+        for host in hosts:
+            _count_host(metrics, host)
+        metrics.count("hosts_cached", len(cached))
+        metrics.count("hosts_resumed", len(resumed))
+        metrics.count("smb_probes", win_enum.probes_run)
+
+    if cached:
+        # Interleave reused results with fresh ones in address order
+        hosts = sorted(hosts + cached, key=_ip_sort_key)
 
     log.info("Enumeration pipeline completed successfully")
 
-    return hosts, raw_xml_output, executed_command
\ No newline at end of file
+    return hosts, raw_xml_output, executed_command
+
+
+def _scan_in_order(
+    handler: NmapHandler,
+    raw_sink: RawSink,
+    shard_log: Optional[ShardLog] = None,
+    on_host: Optional[Callable[[int, HostResult], None]] = None,
+    on_shard_done: Optional[Callable[[int], None]] = None,
+) -> List[HostResult]:
+    """
+    Scan all shards and return the unique hosts in shard order.
+
+    ``on_host`` (if given) is called with (shard index, host) as each host
+    is parsed, e.g. to checkpoint it; ``on_shard_done`` with the shard
+    index once ``on_host`` has seen every host of that shard.
+    """
+    # Hosts are parsed while nmap is still running; sharded results are
+    # put back into shard order afterwards.
+    tagged = []
+    for shard_idx, host in _iter_unique_hosts(handler, raw_sink, shard_log, on_shard_done):
+        if on_host is not None:
+            on_host(shard_idx, host)
+        tagged.append((shard_idx, host))
+    tagged.sort(key=lambda item: item[0])
+    return [host for _, host in tagged]
+
+
+def _resume_from(
+    handler: NmapHandler,
+    checkpoint: RunDirectory,
+) -> Tuple[NmapHandler, List[HostResult]]:
+    """
+    Returns a copy of ``handler`` that skips the shards a previous attempt
+    completed, plus the saved results of those shards.
+    """
+    done = checkpoint.done_coverage()
+    _, done_nmap_only = partition_targets(
+        spec for entry in checkpoint.completed_shards() for spec in entry["targets"]
+    )
+    if not done and not done_nmap_only:
+        return handler, []
+
+    resumed = checkpoint.completed_hosts()
+    remaining = copy.copy(handler)
+    remaining.exclusions = handler.exclusions | done
+    if done_nmap_only:
+        # IPv6 targets cannot be excluded by address; drop the ones done
+        known, nmap_only = partition_targets(handler.targets)
+        remaining.targets = known + [t for t in nmap_only if t not in set(done_nmap_only)]
+    log.info(
+        f"Resuming from {checkpoint.path}: {len(checkpoint.completed_shards())} shard(s) "
+        f"already done, reusing {len(resumed)} saved host result(s)"
+    )
+    return remaining, resumed
+
+
+def _checkpointing_sink(
+    checkpoint: RunDirectory,
+    raw_sink: RawSink,
+    shard_log: ShardLog,
+) -> RawSink:
+    """
+    Raw sink that also saves each completed shard's XML to the run
+    directory. The shard is journaled as done later, by
+    :func:`_checkpointing_shard_done`, once its hosts are recorded.
+    """
+    def _sink(shard_idx: int, text: str) -> None:
+        # Sharded scans hand over each shard's XML once, after it finished;
+        # failed shards only have partial output and must run again
+        if shard_idx not in shard_log.failed:
+            checkpoint.save_shard_xml(shard_idx, text)
+        raw_sink(shard_idx, text)
+    return _sink
+
+
+def _checkpointing_shard_done(
+    checkpoint: RunDirectory,
+    shard_log: ShardLog,
+) -> Callable[[int], None]:
+    """Journals a shard after all of its hosts went through ``on_host``."""
+    def _done(shard_idx: int) -> None:
+        if shard_idx not in shard_log.failed:
+            checkpoint.shard_done(shard_idx)
+    return _done
+
+
+def _run_staged(
+    handler: NmapHandler,
+    raw_sink: RawSink,
+    shard_log: Optional[ShardLog] = None,
+    fingerprints: Optional[FingerprintCache] = None,
+) -> Tuple[List[HostResult], str]:
+    """
+    Multi-phase scan; returns the merged hosts and the commands that ran.
+
+    1. Discovery: ping sweep (-sn) over all targets
+    2. Ports: port scan (no -sV/-O) of live hosts only
+    3. Services: -sV/-O per group of hosts sharing the same open ports,
+       with -p restricted to exactly those ports
+
+    Phase 3 results replace the phase 2 ones; closed/filtered ports from
+    phase 2 are kept. Hosts without open ports skip phase 3 entirely, and so
+    do hosts whose services/OS ``fingerprints`` has for their open ports.
+
+    Failed nmap processes of every phase are added to ``shard_log``.
+    """
+    shard_log = shard_log if shard_log is not None else ShardLog()
+    commands: List[str] = []
+    next_idx = 0
+
+    def _phase_sink(base: int) -> RawSink:
+        return lambda shard_idx, text: raw_sink(base + shard_idx, text)
+
+    def _phase_hosts(phase_handler: NmapHandler) -> List[HostResult]:
+        nonlocal next_idx
+        shards = phase_handler.plan_shards()
+        if not shards:
+            return []
+        base, next_idx = next_idx, next_idx + len(shards)
+        phase_log = ShardLog()
+        hosts = _scan_in_order(phase_handler, _phase_sink(base), phase_log)
+        commands.append(_executed_commands(phase_handler, phase_log.commands))
+        shard_log.failed.update({base + i: t for i, t in phase_log.failed.items()})
+        return hosts
+
+    # ---------------- Phase 1: discovery ----------------
+    discovered = _phase_hosts(handler.for_phase("discovery"))
+    live = [h.ip for h in discovered if h.is_up and h.ip != "unknown"]
+    log.info(f"Discovery: {len(live)} live host(s)")
+    if not live:
+        return [], "; ".join(commands)
+
+    # ---------------- Phase 2: ports on live hosts ----------------
+    live_specs = TargetSet.from_items(live).to_specs()
+    port_hosts = _phase_hosts(handler.for_phase("ports", targets=live_specs))
+
+    # ---------------- Phase 3: services on open ports ----------------
+    profile = scan_profile(None, handler.extra_args)
+    groups: Dict[str, List[str]] = {}
+    reused = 0
+    for host in port_hosts:
+        spec = _open_port_spec(host)
+        if not spec:
+            continue
+        if fingerprints is not None and fingerprints.apply(host, profile):
+            reused += 1
+            continue
+        groups.setdefault(spec, []).append(host.ip)
+    detect = sum(len(v) for v in groups.values())
+    log.info(f"Port scan: {detect + reused} host(s) with open ports")
+    if fingerprints is not None:
+        log.info(f"Fingerprint cache: reusing {reused} host(s), detecting {detect}")
+        if handler.metrics is not None:
+            handler.metrics.count("fingerprints_reused", reused)
+
+    group_handlers = [
+        handler.for_phase("services", targets=TargetSet.from_items(ips).to_specs(), ports=spec)
+        for spec, ips in groups.items()
+    ]
+
+    def _scan_group(group_handler: NmapHandler) -> Tuple[str, bool]:
+        # run_scan already keeps partial output of hosts that were reported
+        try:
+            return group_handler.run_scan(), True
+        except NmapExecutionError as e:
+            log.warning(f"Service scan of {' '.join(group_handler.targets)} failed: {e}")
+            return e.partial_output, False
+
+    detailed: Dict[str, HostResult] = {}
+    if group_handlers:
+        parser = NmapParser()
+        with ThreadPoolExecutor(max_workers=min(handler.workers, len(group_handlers))) as pool:
+            outputs = list(pool.map(_scan_group, group_handlers))
+
+        for i, (group_handler, (xml, ok)) in enumerate(zip(group_handlers, outputs)):
+            commands.append(describe_command(group_handler))
+            if not ok:
+                shard_log.failed[next_idx + i] = group_handler.targets
+            if xml:
+                raw_sink(next_idx + i, xml)
+            for host in parser.parse(xml):
+                detailed[host.ip] = host
+                if fingerprints is not None:
+                    fingerprints.store(host, profile)
+        if fingerprints is not None:
+            fingerprints.save()
+
+    merged: List[HostResult] = []
+    for host in port_hosts:
+        final = detailed.get(host.ip)
+        if final is None:
+            merged.append(host)
+            continue
+        known = {(p.port, p.protocol) for p in final.ports}
+        final.ports.extend(p for p in host.ports if (p.port, p.protocol) not in known)
+        merged.append(final)
+
+    executed = "; ".join(commands)
+    if reused:
+        executed = f"(fingerprints of {reused} host(s) reused from cache); {executed}"
+    return merged, executed
+
+
+def _open_port_spec(host: HostResult) -> str:
+    """nmap -p spec for a host's open ports, e.g. "T:22,80,U:161"."""
+    parts = []
+    for proto, prefix in (("tcp", "T:"), ("udp", "U:")):
+        ports = sorted({p.port for p in host.ports if p.protocol == proto and p.state == "open"})
+        if ports:
+            parts.append(prefix + ",".join(str(p) for p in ports))
+    return ",".join(parts)
+
+
+def _count_host(metrics: RunMetrics, host: HostResult) -> None:
+    metrics.count("hosts")
+    metrics.count("hosts_up", int(host.is_up))
+    metrics.count("ports", len(host.ports))
+    metrics.count("open_ports", sum(1 for p in host.ports if p.state == "open"))
+
+
+def _ip_sort_key(host: HostResult) -> Tuple[int, int]:
+    """Sort key placing hosts in IPv4 order (unparseable addresses last)."""
+    try:
+        return 0, int(ipaddress.IPv4Address(host.ip))
+    except ValueError:
+        return 1, 0
+
+
+def _apply_fresh_results(
+    handler: NmapHandler,
+    store: ResultStore,
+    max_age: float,
+) -> Tuple[NmapHandler, List[HostResult]]:
+    """
+    Returns a copy of ``handler`` that skips recently scanned addresses,
+    plus the stored results for those addresses.
+    """
+    target_set = handler.target_set()
+    if target_set is None:
+        return handler, []
+
+    profile = scan_profile(handler.ports, handler.extra_args)
+    fresh = store.fresh_coverage(profile, max_age)
+    if not fresh:
+        return handler, []
+
+    in_scope = target_set - handler.exclusions
+    cached = [h for h in store.load_hosts(profile, max_age, within=in_scope) if h.ip in fresh]
+
+    # Fresh addresses are treated like extra exclusions for this run
+    incremental = copy.copy(handler)
+    incremental.exclusions = handler.exclusions | fresh
+
+    skipped = in_scope.address_count() - (in_scope - fresh).address_count()
+    log.info(
+        f"Incremental mode: skipping {skipped} recently scanned address(es), "
+        f"reusing {len(cached)} stored host result(s)"
+    )
+    return incremental, cached
+
+
+def iter_hosts(
+    handler: NmapHandler,
+    raw_sink: Optional[RawSink] = None,
+    resolver: Optional[DnsResolver] = None,
+    names: Optional[Dict[str, List[str]]] = None,
+) -> Iterator[HostResult]:
+    """
+    Streaming variant of :func:`enumerate_hosts`.
+
+    Yields each HostResult (already Windows-enumerated) as soon as nmap
+    reports it, so reporting can start before the scan has finished.
+    For sharded scans, hosts arrive in shard completion order.
+
+    With a ``resolver``, ``handler`` and ``names`` are expected to come from
+    :func:`dns_resolver.resolve_handler` (so the caller knows the command
+    before the scan starts); hosts are labelled as they arrive.
+    """
+    win_enum = WindowsEnumerator()
+    metrics = handler.metrics
+
+    def _labelled() -> Iterator[HostResult]:
+        for _, host in _iter_unique_hosts(handler, raw_sink):
+            if resolver is not None:
+                # PTR lookups go one host at a time here (still cached)
+                label_hosts([host], names or {}, resolver)
+            yield host
+
+    # SMB probes of consecutive hosts overlap on one background loop
+    for host in win_enum.enumerate_stream(_labelled()):
+        if metrics is not None:
+            _count_host(metrics, host)
+        yield host
+
+    if metrics is not None:
+        metrics.count("smb_probes", win_enum.probes_run)
+
+
+def _executed_commands(handler: NmapHandler, commands: Dict[int, str]) -> str:
+    """Commands recorded while scanning (rates may have adapted), else the plan."""
+    if not commands:
+        return describe_command(handler)
+    return "; ".join(commands[i] for i in sorted(commands))
+
+
+def describe_command(handler: NmapHandler) -> str:
+    """Human-readable form of the nmap command(s) a handler runs."""
+    shards = handler.plan_shards()
+    if not shards:
+        return "(not run: no targets left to scan)"
+    if not handler.is_sharded:
+        return " ".join(handler.build_command())
+    return "; ".join(" ".join(handler.build_command(s)) for s in shards)
+
+
+def _iter_unique_hosts(
+    handler: NmapHandler,
+    raw_sink: Optional[RawSink],
+    shard_log: Optional[ShardLog] = None,
+    on_shard_done: Optional[Callable[[int], None]] = None,
+) -> Iterator[Tuple[int, HostResult]]:
+    """Yield (shard index, host) pairs, keeping the first result per IP."""
+    seen = set()
+
+    for shard_idx, host in _iter_shard_hosts(handler, raw_sink, shard_log, on_shard_done):
+        # Overlapping shards/targets can report the same host twice
+        if host.ip != "unknown":
+            if host.ip in seen:
+                continue
+            seen.add(host.ip)
+
+        yield shard_idx, host
+
+
+def _iter_shard_hosts(
+    handler: NmapHandler,
+    raw_sink: Optional[RawSink],
+    shard_log: Optional[ShardLog] = None,
+    on_shard_done: Optional[Callable[[int], None]] = None,
+) -> Iterator[Tuple[int, HostResult]]:
+    """
+    Stream-parse nmap output, running shards concurrently if configured.
+
+    With a rate limit, each shard starts at the rate the RateController
+    currently allows and reports its congestion signals back when done.
+    ``shard_log`` (if given) receives the exact command line of each shard
+    and the shards that failed. A failed shard's hosts are still yielded;
+    NmapExecutionError is only raised if no shard reported any host.
+    ``on_shard_done`` (if given) is called with a shard's index after the
+    consumer has taken all of that shard's hosts.
+    """
+    parser = NmapParser()
+    shard_log = shard_log if shard_log is not None else ShardLog()
+
+    shards = handler.plan_shards()
+    if not shards:
+        log.warning("No targets left to scan (all excluded, recently scanned or already done)")
+        return
+
+    if not handler.is_sharded:
+        lines: Iterable[str] = handler.stream_scan()
+        if raw_sink:
+            lines = _tee(lines, lambda text: raw_sink(0, text))
+        found = 0
+        try:
+            for host in parser.iter_parse(lines):
+                found += 1
+                yield 0, host
+        except NmapExecutionError as e:
+            shard_log.failed[0] = shards[0]
+            if not found:
+                raise
+            log.warning(f"nmap failed after reporting {found} host(s), keeping them: {str(e).strip()}")
+        if on_shard_done is not None:
+            on_shard_done(0)
+        return
+
+    results: "queue.Queue[Tuple[int, Optional[HostResult]]]" = queue.Queue()
+    errors: Dict[int, Exception] = {}
+    controller = handler.rate_controller()
+
+    def _scan_shard(shard_idx: int, shard: List[str]) -> None:
+        buf: List[str] = []
+        monitor = CongestionMonitor() if controller else None
+        rate = controller.rate if controller else None
+        try:
+            shard_log.commands[shard_idx] = " ".join(handler.build_command(shard, rate))
+            lines = handler.stream_scan(targets=shard, max_rate=rate)
+            if raw_sink:
+                lines = _tee(lines, buf.append)
+            if monitor:
+                lines = _tee(lines, monitor.feed)
+            # A truncated shard still yields its complete hosts first
+            for host in parser.iter_parse(lines):
+                results.put((shard_idx, host))
+        except Exception as e:  # surfaced in the consumer thread below
+            errors[shard_idx] = e
+            shard_log.failed[shard_idx] = shard
+        finally:
+            if controller:
+                controller.record(monitor.report(), rate)
+
+        try:
+            if raw_sink and buf:
+                raw_sink(shard_idx, "".join(buf))
+        except Exception as e:
+            errors.setdefault(shard_idx, e)
+            shard_log.failed[shard_idx] = shard
+        finally:
+            # None marks the shard as finished
+            results.put((shard_idx, None))
+
+    pool = ThreadPoolExecutor(max_workers=min(handler.workers, len(shards)))
+    try:
+        for shard_idx, shard in enumerate(shards):
+            pool.submit(_scan_shard, shard_idx, shard)
+
+        remaining = len(shards)
+        found: Dict[int, int] = {}
+        while remaining:
+            shard_idx, host = results.get()
+            if host is not None:
+                found[shard_idx] = found.get(shard_idx, 0) + 1
+                yield shard_idx, host
+                continue
+
+            remaining -= 1
+            if on_shard_done is not None:
+                on_shard_done(shard_idx)
+            error = errors.get(shard_idx)
+            if error is not None:
+                kept = found.get(shard_idx, 0)
+                log.warning(
+                    f"Shard {' '.join(shards[shard_idx])} failed"
+                    + (f" after reporting {kept} host(s), keeping them" if kept else "")
+                    + f": {str(error).strip()}"
+                )
+
+        if errors and len(errors) == len(shards) and not found:
+            first = min(errors)
+            raise NmapExecutionError(
+                f"all {len(shards)} shard(s) failed, e.g. {' '.join(shards[first])}: {errors[first]}"
+            ) from errors[first]
+
+        if errors:
+            log.warning(f"Completed {len(shards)} shard(s), {len(errors)} of them incomplete")
+        else:
+            log.info(f"Completed {len(shards)} shard(s)")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _tee(lines: Iterable[str], sink: Callable[[str], None]) -> Iterator[str]:
+    """Pass lines through unchanged while also handing them to ``sink``."""
+    for line in lines:
+        sink(line)
+        yield line
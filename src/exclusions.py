@@ -0,0 +1,51 @@
+"""
+exclusions.py – Loads out-of-scope hosts/networks and indexes them for fast subtraction.
+
+Excludes come from -x/--exclude values and from exclude files. They are
+indexed as a TargetSet (sorted, merged integer intervals), so thousands of
+entries can be removed from the target set before any nmap process starts.
+Entries a TargetSet cannot hold (IPv6 addresses and networks) are left to
+nmap's --exclude.
+"""
+
+import ipaddress
+from pathlib import Path
+from typing import Iterable, List, Tuple, Union
+
+from .targets import TargetSet, partition_targets, split_items
+
+
+def read_exclude_file(path: Union[str, Path]) -> List[str]:
+    """
+    Reads exclusions from a text file.
+    - One or more comma-separated entries per line
+    - Blank lines and anything after '#' are ignored
+    """
+    entries: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0]
+            entries.extend(split_items(line))
+    return entries
+
+
+def load_excludes(
+    values: Iterable[str] = (),
+    files: Iterable[Union[str, Path]] = (),
+) -> Tuple[TargetSet, List[str]]:
+    """
+    Combines command-line excludes and exclude files into one TargetSet,
+    plus the entries only nmap can apply (IPv6), unchanged.
+    Raises ValueError for entries that are none of IPs, CIDRs or hostnames.
+    """
+    entries = list(values)
+    for path in files:
+        entries.extend(read_exclude_file(path))
+
+    indexed, nmap_only = partition_targets(entries)
+    for item in nmap_only:
+        try:
+            ipaddress.ip_network(item, strict=False)
+        except ValueError:
+            raise ValueError(f"Unrecognized target: {item}") from None
+    return TargetSet.from_items(indexed), nmap_only
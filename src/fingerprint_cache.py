@@ -0,0 +1,181 @@
+"""
+fingerprint_cache.py – Reuse of -sV/-O results for unchanged endpoints.
+
+Version and OS detection are by far the slowest part of a scan, and on
+recurring scans they mostly rediscover what the previous run already
+found. In a staged scan (see enumerator._run_staged) the cheap port scan
+tells us which ports each host has open before detection runs; if a host
+still has exactly the same open ports as when it was last fingerprinted,
+with the same nmap arguments, its services and OS are taken from this
+cache and the host is left out of the detection phase.
+
+Entries expire after ``ttl`` seconds, and at most ``max_entries`` hosts are
+kept (least recently used are dropped first). The cache can be persisted
+to a JSON file so it carries over between runs.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .result_objects import HostResult
+from .logger_setup import get_logger
+
+log = get_logger("fingerprint_cache")
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 100_000
+CACHE_VERSION = 1
+
+
+def open_port_signature(host: HostResult) -> str:
+    """Liveness signature of a host: its sorted open ports, e.g. "tcp/22,tcp/80,udp/161"."""
+    return ",".join(
+        f"{p.protocol}/{p.port}"
+        for p in sorted(host.ports, key=lambda p: (p.protocol, p.port))
+        if p.state == "open"
+    )
+
+
+class FingerprintCache:
+    """
+    TTL- and LRU-bounded cache of per-host service/OS fingerprints.
+
+    An entry is only returned for the same address, open-port signature
+    and scan profile (see result_store.scan_profile) it was stored with.
+    Thread-safe, so a long-running daemon can share one across jobs.
+
+    :param path: JSON file to load from and save to (None: memory only).
+    :param ttl: Seconds an entry stays valid.
+    :param max_entries: Hosts kept before the least recently used go.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        # ip -> (expires, signature, profile, fingerprint), in LRU order
+        self._entries: "OrderedDict[str, Tuple[float, str, str, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            log.warning(f"Ignoring unreadable fingerprint cache {self.path}: {e}")
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        now = time.time()
+        # Saved oldest-used first, so the LRU order survives the round trip
+        for ip, expires, signature, profile, fingerprint in data.get("entries", []):
+            if expires > now:
+                self._entries[ip] = (expires, signature, profile, fingerprint)
+        self._evict()
+
+    # ------------------------------------------------------------
+    # Lookup / update
+    # ------------------------------------------------------------
+    def apply(self, host: HostResult, profile: str) -> bool:
+        """
+        Fills in ``host``'s services and OS from the cache.
+
+        Returns False (and leaves ``host`` untouched) unless there is an
+        unexpired entry with the host's current open-port signature.
+        """
+        signature = open_port_signature(host)
+        with self._lock:
+            entry = self._entries.get(host.ip)
+            if (
+                entry is None
+                or entry[0] <= time.time()
+                or entry[1] != signature
+                or entry[2] != profile
+            ):
+                self.misses += 1
+                return False
+            self._entries.move_to_end(host.ip)
+            self.hits += 1
+            fingerprint = entry[3]
+
+        services = fingerprint["services"]
+        for port in host.ports:
+            known = services.get(f"{port.protocol}/{port.port}")
+            if known is not None and port.state == "open":
+                port.service, port.product, port.version = known
+        host.os_name = fingerprint["os_name"]
+        host.os_accuracy = fingerprint["os_accuracy"]
+        host.scripts = dict(fingerprint["scripts"])
+        host.regex_parsed = {k: list(v) for k, v in fingerprint["regex_parsed"].items()}
+        return True
+
+    def store(self, host: HostResult, profile: str) -> None:
+        """Remembers the fingerprint of a host that was just fully detected."""
+        if host.incomplete or host.ip == "unknown":
+            return
+        fingerprint = {
+            "services": {
+                f"{p.protocol}/{p.port}": [p.service, p.product, p.version]
+                for p in host.ports
+                if p.state == "open"
+            },
+            "os_name": host.os_name,
+            "os_accuracy": host.os_accuracy,
+            "scripts": dict(host.scripts),
+            "regex_parsed": {k: list(v) for k, v in host.regex_parsed.items()},
+        }
+        entry = (time.time() + self.ttl, open_port_signature(host), profile, fingerprint)
+        with self._lock:
+            self._entries[host.ip] = entry
+            self._entries.move_to_end(host.ip)
+            self._dirty = True
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------
+    def save(self) -> None:
+        """Writes the unexpired entries back to the cache file (if any)."""
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            entries: List[list] = [
+                [ip, expires, signature, profile, fingerprint]
+                for ip, (expires, signature, profile, fingerprint) in self._entries.items()
+                if expires > now
+            ]
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                tmp.write_text(
+                    json.dumps({"version": CACHE_VERSION, "entries": entries}) + "\n",
+                    encoding="utf-8",
+                )
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except OSError as e:
+                log.warning(f"Could not write fingerprint cache {self.path}: {e}")
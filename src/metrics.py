@@ -0,0 +1,185 @@
+"""
+metrics.py – Per-stage timing and resource metrics for a SonarTrace run.
+
+Records, for every pipeline stage (scan, Windows enumeration, store,
+report): wall time, CPU time of this process and its peak RSS. For every
+nmap process: wall time, how long was spent waiting on nmap versus parsing
+its output, and nmap's own CPU time and peak RSS. Plus counters for hosts,
+ports and SMB probes.
+
+After a run the metrics can be exported as JSON and as a Prometheus
+textfile-collector file (node_exporter --collector.textfile.directory).
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Union
+
+try:  # not available on Windows
+    import resource
+except ImportError:  # pragma: no cover - platform dependent
+    resource = None
+
+PROM_PREFIX = "sonartrace"
+
+COUNTER_HELP = {
+    "hosts": "Hosts in the results.",
+    "hosts_up": "Hosts reported up.",
+    "hosts_cached": "Hosts reused from the result store.",
+    "hosts_resumed": "Hosts reused from a checkpointed earlier attempt.",
+    "ports": "Ports in the results.",
+    "open_ports": "Open ports in the results.",
+    "smb_probes": "SMB/NetBIOS probes attempted.",
+}
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far, if the platform reports it."""
+    if resource is None:
+        return None
+    return _maxrss_to_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def child_usage(pid: int) -> Optional[tuple]:
+    """
+    Reaps child ``pid`` and returns (exit status, CPU seconds, peak RSS bytes),
+    or None where os.wait4 is unavailable.
+    """
+    if not hasattr(os, "wait4"):
+        return None
+    _, status, usage = os.wait4(pid, 0)
+    return status, usage.ru_utime + usage.ru_stime, _maxrss_to_bytes(usage.ru_maxrss)
+
+
+def _maxrss_to_bytes(maxrss: int) -> int:
+    # ru_maxrss is in kilobytes on Linux/BSD but in bytes on macOS
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+class RunMetrics:
+    """Collects the metrics of one run. Thread-safe."""
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.scans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as pipeline stage ``name``."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record = {
+                "wall_seconds": round(time.perf_counter() - wall, 6),
+                "cpu_seconds": round(time.process_time() - cpu, 6),
+                "peak_rss_bytes": peak_rss_bytes(),
+            }
+            with self._lock:
+                self.stages[name] = record
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_scan(self, **fields: Any) -> None:
+        """Adds the metrics of one nmap process (see NmapHandler.stream_scan)."""
+        with self._lock:
+            self.scans.append(fields)
+
+    # ------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "wall_seconds": round(time.perf_counter() - self._start, 6),
+                "peak_rss_bytes": peak_rss_bytes(),
+                "stages": dict(self.stages),
+                "counters": dict(self.counters),
+                "scans": list(self.scans),
+            }
+
+    def write_json(self, path: Union[str, Path]) -> None:
+        _write_atomic(Path(path), json.dumps(self.to_dict(), indent=2) + "\n")
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (per-stage series, shard totals)."""
+        data = self.to_dict()
+        lines: List[str] = []
+
+        def metric(name: str, help_text: str, samples: List[tuple]) -> None:
+            samples = [(labels, value) for labels, value in samples if value is not None]
+            if not samples:
+                return
+            full = f"{PROM_PREFIX}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} gauge")
+            for labels, value in samples:
+                label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{full}{{{label_str}}} {value}" if label_str else f"{full} {value}")
+
+        metric("run_start_timestamp_seconds", "Unix time the run started.",
+               [({}, data["started_at"])])
+        metric("run_wall_seconds", "Wall-clock duration of the run.", [({}, data["wall_seconds"])])
+        metric("run_peak_rss_bytes", "Peak resident set size of the SonarTrace process.",
+               [({}, data["peak_rss_bytes"])])
+
+        stages = data["stages"]
+        for key, help_text in (
+            ("wall_seconds", "Wall-clock time per pipeline stage."),
+            ("cpu_seconds", "CPU time of the SonarTrace process per pipeline stage."),
+            ("peak_rss_bytes", "Process peak RSS at the end of each pipeline stage."),
+        ):
+            metric(f"stage_{key}", help_text,
+                   [({"stage": name}, stage[key]) for name, stage in stages.items()])
+
+        scans = data["scans"]
+        metric("scans", "Number of nmap processes run.", [({}, len(scans))])
+        metric("scans_failed", "Number of nmap processes that failed.",
+               [({}, sum(1 for s in scans if not s.get("ok")))])
+        for key, help_text in (
+            ("wall_seconds", "Wall-clock time of all nmap processes, summed."),
+            ("nmap_wait_seconds", "Time spent waiting for nmap output, summed."),
+            ("parse_seconds", "Time spent consuming (parsing) nmap output, summed."),
+            ("nmap_cpu_seconds", "CPU time used by the nmap processes, summed."),
+        ):
+            values = [s[key] for s in scans if s.get(key) is not None]
+            metric(f"scan_{key}_sum", help_text, [({}, round(sum(values), 6) if values else None)])
+        slowest = [s["wall_seconds"] for s in scans]
+        metric("scan_wall_seconds_max", "Wall-clock time of the slowest nmap process.",
+               [({}, max(slowest) if slowest else None)])
+
+        for name, value in sorted(data["counters"].items()):
+            metric(name, COUNTER_HELP.get(name, f"Run counter {name}."), [({}, value)])
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Union[str, Path]) -> None:
+        _write_atomic(Path(path), self.to_prometheus())
+
+
+def stage(metrics: Optional[RunMetrics], name: str) -> ContextManager:
+    """``metrics.stage(name)``, or a no-op when metrics are not collected."""
+    return metrics.stage(name) if metrics is not None else nullcontext()
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    # The textfile collector may read at any time; never expose a partial file
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
@@ -1,9 +1,48 @@
+import copy
+import os
+import re
+import shlex
 import subprocess
-from typing import Iterable, List, Optional
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from .exclusions import load_excludes
+from .metrics import RunMetrics, child_usage
+from .progress import ProgressTracker
+from .rate_control import RateController, split_rate
+from .targets import TargetSet, partition_targets
+from .logger_setup import get_logger
+
+log = get_logger("nmap_handler")
 
 
 class NmapExecutionError(RuntimeError):
-    """Raised when the nmap subprocess fails."""
+    """Raised when the nmap subprocess fails.
+
+    ``partial_output`` holds whatever XML nmap wrote before it failed
+    (possibly truncated, see :meth:`NmapParser.iter_parse`).
+    """
+
+    def __init__(self, message: str, partial_output: str = "") -> None:
+        super().__init__(message)
+        self.partial_output = partial_output
+
+
+# Scan phases for staged pipelines (see enumerator.enumerate_hosts):
+# "full" is the classic single-pass scan, the others split it into steps.
+PHASES = ("full", "discovery", "ports", "services")
+
+SCAN_TYPE_ARGS = ("-sS", "-sT", "-sU")
+DETECTION_ARGS = ("-sV", "-O", "-A", "-sC")
+
+# nmap <time> values (--host-timeout etc.): a number with an optional unit
+_NMAP_TIME_RE = re.compile(r"^\d+(\.\d+)?(ms|s|m|h)?$")
+
+
+def is_nmap_time(value: str) -> bool:
+    """True for values nmap accepts as a time, e.g. "900", "90s", "15m"."""
+    return bool(_NMAP_TIME_RE.match(value))
 
 
 class NmapHandler:
@@ -11,6 +50,27 @@ class NmapHandler:
 
     It always runs nmap with XML output to stdout (-oX -) so that it can be
     parsed by :class:`NmapParser`.
+
+    Excludes (``excludes`` and ``exclude_files``) are subtracted from the
+    targets client-side; only hostname and IPv6 excludes are left to nmap,
+    unless some target only nmap can expand (a hostname or an nmap range),
+    in which case every exclude is passed to nmap as well.
+
+    When ``shard_prefix`` or ``shard_size`` is set, the target list is split
+    into shards that are scanned by a bounded pool of concurrent nmap
+    processes (see :func:`enumerator.enumerate_hosts`).
+
+    ``rate_limit``/``min_rate`` are global packets-per-second bounds. They
+    become nmap's --max-rate/--min-rate, split evenly across the nmap
+    processes that may run at the same time.
+
+    With a ``progress`` tracker, nmap runs with --stats-every and every
+    scan reports its progress to the tracker while it runs. With
+    ``metrics``, every nmap process records its timing and resource use.
+
+    ``host_timeout`` (nmap time spec, e.g. "15m") makes nmap give up on
+    single slow hosts; ``scan_timeout`` (seconds) is the default deadline
+    for each nmap process. Hosts finished before either fires are kept.
     """
 
     def __init__(
@@ -20,68 +80,384 @@ class NmapHandler:
         rate_limit: Optional[int] = None,
         extra_args: Optional[List[str]] = None,
         excludes: Optional[Iterable[str]] = None,
+        shard_prefix: Optional[int] = None,
+        shard_size: Optional[int] = None,
+        workers: int = 1,
+        exclude_files: Optional[Iterable[str]] = None,
+        nmap_binary: str = "nmap",
+        min_rate: Optional[int] = None,
+        progress: Optional[ProgressTracker] = None,
+        metrics: Optional[RunMetrics] = None,
+        host_timeout: Optional[str] = None,
+        scan_timeout: int = 0,
     ) -> None:
         self.targets = list(targets)
         self.ports = ports
         self.rate_limit = rate_limit
+        self.min_rate = min_rate
         self.extra_args = extra_args or []
         self.excludes = list(excludes) if excludes else []
+        self.exclude_files = list(exclude_files) if exclude_files else []
+        # Interval index of every exclude (raises ValueError on bad entries),
+        # and the excludes it cannot hold (IPv6), which go to nmap as they are
+        self.exclusions, self.nmap_only_excludes = load_excludes(
+            self.excludes, self.exclude_files
+        )
+        self.shard_prefix = shard_prefix
+        self.shard_size = shard_size
+        self.workers = max(1, workers)
+        # Command used to invoke nmap; may include arguments (e.g. a stand-in
+        # like "python -m benchmarks.fake_nmap --fake-rate 100")
+        self.nmap_binary = nmap_binary
+        self.phase = "full"
+        self.progress = progress
+        self.metrics = metrics
+        self.host_timeout = host_timeout
+        self.scan_timeout = scan_timeout
+        # False once targets were resolved up front (dns_resolver): run with -n
+        self.reverse_dns = True
 
-    def build_command(self) -> List[str]:
-        cmd: List[str] = ["nmap", "-oX", "-"]
+    @property
+    def is_sharded(self) -> bool:
+        """True if the scan should be split across several nmap processes."""
+        return self.shard_prefix is not None or self.shard_size is not None
 
-        # Reasonable defaults: service detection + OS detection in one pass
-        # can be slow, but good for a final project.
-        if not any(a in ("-sS", "-sT", "-sU", "-sV") for a in self.extra_args):
-            cmd.extend(["-sS", "-sV"])
-        if "-O" not in self.extra_args and "-A" not in self.extra_args:
-            cmd.append("-O")
+    @property
+    def concurrency(self) -> int:
+        """How many nmap processes of this handler may run at the same time."""
+        if self.is_sharded or self.phase == "services":
+            return self.workers
+        return 1
 
-        if self.ports:
+    def rate_controller(self) -> Optional[RateController]:
+        """Adaptive per-shard rate under ``rate_limit``, or None without one."""
+        if self.rate_limit is None:
+            return None
+        return RateController(self.rate_limit, self.concurrency, self.min_rate)
+
+    def build_command(
+        self,
+        targets: Optional[List[str]] = None,
+        max_rate: Optional[int] = None,
+        host_timeout: Optional[str] = None,
+    ) -> List[str]:
+        """Build the nmap argv for ``targets`` (defaults to all targets).
+
+        :param max_rate: --max-rate for this process; defaults to an even
+            share of ``rate_limit``.
+        :param host_timeout: --host-timeout for this process; defaults to
+            ``host_timeout`` of the handler.
+        """
+        cmd: List[str] = shlex.split(self.nmap_binary) + ["-oX", "-"]
+        extra_args = self._phase_extra_args()
+
+        if self.phase == "discovery":
+            # Ping sweep only: which addresses are alive?
+            cmd.append("-sn")
+        elif self.phase == "ports":
+            # Port scan without version/OS detection
+            if not any(a in SCAN_TYPE_ARGS for a in extra_args):
+                cmd.append("-sS")
+        else:
+            # Reasonable defaults: service detection + OS detection in one pass
+            # can be slow, but good for a final project.
+            if not any(a in ("-sS", "-sT", "-sU", "-sV") for a in extra_args):
+                cmd.extend(["-sS", "-sV"])
+            if "-O" not in extra_args and "-A" not in extra_args:
+                cmd.append("-O")
+
+        if self.ports and self.phase != "discovery":
             cmd.extend(["-p", self.ports])
 
-        if self.rate_limit is not None:
-            # -T2 is "polite", -T3 normal, -T4 faster; we keep it simple.
-            if self.rate_limit <= 2000:
-                cmd.append("-T2")
-            else:
-                cmd.append("-T3")
+        if max_rate is None:
+            max_rate = split_rate(self.rate_limit, self.concurrency)
+        min_rate = split_rate(self.min_rate, self.concurrency)
+        if min_rate is not None:
+            # nmap refuses a --min-rate above --max-rate
+            cmd.extend(["--min-rate", str(min(min_rate, max_rate or min_rate))])
+        if max_rate is not None:
+            cmd.extend(["--max-rate", str(max_rate)])
+
+        host_timeout = host_timeout or self.host_timeout
+        if host_timeout:
+            cmd.extend(["--host-timeout", host_timeout])
+
+        if not self.reverse_dns and "-n" not in extra_args:
+            cmd.append("-n")
 
-        if self.excludes:
-            cmd.extend(["--exclude", ",".join(self.excludes)])
+        if self.progress is not None:
+            cmd.extend(["--stats-every", f"{int(self.progress.interval)}s"])
 
-        cmd.extend(self.extra_args)
-        cmd.extend(self.targets)
+        nmap_excludes = self.nmap_excludes()
+        if nmap_excludes:
+            cmd.extend(["--exclude", ",".join(nmap_excludes)])
+
+        cmd.extend(extra_args)
+        cmd.extend(self.scan_targets() if targets is None else targets)
         return cmd
 
-    def run_scan(self, timeout: int = 0) -> str:
+    def for_phase(
+        self,
+        phase: str,
+        targets: Optional[Iterable[str]] = None,
+        ports: Optional[str] = None,
+    ) -> "NmapHandler":
+        """Copy of this handler that runs one phase of a staged scan.
+
+        :param phase: One of :data:`PHASES`.
+        :param targets: Replacement targets (e.g. live hosts from discovery).
+        :param ports: Replacement port spec (e.g. only the ports found open).
+        """
+        if phase not in PHASES:
+            raise ValueError(f"Unknown scan phase: {phase}")
+
+        staged = copy.copy(self)
+        staged.phase = phase
+        if targets is not None:
+            staged.targets = list(targets)
+        if ports is not None:
+            staged.ports = ports
+        if phase == "services":
+            # Service detection runs per port group, not per address shard
+            staged.shard_prefix = staged.shard_size = None
+        return staged
+
+    def _phase_extra_args(self) -> List[str]:
+        """User nmap args, minus the ones that would undo the current phase."""
+        if self.phase == "discovery":
+            dropped = SCAN_TYPE_ARGS + DETECTION_ARGS + ("-Pn",)
+        elif self.phase == "ports":
+            dropped = DETECTION_ARGS
+        else:
+            return list(self.extra_args)
+        return [a for a in self.extra_args if a not in dropped]
+
+    def scan_targets(self) -> List[str]:
+        """Target specs handed to nmap, with IP/CIDR excludes already removed."""
+        target_set = self.target_set()
+        if target_set is None or not self.exclusions.intervals():
+            return list(self.targets)
+        return (target_set - self.exclusions).to_specs()
+
+    def target_set(self) -> Optional[TargetSet]:
+        """Targets as a TargetSet, or None if some cannot be represented (e.g. IPv6)."""
+        try:
+            return TargetSet.from_items(self.targets)
+        except ValueError:
+            return None
+
+    def nmap_excludes(self) -> List[str]:
+        """Excludes that still have to be passed to nmap's --exclude."""
+        target_set = self.target_set()
+        if target_set is None or target_set.hostnames:
+            # Hostnames, nmap ranges (10.0.0.1-50) and unparsable specs only
+            # expand inside nmap, so it has to see the address excludes too
+            return self.exclusions.to_specs() + self.nmap_only_excludes
+        # DNS names can only be matched by nmap after it resolves them
+        return list(self.exclusions.hostnames) + self.nmap_only_excludes
+
+    def run_scan(
+        self,
+        timeout: Optional[int] = None,
+        targets: Optional[List[str]] = None,
+        max_rate: Optional[int] = None,
+        host_timeout: Optional[str] = None,
+    ) -> str:
         """Execute nmap and return raw XML output as text.
 
-        :param timeout: Optional timeout in seconds (0 = no timeout).
+        If nmap times out or crashes after reporting at least one host, the
+        partial (possibly truncated) XML is returned and a warning logged;
+        :class:`NmapParser` recovers every complete host from it. Without
+        any host output, :class:`NmapExecutionError` is raised.
+
+        :param timeout: Optional deadline in seconds for the whole nmap
+            process (default: ``scan_timeout``; 0 = no timeout).
+        :param targets: Optional subset of targets to scan (used for shards).
+        :param max_rate: Optional --max-rate override (see :meth:`build_command`).
+        :param host_timeout: Optional --host-timeout override.
+        """
+        lines: List[str] = []
+        try:
+            for line in self.stream_scan(timeout, targets, max_rate, host_timeout=host_timeout):
+                lines.append(line)
+        except NmapExecutionError as e:
+            partial = "".join(lines)
+            if "<host" not in partial:
+                e.partial_output = partial
+                raise
+            log.warning(
+                f"{str(e).strip()} - keeping partial output "
+                f"({partial.count('</host>')} complete host(s))"
+            )
+            return partial
+        return "".join(lines)
+
+    def stream_scan(
+        self,
+        timeout: Optional[int] = None,
+        targets: Optional[List[str]] = None,
+        max_rate: Optional[int] = None,
+        stderr_sink: Optional[Callable[[str], None]] = None,
+        host_timeout: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Execute nmap and yield its XML output line by line as it arrives.
+
+        Unlike :meth:`run_scan`, nothing is buffered: the caller can parse
+        hosts while nmap is still running. Errors are raised once the
+        output is exhausted, so everything nmap wrote before a timeout or
+        crash has already been yielded.
+
+        :param timeout: Optional deadline in seconds for the whole nmap
+            process (default: ``scan_timeout``; 0 = no timeout).
+        :param targets: Optional subset of targets to scan (used for shards).
+        :param max_rate: Optional --max-rate override (see :meth:`build_command`).
+        :param stderr_sink: Receives nmap's complete stderr once it exits.
+        :param host_timeout: Optional --host-timeout override.
         """
-        cmd = self.build_command()
+        if timeout is None:
+            timeout = self.scan_timeout
+        cmd = self.build_command(targets, max_rate, host_timeout)
+        scan_progress = (
+            self.progress.scan_started(self.scan_targets() if targets is None else targets)
+            if self.progress is not None else None
+        )
 
         try:
-            completed = subprocess.run(
+            proc = subprocess.Popen(
                 cmd,
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
-                timeout=timeout or None,
-                check=False,
+                bufsize=1,
             )
         except FileNotFoundError as e:
+            if scan_progress:
+                scan_progress.finish(ok=False)
             raise NmapExecutionError(
-                "nmap executable not found. Please install Nmap and ensure it is "
-                "on your PATH."
-            ) from e
-        except subprocess.TimeoutExpired as e:
-            raise NmapExecutionError(
-                f"nmap scan timed out after {timeout} seconds."
+                f"nmap executable not found ({self.nmap_binary}). Please install Nmap "
+                "and ensure it is on your PATH."
             ) from e
 
-        if completed.returncode != 0 or not completed.stdout.strip():
+        # stderr is drained by its own thread so a chatty nmap can never
+        # fill the pipe
+        stderr_lines: List[str] = []
+
+        def _read_stderr() -> None:
+            for err_line in proc.stderr:
+                stderr_lines.append(err_line)
+
+        stderr_reader = threading.Thread(target=_read_stderr, daemon=True)
+        stderr_reader.start()
+
+        timed_out = threading.Event()
+
+        def _kill() -> None:
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, _kill) if timeout else None
+        if timer:
+            timer.start()
+
+        got_output = False
+        returncode = None
+        usage = None
+        started = time.perf_counter()
+        consumer_seconds = 0.0
+        output_bytes = 0
+        try:
+            for line in proc.stdout:
+                got_output = got_output or bool(line.strip())
+                output_bytes += len(line)
+                if scan_progress:
+                    scan_progress.stdout_line(line)
+                # Time between yield and resume is spent by the consumer (parser)
+                resumed = time.perf_counter()
+                yield line
+                consumer_seconds += time.perf_counter() - resumed
+            usage = self._wait(proc) if self.metrics is not None else None
+            returncode = proc.wait()
+        finally:
+            if timer:
+                timer.cancel()
+            # Consumer stopped early (or raised): don't leave nmap running
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            stderr_reader.join()
+            proc.stdout.close()
+            proc.stderr.close()
+            ok = returncode == 0 and got_output and not timed_out.is_set()
+            if scan_progress:
+                scan_progress.finish(ok=ok)
+            if self.metrics is not None:
+                wall = time.perf_counter() - started
+                self.metrics.record_scan(
+                    targets=" ".join(self.scan_targets() if targets is None else targets),
+                    phase=self.phase,
+                    ok=ok,
+                    returncode=returncode,
+                    wall_seconds=round(wall, 6),
+                    nmap_wait_seconds=round(wall - consumer_seconds, 6),
+                    parse_seconds=round(consumer_seconds, 6),
+                    nmap_cpu_seconds=round(usage[1], 6) if usage else None,
+                    nmap_peak_rss_bytes=usage[2] if usage else None,
+                    output_bytes=output_bytes,
+                )
+
+        stderr_text = "".join(stderr_lines)
+        if stderr_sink:
+            stderr_sink(stderr_text)
+
+        if timed_out.is_set():
+            raise NmapExecutionError(f"nmap scan timed out after {timeout} seconds.")
+
+        if returncode != 0 or not got_output:
             raise NmapExecutionError(
-                f"nmap failed with code {completed.returncode}: {completed.stderr}"
+                f"nmap failed with code {returncode}: {stderr_text}"
             )
 
-        return completed.stdout
+    @staticmethod
+    def _wait(proc: subprocess.Popen) -> Optional[tuple]:
+        """Reaps nmap like ``proc.wait()``, also returning its resource usage."""
+        try:
+            usage = child_usage(proc.pid)
+        except ChildProcessError:
+            return None
+        if usage is not None:
+            # Reaped behind Popen's back; tell it the exit code
+            proc.returncode = os.waitstatus_to_exitcode(usage[0])
+        return usage
+
+    # ------------------------------------------------------------
+    # Sharded execution
+    # ------------------------------------------------------------
+    def plan_shards(self) -> List[List[str]]:
+        """Split the targets into shards of nmap target specs.
+
+        - ``shard_prefix``: addresses from different /prefix subnets never
+          share a shard (e.g. 24 = one shard per /24).
+        - ``shard_size``: no shard holds more than this many targets.
+
+        Targets are planned as a :class:`TargetSet`, so overlapping ranges are
+        merged and no per-host list is ever built. Excluded addresses are
+        removed first, so fully excluded shards are never planned at all.
+        Hostnames cannot be placed without DNS, so they are packed into their
+        own shard(s). Targets a TargetSet cannot hold (IPv6) are not split:
+        they go to nmap together, as one last shard.
+
+        Returns an empty list if every target is excluded.
+        """
+        if not self.is_sharded:
+            targets = self.scan_targets()
+            return [targets] if targets else []
+
+        known, nmap_only = partition_targets(self.targets)
+        target_set = TargetSet.from_items(known) - self.exclusions
+        shards = [
+            chunk.to_specs()
+            for chunk in target_set.chunks(size=self.shard_size, prefix=self.shard_prefix)
+        ]
+        if nmap_only:
+            shards.append(nmap_only)
+        return shards
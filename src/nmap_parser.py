@@ -1,8 +1,11 @@
 import xml.etree.ElementTree as ET
 import re
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 from .result_objects import HostResult, PortInfo
 
+# Progress elements nmap writes between hosts under --stats-every
+_TASK_TAGS = ("taskbegin", "taskprogress", "taskend")
+
 
 class NmapParser:
     """Parses Nmap XML output into HostResult objects.
@@ -18,83 +21,160 @@ class NmapParser:
     WORKGROUP_REGEX = re.compile(r"Workgroup[:=]\s*([A-Za-z0-9._-]+)", re.IGNORECASE)
 
     def parse(self, xml_text: str) -> List[HostResult]:
-        hosts: List[HostResult] = []
-
-        root = ET.fromstring(xml_text)
-        for host_el in root.findall("host"):
-            status_el = host_el.find("status")
-            status = status_el.get("state", "unknown") if status_el is not None else "unknown"
-
-            addr_el = host_el.find("address[@addrtype='ipv4']")
-            ip = addr_el.get("addr") if addr_el is not None else "unknown"
-
-            hostname_el = host_el.find("hostnames/hostname")
-            hostname = hostname_el.get("name") if hostname_el is not None else ""
-
-            # OS detection (normal XML)
-            os_name = ""
-            os_accuracy = None
-            osmatch_el = host_el.find("os/osmatch")
-            if osmatch_el is not None:
-                os_name = osmatch_el.get("name", "")
-                acc = osmatch_el.get("accuracy")
-                if acc and acc.isdigit():
-                    os_accuracy = int(acc)
-
-            host_result = HostResult(
-                ip=ip,
-                hostname=hostname,
-                status=status,
-                os_name=os_name,
-                os_accuracy=os_accuracy,
-            )
-
-            # -----------------------
-            # Parse ports
-            # -----------------------
-            for port_el in host_el.findall("ports/port"):
-                proto = port_el.get("protocol", "")
-                port_id = int(port_el.get("portid", "0"))
-
-                state_el = port_el.find("state")
-                state = state_el.get("state", "unknown") if state_el is not None else "unknown"
-                reason = state_el.get("reason") if state_el is not None else None
-
-                service_el = port_el.find("service")
-                service = service_el.get("name") if service_el is not None else None
-                product = service_el.get("product") if service_el is not None else None
-                version = service_el.get("version") if service_el is not None else None
-
-                host_result.ports.append(
-                    PortInfo(
-                        port=port_id,
-                        protocol=proto,
-                        state=state,
-                        reason=reason,
-                        service=service,
-                        product=product,
-                        version=version,
-                    )
+        """Parse a complete (or truncated, see :meth:`iter_parse`) nmap document."""
+        try:
+            root = ET.fromstring(xml_text)
+        except ET.ParseError:
+            # Cut-off output from a killed/crashed nmap: salvage what is there
+            return list(self.iter_parse([xml_text]))
+        return [self._parse_host(host_el) for host_el in root.findall("host")]
+
+    def iter_parse(self, chunks: Iterable[str]) -> Iterator[HostResult]:
+        """Incrementally parse nmap XML as it arrives.
+
+        ``chunks`` can be any iterable of text pieces (e.g. lines read from
+        nmap's stdout pipe). Each ``<host>`` element is turned into a
+        HostResult as soon as it is closed, then dropped from the tree so
+        memory stays flat regardless of scan size.
+
+        Truncated documents (nmap killed or crashed mid-output) are not an
+        error: every complete host is returned, followed by the host that was
+        being written when the output stopped, marked ``incomplete``. If
+        ``chunks`` itself raises, that partial host is yielded before the
+        exception propagates.
+        """
+        pull = ET.XMLPullParser(events=("start", "end"))
+        root = None
+        open_host = None
+
+        try:
+            for chunk in chunks:
+                pull.feed(chunk)
+                for event, el in pull.read_events():
+                    if event == "start":
+                        if root is None:
+                            root = el
+                        elif el.tag == "host" and open_host is None:
+                            open_host = el
+                        continue
+
+                    if el.tag in _TASK_TAGS and open_host is None:
+                        # --stats-every progress between hosts: not kept
+                        try:
+                            root.remove(el)
+                        except ValueError:
+                            pass
+                        continue
+                    if el.tag != "host" or el is not open_host:
+                        continue
+
+                    open_host = None
+                    host_result = self._parse_host(el)
+                    el.clear()
+                    try:
+                        root.remove(el)
+                    except ValueError:
+                        pass
+                    yield host_result
+        except GeneratorExit:
+            raise
+        except Exception:
+            partial = self._parse_partial_host(open_host)
+            if partial is not None:
+                yield partial
+            raise
+
+        try:
+            pull.close()
+        except ET.ParseError:
+            # Output ended mid-document
+            partial = self._parse_partial_host(open_host)
+            if partial is not None:
+                yield partial
+
+    def _parse_partial_host(self, host_el: Optional[ET.Element]) -> Optional[HostResult]:
+        """HostResult for a host whose XML was cut off (None if no address yet)."""
+        if host_el is None or host_el.find("address") is None:
+            return None
+        host_result = self._parse_host(host_el)
+        host_result.incomplete = True
+        return host_result
+
+    def _parse_host(self, host_el: ET.Element) -> HostResult:
+        """Convert a single <host> element into a HostResult."""
+        status_el = host_el.find("status")
+        status = status_el.get("state", "unknown") if status_el is not None else "unknown"
+
+        addr_el = host_el.find("address[@addrtype='ipv4']")
+        ip = addr_el.get("addr") if addr_el is not None else "unknown"
+
+        hostname_el = host_el.find("hostnames/hostname")
+        hostname = hostname_el.get("name") if hostname_el is not None else ""
+
+        # OS detection (normal XML)
+        os_name = ""
+        os_accuracy = None
+        osmatch_el = host_el.find("os/osmatch")
+        if osmatch_el is not None:
+            os_name = osmatch_el.get("name", "")
+            acc = osmatch_el.get("accuracy")
+            if acc and acc.isdigit():
+                os_accuracy = int(acc)
+
+        host_result = HostResult(
+            ip=ip,
+            hostname=hostname,
+            status=status,
+            os_name=os_name,
+            os_accuracy=os_accuracy,
+            # nmap gave up on the host (--host-timeout)
+            incomplete=host_el.get("timedout") == "true",
+        )
+
+        # -----------------------
+        # Parse ports
+        # -----------------------
+        for port_el in host_el.findall("ports/port"):
+            proto = port_el.get("protocol", "")
+            port_id = int(port_el.get("portid", "0"))
+
+            state_el = port_el.find("state")
+            state = state_el.get("state", "unknown") if state_el is not None else "unknown"
+            reason = state_el.get("reason") if state_el is not None else None
+
+            service_el = port_el.find("service")
+            service = service_el.get("name") if service_el is not None else None
+            product = service_el.get("product") if service_el is not None else None
+            version = service_el.get("version") if service_el is not None else None
+
+            host_result.ports.append(
+                PortInfo(
+                    port=port_id,
+                    protocol=proto,
+                    state=state,
+                    reason=reason,
+                    service=service,
+                    product=product,
+                    version=version,
                 )
+            )
 
-            # -----------------------
-            # Hostscript parsing
-            # -----------------------
-            for script_el in host_el.findall("hostscript/script"):
-                script_id = script_el.get("id", "unknown")
-                output = script_el.get("output", "")
-                host_result.scripts[script_id] = output
-
-            # -----------------------
-            # NEW: Apply Regex Parsing
-            # -----------------------
-            regex_results = self._extract_via_regex(host_result.scripts)
-            if regex_results:
-                host_result.regex_parsed = regex_results
-
-            hosts.append(host_result)
-
-        return hosts
+        # -----------------------
+        # Hostscript parsing
+        # -----------------------
+        for script_el in host_el.findall("hostscript/script"):
+            script_id = script_el.get("id", "unknown")
+            output = script_el.get("output", "")
+            host_result.scripts[script_id] = output
+
+        # -----------------------
+        # NEW: Apply Regex Parsing
+        # -----------------------
+        regex_results = self._extract_via_regex(host_result.scripts)
+        if regex_results:
+            host_result.regex_parsed = regex_results
+
+        return host_result
 
     # ------------------------------------------------------------
     # NEW: Regex Parsing Logic
@@ -0,0 +1,328 @@
+"""
+progress.py – Live progress, ETA and throughput for running nmap scans.
+
+nmap is run with --stats-every. With XML output to stdout (-oX -) it
+prints no "Stats:" lines; instead, at that interval, it writes elements
+like this one into the XML document between the hosts:
+
+    <taskprogress task="SYN Stealth Scan" time="1700000000" percent="42.17"
+                  remaining="98" etc="1700000098"/>
+
+Percentages restart with every task (ping, port, service scan...) and
+every hostgroup nmap works through, so each task is placed in its phase
+of the current hostgroup (see _PHASE_SHARES); hosts already reported are
+the lower bound.
+
+NmapHandler.stream_scan feeds the XML it reads into a ProgressTracker,
+which combines every concurrently running scan into one overall view.
+A background thread logs that view at a fixed interval and, optionally,
+writes it to a JSON status file for other tools to poll. Scans that go
+quiet for too long are reported as stalled.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .targets import TargetSet
+from .logger_setup import get_logger
+
+log = get_logger("progress")
+
+_TASK_RE = re.compile(r"<task(?:begin|progress|end)\b[^>]*>")
+_ATTR_RE = re.compile(r'(\w+)="([^"]*)"')
+_TOTAL_HOSTS_RE = re.compile(r"^(\d+) total hosts")
+
+# Rough share of a hostgroup's scan time at which each phase starts and
+# ends; OS detection and traceroute report no progress and share the rest
+_PHASE_SHARES = {
+    "discovery": (0.0, 0.1),
+    "ports": (0.1, 0.8),
+    "services": (0.8, 0.9),
+    "scripts": (0.9, 0.95),
+}
+
+
+def _task_phase(task: str) -> Optional[str]:
+    """Phase of an nmap task name, e.g. "SYN Stealth Scan" -> "ports"."""
+    if "Ping Scan" in task or task.startswith("Parallel DNS resolution"):
+        return "discovery"
+    if task == "Service scan":
+        return "services"
+    if task.startswith("NSE") or task == "Script Scan":
+        return "scripts"
+    if task.endswith(" Scan"):
+        return "ports"
+    return None
+
+
+def _format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "unknown"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class ScanProgress:
+    """Progress of one nmap process (one shard or phase)."""
+
+    def __init__(self, targets: List[str]) -> None:
+        self.targets = targets
+        try:
+            target_set = TargetSet.from_items(targets)
+            self.addresses = max(1, target_set.address_count() + len(target_set.hostnames))
+        except ValueError:
+            self.addresses = max(1, len(targets))
+        self.task = "starting"
+        self.percent = 0.0
+        self.hosts_completed = 0
+        self.hosts_up = 0
+        self.open_ports = 0
+        self._hosts_seen_up = 0
+        # Current hostgroup: addresses of earlier groups, its size, its phase
+        self._groups_done = 0
+        self._group_size: Optional[int] = None
+        self._group_phase: Optional[str] = None
+        self.remaining: Optional[int] = None
+        self.state = "running"
+        self.started = time.monotonic()
+        self.last_update = self.started
+
+    def stdout_line(self, line: str) -> None:
+        """
+        Takes in XML output: <taskbegin>/<taskprogress> give the current
+        task, its percentage and time left; hosts and open ports are
+        counted as they are reported.
+        """
+        self.open_ports += line.count('<state state="open"')
+        self._hosts_seen_up += line.count('<status state="up"')
+        reported = line.count("</host>")
+        if reported:
+            # Down hosts are not in the XML, so this is a lower bound
+            self.hosts_completed += reported
+            self.hosts_up = max(self.hosts_up, self._hosts_seen_up)
+            self._advance(self.hosts_completed / self.addresses * 100)
+
+        for element in _TASK_RE.findall(line):
+            attrs = dict(_ATTR_RE.findall(element))
+            task = attrs.get("task") or self.task
+            phase = _task_phase(task)
+            if element.startswith("<taskend"):
+                self._task_ended(phase, attrs.get("extrainfo", ""))
+            else:
+                self.task = task
+                if element.startswith("<taskbegin"):
+                    self._task_began(phase)
+                else:
+                    self._task_progress(phase, float(attrs.get("percent", 0)))
+                    if attrs.get("remaining", "").isdigit():
+                        self.remaining = int(attrs["remaining"])
+            self.last_update = time.monotonic()
+
+    def _task_began(self, phase: Optional[str]) -> None:
+        if phase == "discovery" and self._group_phase not in (None, "discovery"):
+            # Host discovery again: the previous hostgroup is through
+            self._groups_done += self._group_size or 0
+            self._group_size = None
+            self._group_phase = None
+        if phase is not None:
+            self._task_progress(phase, 0.0)
+
+    def _task_ended(self, phase: Optional[str], extrainfo: str) -> None:
+        match = _TOTAL_HOSTS_RE.match(extrainfo)
+        if phase == "discovery" and match:
+            self._group_size = int(match.group(1))
+        if phase is not None:
+            self._task_progress(phase, 100.0)
+
+    def _task_progress(self, phase: Optional[str], percent: float) -> None:
+        if phase is None:
+            return
+        if self._group_phase is None or _PHASE_SHARES[phase] >= _PHASE_SHARES[self._group_phase]:
+            self._group_phase = phase
+        start, end = _PHASE_SHARES[phase]
+        done_in_group = start + (end - start) * min(100.0, percent) / 100
+        # Without a ping scan the group size is unknown: assume all the rest
+        group = self._group_size or max(0, self.addresses - self._groups_done)
+        self._advance((self._groups_done + group * done_in_group) / self.addresses * 100)
+
+    def finish(self, ok: bool) -> None:
+        self.state = "done" if ok else "failed"
+        if ok:
+            self.hosts_completed = max(self.hosts_completed, self.addresses)
+            self.hosts_up = max(self.hosts_up, self._hosts_seen_up)
+            self.percent = 100.0
+            self.remaining = 0
+        self.last_update = time.monotonic()
+
+    def _advance(self, percent: float) -> None:
+        # Estimates never go backwards; only finish() reports 100%
+        self.percent = min(99.9, max(self.percent, percent))
+        self.last_update = time.monotonic()
+
+    def to_dict(self, now: float, stalled: bool) -> Dict[str, Any]:
+        return {
+            "targets": " ".join(self.targets),
+            "state": "stalled" if stalled else self.state,
+            "task": self.task,
+            "percent": round(self.percent, 2),
+            "hosts_completed": self.hosts_completed,
+            "hosts_up": self.hosts_up,
+            "open_ports": self.open_ports,
+            "remaining_seconds": self.remaining,
+            "seconds_since_update": round(now - self.last_update, 1),
+        }
+
+
+class ProgressTracker:
+    """
+    Aggregates the progress of all nmap processes of a run.
+
+    :param interval: Seconds between console updates / status file writes.
+        Also used as nmap's --stats-every.
+    :param status_path: Optional JSON status file, rewritten atomically.
+    :param total_addresses: Addresses the whole run will scan, if known;
+        scans that have not started yet count as 0% done.
+    :param stall_after: Seconds without any output before a running scan
+        is reported as stalled (default: 6 intervals, at least 60s).
+    """
+
+    def __init__(
+        self,
+        interval: float = 10.0,
+        status_path: Optional[Union[str, Path]] = None,
+        total_addresses: int = 0,
+        stall_after: Optional[float] = None,
+    ) -> None:
+        self.interval = max(1.0, interval)
+        self.status_path = Path(status_path) if status_path else None
+        self.total_addresses = total_addresses
+        self.stall_after = stall_after or max(60.0, self.interval * 6)
+        self._scans: List[ScanProgress] = []
+        self._stalled_logged: set = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = time.monotonic()
+
+    # ------------------------------------------------------------
+    # Feeding (called from NmapHandler.stream_scan)
+    # ------------------------------------------------------------
+    def scan_started(self, targets: List[str]) -> ScanProgress:
+        scan = ScanProgress(targets)
+        with self._lock:
+            self._scans.append(scan)
+        return scan
+
+    # ------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        """Overall progress plus the scans that are running or failed."""
+        now = time.monotonic()
+        with self._lock:
+            scans = list(self._scans)
+
+        started = sum(s.addresses for s in scans)
+        expected = max(self.total_addresses, started) or 1
+        percent = sum(s.percent * s.addresses for s in scans) / expected
+        elapsed = now - self._started
+        open_ports = sum(s.open_ports for s in scans)
+        # Throughput covers scanning time only, not the time after the last scan
+        scanning = elapsed
+        if scans and all(s.state != "running" for s in scans):
+            scanning = max(s.last_update for s in scans) - self._started
+
+        eta = None
+        if 0 < percent < 100:
+            eta = elapsed * (100 - percent) / percent
+        elif percent >= 100:
+            eta = 0.0
+
+        details = []
+        stalled = 0
+        for s in scans:
+            is_stalled = s.state == "running" and now - s.last_update > self.stall_after
+            stalled += is_stalled
+            if s.state != "done":
+                details.append(s.to_dict(now, is_stalled))
+
+        return {
+            "updated": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "elapsed_seconds": round(elapsed, 1),
+            "percent": round(min(100.0, percent), 2),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "scans_total": len(scans),
+            "scans_done": sum(s.state == "done" for s in scans),
+            "scans_failed": sum(s.state == "failed" for s in scans),
+            "scans_stalled": stalled,
+            "hosts_completed": sum(s.hosts_completed for s in scans),
+            "hosts_up": sum(s.hosts_up for s in scans),
+            "open_ports": open_ports,
+            "open_ports_per_second": round(open_ports / scanning, 2) if scanning > 0 else 0.0,
+            "scans": details,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Logs one progress line (and stalled scans) and writes the status file."""
+        snap = self.snapshot()
+        log.info(
+            f"Progress: {snap['percent']:.1f}% | "
+            f"{snap['scans_done']}/{snap['scans_total']} scan(s) done | "
+            f"{snap['hosts_completed']} host(s) completed, {snap['hosts_up']} up | "
+            f"{snap['open_ports']} open port(s) ({snap['open_ports_per_second']}/s) | "
+            f"ETA {_format_duration(snap['eta_seconds'])}"
+        )
+
+        for scan in snap["scans"]:
+            if scan["state"] == "stalled" and scan["targets"] not in self._stalled_logged:
+                self._stalled_logged.add(scan["targets"])
+                log.warning(
+                    f"Scan of {scan['targets']} stalled: no progress for "
+                    f"{scan['seconds_since_update']:.0f}s ({scan['task']}, {scan['percent']}%)"
+                )
+
+        if self.status_path:
+            self._write_status(snap)
+        return snap
+
+    def _write_status(self, snap: Dict[str, Any]) -> None:
+        # Write-then-rename so readers never see a half-written file
+        tmp = self.status_path.with_name(self.status_path.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps(snap, indent=2) + "\n", encoding="utf-8")
+            os.replace(tmp, self.status_path)
+        except OSError as e:
+            log.warning(f"Could not write status file {self.status_path}: {e}")
+
+    # ------------------------------------------------------------
+    # Background reporter
+    # ------------------------------------------------------------
+    def start(self) -> "ProgressTracker":
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the reporter and writes a final update."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.report()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def __enter__(self) -> "ProgressTracker":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
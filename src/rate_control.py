@@ -0,0 +1,167 @@
+"""
+rate_control.py – Packet-rate budgeting and adaptive throttling for nmap.
+
+The global packets-per-second budget (--rate) is split evenly across the
+nmap processes that may run at the same time, and each one gets its share
+as --max-rate. After every shard the controller looks at the signs of
+congestion in the shard's XML output and adjusts the rate handed to the
+shards that start next:
+
+- congestion: multiplicative decrease (rate halves, down to the floor)
+- clean run:  additive increase (+10% of the share, up to the share)
+
+nmap's own congestion messages ("Increasing send delay ...") are normal
+output, which -oX - suppresses, so the signals come from the XML:
+
+- hosts nmap gave up on (``<host ... timedout="true">``, --host-timeout)
+- queueing delay: the shard's median round-trip time (``<times srtt=...>``)
+  well above its baseline, the lower of the shard's fastest host (probes
+  sent before a queue built up) and the lowest shard median of the run.
+  Shards of very differently distant networks can look congested to the
+  latter; RTT_MIN_EXTRA_US keeps fast LANs from doing so on jitter.
+
+nmap cannot change its rate while it runs, so adaptation happens between
+shards; the more shards a scan has, the finer it adapts.
+"""
+
+import re
+import statistics
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .logger_setup import get_logger
+
+log = get_logger("rate_control")
+
+_HOST_TIMEOUT_RE = re.compile(r'<host\b[^>]*\btimedout="true"')
+_SRTT_RE = re.compile(r'<times srtt="(\d+)"')
+
+# A shard's median RTT counts as inflated above RTT_INFLATION x the lowest
+# median seen so far, and at least RTT_MIN_EXTRA_US (microseconds) above it
+RTT_INFLATION = 2.0
+RTT_MIN_EXTRA_US = 5000
+
+
+@dataclass
+class CongestionReport:
+    """Congestion signals seen in one nmap run."""
+    host_timeouts: int = 0
+    # Median and lowest smoothed round-trip time of the reported hosts, microseconds
+    median_srtt: Optional[int] = None
+    min_srtt: Optional[int] = None
+
+    @classmethod
+    def from_xml(cls, text: str) -> "CongestionReport":
+        """Reads the signals from (a piece of) nmap's XML output."""
+        monitor = CongestionMonitor()
+        monitor.feed(text)
+        return monitor.report()
+
+
+class CongestionMonitor:
+    """Collects congestion signals from nmap's XML output as it streams by."""
+
+    def __init__(self) -> None:
+        self.host_timeouts = 0
+        self._srtts: List[int] = []
+
+    def feed(self, text: str) -> None:
+        self.host_timeouts += len(_HOST_TIMEOUT_RE.findall(text))
+        self._srtts.extend(int(v) for v in _SRTT_RE.findall(text))
+
+    def report(self) -> CongestionReport:
+        if not self._srtts:
+            return CongestionReport(host_timeouts=self.host_timeouts)
+        return CongestionReport(
+            host_timeouts=self.host_timeouts,
+            median_srtt=int(statistics.median(self._srtts)),
+            min_srtt=min(self._srtts),
+        )
+
+
+def split_rate(rate: Optional[int], slots: int) -> Optional[int]:
+    """Per-process share of a global rate (at least 1 packet/second)."""
+    if rate is None:
+        return None
+    return max(1, rate // max(1, slots))
+
+
+class RateController:
+    """
+    AIMD rate for concurrently running nmap shards.
+
+    :param budget: Global maximum rate in packets/second.
+    :param slots: Number of nmap processes that may run at the same time.
+    :param min_rate: Global minimum rate; its share is the floor the rate
+        never drops below (default: 5% of the share).
+
+    Every shard's rate stays at or below ``budget / slots``, so the sum over
+    all running shards never exceeds the budget. Thread-safe.
+    """
+
+    DECREASE = 0.5
+    INCREASE = 0.1
+
+    def __init__(self, budget: int, slots: int, min_rate: Optional[int] = None) -> None:
+        self.budget = budget
+        self.slots = max(1, slots)
+        self.share = split_rate(budget, self.slots)
+        floor = split_rate(min_rate, self.slots) or max(1, self.share // 20)
+        self.floor = min(floor, self.share)
+        self._rate = float(self.share)
+        # Lowest median RTT of any shard so far (microseconds)
+        self._base_srtt: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> int:
+        """--max-rate for the next shard to start."""
+        with self._lock:
+            return int(self._rate)
+
+    def record(self, report: CongestionReport, rate: Optional[int] = None) -> int:
+        """
+        Feeds back the outcome of a finished shard; returns the new rate.
+
+        :param rate: The rate the shard ran at. Congestion from shards that
+            started above the current rate was already backed off from, so
+            it does not lower the rate again.
+        """
+        with self._lock:
+            old = self._rate
+            baseline = self._rtt_baseline(report)
+            inflated = self._rtt_inflated(report)
+            if report.host_timeouts or inflated:
+                if rate is not None and rate > int(self._rate):
+                    return int(self._rate)
+                self._rate = max(float(self.floor), self._rate * self.DECREASE)
+            else:
+                self._rate = min(float(self.share), self._rate + self.share * self.INCREASE)
+
+            if int(self._rate) < int(old):
+                rtt = (
+                    f"median RTT {report.median_srtt / 1000:.1f} ms vs. {baseline / 1000:.1f} ms"
+                    if inflated else "RTT normal"
+                )
+                log.warning(
+                    f"Congestion detected ({report.host_timeouts} host timeout(s), {rtt}); "
+                    f"lowering shard rate {int(old)} -> {int(self._rate)} pps"
+                )
+            elif int(self._rate) > int(old):
+                log.info(f"Raising shard rate {int(old)} -> {int(self._rate)} pps")
+            return int(self._rate)
+
+    def _rtt_baseline(self, report: CongestionReport) -> Optional[int]:
+        """Uncongested RTT to compare a shard's median with (see module docstring)."""
+        known = [v for v in (self._base_srtt, report.min_srtt, report.median_srtt) if v is not None]
+        return min(known) if known else None
+
+    def _rtt_inflated(self, report: CongestionReport) -> bool:
+        srtt = report.median_srtt
+        if srtt is None:
+            return False
+        base = self._rtt_baseline(report)
+        if self._base_srtt is None or srtt < self._base_srtt:
+            self._base_srtt = srtt
+        return srtt > base * RTT_INFLATION and srtt - base > RTT_MIN_EXTRA_US
@@ -3,13 +3,29 @@ report_builder.py
 
 Responsible for generating scan reports.
 This module converts parsed Nmap and enumeration results into
-Markdown formatted output
+Markdown formatted output, plus JSON / NDJSON for machine consumption,
+a CSV of ports and a static HTML summary. ReportPipeline feeds any mix
+of these from a single walk over the hosts.
 """
 
+import csv
+import gzip
+import html
+import io
+import json
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
 from pathlib import Path
 
+from .xml_archive import ARCHIVE_SUFFIX, XmlArchiveWriter
+
+# Below this many hosts a process pool costs more than it saves
+PARALLEL_RENDER_MIN_HOSTS = 2000
+PARALLEL_RENDER_MIN_CHUNK = 500
+
 
 class ReportBuilder:
     """
@@ -19,9 +35,11 @@ class ReportBuilder:
     parsing, and enumeration are handled elsewhere.
     """
 
-    def __init__(self):
+    def __init__(self, metadata: Optional[Dict[str, Any]] = None):
         # Timestamp used in report headers
         self.generated_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+        # Scan metadata included in JSON reports
+        self.metadata = metadata or {}
 
     def build_text_report(
         self,
@@ -30,6 +48,7 @@ class ReportBuilder:
         excludes: List[str],
         nmap_command: str,
         raw_output: str,
+        render_workers: int = 1,
     ) -> str:
         """
         Builds a Markdown report containing scan results for all hosts.
@@ -40,11 +59,132 @@ class ReportBuilder:
             excludes: Excluded hosts or networks.
             nmap_command: Exact Nmap command executed.
             raw_output: Full raw Nmap XML output.
+            render_workers: Processes used to render host sections.
 
         Returns:
             Markdown-formatted report as a string.
         """
+        buf = io.StringIO()
+        self.write_text_report(
+            buf, hosts, targets, excludes, nmap_command,
+            raw_output=raw_output, render_workers=render_workers,
+        )
+        return buf.getvalue()
+
+    def write_text_report(
+        self,
+        fh: TextIO,
+        hosts: Iterable,
+        targets: List[str],
+        excludes: List[str],
+        nmap_command: str,
+        raw_output: Optional[str] = None,
+        raw_output_ref: Optional[str] = None,
+        render_workers: int = 1,
+    ) -> None:
+        """
+        Writes the Markdown report straight to a file handle.
+
+        Same content as build_text_report, but hosts can be any iterable
+        (e.g. enumerator.iter_hosts) and nothing is held in memory.
+        If raw_output_ref is given, the raw XML is linked instead of inlined.
+        With render_workers > 1 the host sections are rendered in parallel
+        (this collects ``hosts`` into a list first).
+        """
+        writer = self.open_writer(fh)
+        writer.write_header(targets, excludes, nmap_command, raw_output, raw_output_ref)
+        if render_workers > 1:
+            writer.write_hosts(hosts, render_workers)
+        else:
+            for host in hosts:
+                writer.write_host(host)
+
+    def open_writer(self, fh: TextIO) -> "MarkdownReportWriter":
+        """Returns a streaming writer that shares this builder's timestamp."""
+        return MarkdownReportWriter(fh, self.generated_time)
+
+    def build_json_report(self, hosts: Iterable) -> str:
+        """Builds the JSON report (see JsonReportWriter for the schema) as a string."""
+        buf = io.StringIO()
+        writer = self.open_json_writer(buf)
+        writer.write_header(self.metadata)
+        for host in hosts:
+            writer.write_host(host)
+        writer.close()
+        return buf.getvalue()
+
+    def open_json_writer(self, fh: TextIO) -> "JsonReportWriter":
+        return JsonReportWriter(fh, self.generated_time)
+
+    def open_ndjson_writer(self, fh: TextIO) -> "NdjsonReportWriter":
+        return NdjsonReportWriter(fh)
+
+    def open_csv_writer(self, fh: TextIO) -> "CsvPortsWriter":
+        return CsvPortsWriter(fh)
+
+    def open_html_writer(self, fh: TextIO) -> "HtmlSummaryWriter":
+        return HtmlSummaryWriter(fh, self.generated_time)
+
+
+def open_raw_sidecar(path: Union[str, Path]) -> TextIO:
+    """
+    Opens a sidecar file for the raw Nmap XML: an indexed archive for
+    ``*.sxa`` paths (see xml_archive.py), else gzip-compressed text.
+    """
+    if Path(path).suffix == ARCHIVE_SUFFIX:
+        return XmlArchiveWriter(path)
+    return gzip.open(path, "wt", encoding="utf-8")
+
+
+def _sidecar_kind(ref: str) -> str:
+    if Path(ref).suffix == ARCHIVE_SUFFIX:
+        return "indexed XML archive"
+    return "gzip-compressed XML"
+
+
+def _describe_sidecar(ref: str) -> str:
+    if Path(ref).suffix == ARCHIVE_SUFFIX:
+        return f"{_sidecar_kind(ref)}; `python -m src raw {ref} <ip>` prints one host"
+    return _sidecar_kind(ref)
+
+
+class MarkdownReportWriter:
+    """
+    Streams a Markdown report to a file handle section by section.
+
+    Call write_header() once, then write_host() for each host as it
+    arrives. The output is byte-identical to ReportBuilder.build_text_report.
+    """
+
+    def __init__(self, fh: TextIO, generated_time: str):
+        self.fh = fh
+        self.generated_time = generated_time
+        self._started = False
+
+    def _emit(self, *lines: str) -> None:
+        # Lines are newline-separated (no trailing newline), like "\n".join()
+        for line in lines:
+            if self._started:
+                self.fh.write("\n")
+            self.fh.write(line)
+            self._started = True
+
+    def write_header(
+        self,
+        targets: List[str],
+        excludes: List[str],
+        nmap_command: str,
+        raw_output: Optional[str] = None,
+        raw_output_ref: Optional[str] = None,
+    ) -> None:
+        """
+        Writes the report header, scan metadata and command output section.
 
+        Args:
+            raw_output: Full raw Nmap XML output to inline.
+            raw_output_ref: Path of a sidecar file holding the raw XML;
+                takes precedence over raw_output.
+        """
         lines = []
 
         # ---------------- Header ----------------
@@ -56,7 +196,13 @@ class ReportBuilder:
         lines.append("## Grading Rubric Compliance")
         lines.append("- Verified Information Table: included per host")
         lines.append("- Unverified Information Section: included per host")
-        lines.append("- Command Output: includes exact Nmap command and full raw output")
+        if raw_output_ref is not None:
+            lines.append(
+                "- Command Output: includes exact Nmap command; full raw output "
+                f"in `{raw_output_ref}` ({_sidecar_kind(raw_output_ref)})"
+            )
+        else:
+            lines.append("- Command Output: includes exact Nmap command and full raw output")
         lines.append("")
 
         # ---------------- Scan Metadata ----------------
@@ -73,90 +219,448 @@ class ReportBuilder:
         lines.append(f"`{nmap_command}`")
         lines.append("")
         lines.append("**Full Raw Nmap Output:**")
-        lines.append("```xml")
-        lines.append(raw_output.strip())
-        lines.append("```")
-        lines.append("")
-
-        # ---------------- Per Host Results ----------------
-        for host in hosts:
-            lines.append("---")
+        if raw_output_ref is not None:
             lines.append(
-                f"## Host: {host.ip} ({host.hostname or 'unknown'})"
+                f"Stored out of line in [`{raw_output_ref}`]({raw_output_ref}) "
+                f"({_describe_sidecar(raw_output_ref)})."
             )
+        else:
+            lines.append("```xml")
+            lines.append((raw_output or "").strip())
+            lines.append("```")
+        lines.append("")
+
+        self._emit(*lines)
+
+    def write_host(self, host) -> None:
+        """Writes the full section for a single HostResult."""
+        self._emit(render_host_section(host))
+
+    def write_hosts(self, hosts: Iterable, workers: int = 1) -> None:
+        """
+        Writes the sections of many hosts; with ``workers`` > 1 they are
+        rendered in a process pool (same output as write_host per host).
+        """
+        for text in render_host_sections(hosts, workers):
+            self._emit(text)
+
+    def write_rendered(self, text: str) -> None:
+        """Writes host sections already rendered by render_host_section(s)."""
+        self._emit(text)
+
+    def close(self) -> None:
+        # Nothing follows the last host section
+        pass
+
+
+def render_host_section(host) -> str:
+    """Markdown section of a single HostResult (lines joined with "\n")."""
+    lines = []
+
+    lines.append("---")
+    lines.append(
+        f"## Host: {host.ip} ({host.hostname or 'unknown'})"
+    )
+    lines.append(
+        f"**Status:** {host.status} | "
+        f"**OS:** {host.os_name or '❌ Not identified'}"
+        + (f" ({host.os_accuracy}%)" if host.os_accuracy else "")
+        + (" | **⚠️ Incomplete:** scan of this host did not finish"
+           if getattr(host, "incomplete", False) else "")
+    )
+    lines.append("")
+
+    # -------- Verified Information Table --------
+    lines.append("### Verified Information")
+    lines.append("")
+    lines.append("| Field | Value |")
+    lines.append("|-------|-------|")
+    lines.append(f"| IP Address | {host.ip} |")
+    lines.append(f"| Hostname | {host.hostname or '(none)'} |")
+    lines.append(f"| Status | {host.status} |")
+
+    if host.os_name:
+        acc = f" ({host.os_accuracy}%)" if host.os_accuracy else ""
+        lines.append(f"| OS (Nmap) | {host.os_name}{acc} |")
+    else:
+        lines.append("| OS (Nmap) | ❌ Not identified |")
+
+    # Sorted once for both the summary and the detailed table
+    ports = sorted(host.ports, key=lambda x: (x.port, x.protocol))
+    if ports:
+        port_summary = ", ".join(f"{p.port}/{p.protocol}" for p in ports)
+        lines.append(f"| Open Ports (Nmap) | {port_summary} |")
+    else:
+        lines.append("| Open Ports (Nmap) | None reported |")
+
+    win_flag = getattr(host, "is_windows", None)
+    lines.append(
+        f"| Windows Heuristic | {win_flag if win_flag is not None else '❌'} |"
+    )
+    lines.append("")
+
+    # -------- Unverified / Heuristic Section --------
+    lines.append("### Unverified / Heuristic Information")
+    lines.append("")
+
+    heuristics = getattr(host, "heuristics", None)
+    if heuristics:
+        for h in heuristics:
+            lines.append(f"- {h}")
+    else:
+        lines.append("None identified during this scan.")
+    lines.append("")
+
+    # -------- Open Ports Detailed Table --------
+    if ports:
+        lines.append("### Open / Filtered Ports")
+        lines.append("")
+        lines.append("| Port | State | Service | Product / Version |")
+        lines.append("|------|-------|---------|-------------------|")
+
+        for p in ports:
+            product_version = " ".join(
+                filter(None, [p.product, p.version])
+            ) or "❌"
             lines.append(
-                f"**Status:** {host.status} | "
-                f"**OS:** {host.os_name or '❌ Not identified'}"
-                + (f" ({host.os_accuracy}%)" if host.os_accuracy else "")
-            )
-            lines.append("")
-
-            # -------- Verified Information Table --------
-            lines.append("### Verified Information")
-            lines.append("")
-            lines.append("| Field | Value |")
-            lines.append("|-------|-------|")
-            lines.append(f"| IP Address | {host.ip} |")
-            lines.append(f"| Hostname | {host.hostname or '(none)'} |")
-            lines.append(f"| Status | {host.status} |")
-
-            if host.os_name:
-                acc = f" ({host.os_accuracy}%)" if host.os_accuracy else ""
-                lines.append(f"| OS (Nmap) | {host.os_name}{acc} |")
-            else:
-                lines.append("| OS (Nmap) | ❌ Not identified |")
-
-            if host.ports:
-                port_summary = ", ".join(
-                    f"{p.port}/{p.protocol}"
-                    for p in sorted(host.ports, key=lambda x: (x.port, x.protocol))
-                )
-                lines.append(f"| Open Ports (Nmap) | {port_summary} |")
-            else:
-                lines.append("| Open Ports (Nmap) | None reported |")
-
-            win_flag = getattr(host, "is_windows", None)
-            lines.append(
-                f"| Windows Heuristic | {win_flag if win_flag is not None else '❌'} |"
+                f"| {p.port}/{p.protocol} | {p.state} | "
+                f"{p.service or '❌'} | {product_version} |"
             )
-            lines.append("")
-
-            # -------- Unverified / Heuristic Section --------
-            lines.append("### Unverified / Heuristic Information")
-            lines.append("")
-
-            heuristics = getattr(host, "heuristics", None)
-            if heuristics:
-                for h in heuristics:
-                    lines.append(f"- {h}")
-            else:
-                lines.append("None identified during this scan.")
-            lines.append("")
-
-            # -------- Open Ports Detailed Table --------
-            if host.ports:
-                lines.append("### Open / Filtered Ports")
-                lines.append("")
-                lines.append("| Port | State | Service | Product / Version |")
-                lines.append("|------|-------|---------|-------------------|")
-
-                for p in sorted(host.ports, key=lambda x: (x.port, x.protocol)):
-                    product_version = " ".join(
-                        filter(None, [p.product, p.version])
-                    ) or "❌"
-                    lines.append(
-                        f"| {p.port}/{p.protocol} | {p.state} | "
-                        f"{p.service or '❌'} | {product_version} |"
-                    )
-                lines.append("")
-
-            # -------- Advisory Output --------
-            advisories = getattr(host, "advisories", None)
-            if advisories:
-                lines.append("### Script / Advisory Output")
-                lines.append("")
-                for adv in advisories:
-                    lines.append(f"- {adv}")
-                lines.append("")
-
-        return "\n".join(lines)
\ No newline at end of file
+        lines.append("")
+
+    # -------- Advisory Output --------
+    advisories = getattr(host, "advisories", None)
+    if advisories:
+        lines.append("### Script / Advisory Output")
+        lines.append("")
+        for adv in advisories:
+            lines.append(f"- {adv}")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+# Hosts inherited by forked render workers (see render_host_sections)
+_worker_hosts: List = []
+
+
+def _init_render_worker(hosts: List) -> None:
+    global _worker_hosts
+    _worker_hosts = hosts
+
+
+def _render_chunk(hosts: List) -> str:
+    return "\n".join(render_host_section(host) for host in hosts)
+
+
+def _render_range(bounds: Tuple[int, int]) -> str:
+    return _render_chunk(_worker_hosts[bounds[0]:bounds[1]])
+
+
+def render_host_sections(hosts: Iterable, workers: int = 1) -> Iterator[str]:
+    """
+    Rendered host sections, in order, as "\n"-joined chunks of one or
+    more hosts.
+
+    With ``workers`` > 1 and enough hosts to be worth it, chunks are
+    rendered by a process pool; ``map`` keeps them in input order, so the
+    concatenated output is identical to rendering one by one. Where
+    processes are forked, workers inherit the host list and only index
+    ranges and rendered text cross process boundaries.
+    """
+    for _start, _end, text in _render_chunks(list(hosts), workers):
+        yield text
+
+
+def _render_chunks(hosts: List, workers: int) -> Iterator[Tuple[int, int, str]]:
+    """(start, end, text) of each rendered chunk of ``hosts[start:end]``."""
+    if workers <= 1 or len(hosts) < PARALLEL_RENDER_MIN_HOSTS:
+        for i, host in enumerate(hosts):
+            yield i, i + 1, render_host_section(host)
+        return
+
+    # A few chunks per worker evens out hosts with many ports
+    size = max(PARALLEL_RENDER_MIN_CHUNK, -(-len(hosts) // (workers * 4)))
+    bounds = [(i, min(i + size, len(hosts))) for i in range(0, len(hosts), size)]
+    workers = min(workers, len(bounds))
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_render_worker,
+            initargs=(hosts,),
+        )
+        with pool:
+            texts = pool.map(_render_range, bounds)
+            for (a, b), text in zip(bounds, texts):
+                yield a, b, text
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            texts = pool.map(_render_chunk, [hosts[a:b] for a, b in bounds])
+            for (a, b), text in zip(bounds, texts):
+                yield a, b, text
+
+
+# Bump when fields are removed or change meaning (adding fields is compatible)
+JSON_SCHEMA_VERSION = 1
+
+
+def encode_host(host) -> str:
+    """One HostResult as a single-line JSON object (see HostResult.to_dict)."""
+    return json.dumps(host.to_dict(), ensure_ascii=False)
+
+
+class JsonReportWriter:
+    """
+    Streams a JSON report to a file handle.
+
+    Layout:
+        {"schema_version": 1, "generated": "...", "metadata": {...},
+         "hosts": [<HostResult.to_dict()>, ...]}
+
+    Hosts are encoded one at a time as they arrive, so the full document
+    is never built in memory. close() must be called to finish the document.
+    """
+
+    # ReportPipeline encodes each host once for all JSON-based sinks
+    wants_json = True
+
+    def __init__(self, fh: TextIO, generated_time: str):
+        self.fh = fh
+        self.generated_time = generated_time
+        self._host_count = 0
+
+    def write_header(self, metadata: Dict[str, Any]) -> None:
+        header = json.dumps(
+            {
+                "schema_version": JSON_SCHEMA_VERSION,
+                "generated": self.generated_time,
+                "metadata": metadata,
+            },
+            ensure_ascii=False,
+        )
+        # Re-open the object so the hosts array can be streamed into it
+        self.fh.write(header[:-1] + ', "hosts": [')
+
+    def write_host(self, host, encoded: Optional[str] = None) -> None:
+        self.fh.write(",\n" if self._host_count else "\n")
+        self.fh.write(encoded if encoded is not None else encode_host(host))
+        self._host_count += 1
+
+    def close(self) -> None:
+        self.fh.write("\n]}\n" if self._host_count else "]}\n")
+
+
+class NdjsonReportWriter:
+    """
+    Streams newline-delimited JSON: one HostResult.to_dict() object per line.
+
+    Lines carry no header, so files can be concatenated and bulk-loaded
+    directly by tools that read JSON Lines.
+    """
+
+    wants_json = True
+
+    def __init__(self, fh: TextIO):
+        self.fh = fh
+
+    def write_header(self, metadata: Dict[str, Any]) -> None:
+        # NDJSON output is hosts only
+        pass
+
+    def write_host(self, host, encoded: Optional[str] = None) -> None:
+        self.fh.write(encoded if encoded is not None else encode_host(host))
+        self.fh.write("\n")
+
+    def close(self) -> None:
+        pass
+
+
+# ------------------------------------------------------------
+# CSV / HTML
+# ------------------------------------------------------------
+CSV_COLUMNS = (
+    "ip", "hostname", "status", "os_name",
+    "port", "protocol", "state", "reason", "service", "product", "version",
+)
+
+
+class CsvPortsWriter:
+    """
+    Streams a CSV with one row per reported port (columns: CSV_COLUMNS).
+
+    Hosts without any reported port get no rows; the JSON report has them.
+    """
+
+    def __init__(self, fh: TextIO):
+        self.fh = fh
+        self._csv = csv.writer(fh, lineterminator="\n")
+
+    def write_header(self, metadata: Dict[str, Any]) -> None:
+        self._csv.writerow(CSV_COLUMNS)
+
+    def write_host(self, host) -> None:
+        prefix = [host.ip, host.hostname or "", host.status, host.os_name or ""]
+        self._csv.writerows(
+            prefix + [p.port, p.protocol, p.state, p.reason or "", p.service or "",
+                      p.product or "", p.version or ""]
+            for p in host.ports
+        )
+
+    def close(self) -> None:
+        pass
+
+
+# Services listed in the HTML summary footer
+HTML_TOP_SERVICES = 15
+
+_HTML_STYLE = (
+    "body{font-family:sans-serif;margin:2em}"
+    "table{border-collapse:collapse}"
+    "th,td{border:1px solid #ccc;padding:4px 8px;text-align:left;vertical-align:top}"
+    "th{background:#eee}"
+    "tr.down td{color:#888}"
+)
+
+
+class HtmlSummaryWriter:
+    """
+    Streams a static, self-contained HTML page: scan metadata, one table
+    row per host (status, OS, open ports) and, on close(), totals and the
+    most common services.
+    """
+
+    def __init__(self, fh: TextIO, generated_time: str):
+        self.fh = fh
+        self.generated_time = generated_time
+        self._hosts = 0
+        self._up = 0
+        self._open_ports = 0
+        self._services: Counter = Counter()
+
+    def write_header(self, metadata: Dict[str, Any]) -> None:
+        e = html.escape
+        raw = metadata.get("raw_output")
+        lines = [
+            "<!DOCTYPE html>",
+            '<html lang="en">',
+            "<head>",
+            '<meta charset="utf-8">',
+            "<title>SonarTrace Scan Summary</title>",
+            f"<style>{_HTML_STYLE}</style>",
+            "</head>",
+            "<body>",
+            "<h1>SonarTrace Scan Summary</h1>",
+            "<ul>",
+            f"<li><b>Generated:</b> {e(self.generated_time)}</li>",
+            f"<li><b>Targets:</b> {e(', '.join(metadata.get('targets') or []))}</li>",
+            f"<li><b>Excludes:</b> {e(', '.join(metadata.get('excludes') or []) or '(none)')}</li>",
+            f"<li><b>Nmap Command:</b> <code>{e(metadata.get('nmap_command') or '')}</code></li>",
+        ]
+        if raw:
+            lines.append(f'<li><b>Raw Nmap Output:</b> <a href="{e(raw)}">{e(raw)}</a></li>')
+        lines += [
+            "</ul>",
+            "<table>",
+            "<tr><th>Host</th><th>Hostname</th><th>Status</th><th>OS</th><th>Open Ports</th></tr>",
+        ]
+        self.fh.write("\n".join(lines) + "\n")
+
+    def write_host(self, host) -> None:
+        e = html.escape
+        open_ports = [p for p in host.ports if p.state == "open"]
+        self._hosts += 1
+        self._up += host.is_up
+        self._open_ports += len(open_ports)
+        self._services.update(p.service for p in open_ports if p.service)
+
+        ports = "<br>".join(
+            e(f"{p.port}/{p.protocol} " + " ".join(v for v in (p.service, p.product, p.version) if v))
+            for p in open_ports
+        )
+        os_name = e(host.os_name) if host.os_name else "&ndash;"
+        if host.os_name and host.os_accuracy:
+            os_name += f" ({e(str(host.os_accuracy))}%)"
+        self.fh.write(
+            f'<tr class="{"up" if host.is_up else "down"}"><td>{e(host.ip)}</td>'
+            f"<td>{e(host.hostname or '')}</td><td>{e(host.status)}</td>"
+            f"<td>{os_name}</td><td>{ports}</td></tr>\n"
+        )
+
+    def close(self) -> None:
+        lines = [
+            "</table>",
+            "<h2>Totals</h2>",
+            "<ul>",
+            f"<li><b>Hosts:</b> {self._hosts} ({self._up} up)</li>",
+            f"<li><b>Open ports:</b> {self._open_ports}</li>",
+            "</ul>",
+        ]
+        if self._services:
+            lines.append("<table>")
+            lines.append("<tr><th>Service</th><th>Open ports</th></tr>")
+            for service, count in self._services.most_common(HTML_TOP_SERVICES):
+                lines.append(f"<tr><td>{html.escape(service)}</td><td>{count}</td></tr>")
+            lines.append("</table>")
+        lines += ["</body>", "</html>"]
+        self.fh.write("\n".join(lines) + "\n")
+
+
+# ------------------------------------------------------------
+# Single-pass emission
+# ------------------------------------------------------------
+class ReportPipeline:
+    """
+    Feeds every host to several report sinks in one pass.
+
+    A sink is any writer with ``write_host(host)`` and ``close()`` whose
+    header has already been written (MarkdownReportWriter,
+    JsonReportWriter, NdjsonReportWriter, CsvPortsWriter,
+    HtmlSummaryWriter). Each host is visited once, whatever the number of
+    sinks, and is JSON-encoded at most once for all sinks that want JSON.
+    Hosts may come from a generator (e.g. enumerator.iter_hosts), so
+    every sink fills up while the scan is still running.
+    """
+
+    def __init__(self, sinks: Iterable):
+        self.sinks = list(sinks)
+        self._json_sinks = [s for s in self.sinks if getattr(s, "wants_json", False)]
+        self._plain_sinks = [s for s in self.sinks if not getattr(s, "wants_json", False)]
+
+    def write_host(self, host) -> None:
+        for sink in self._plain_sinks:
+            sink.write_host(host)
+        self._write_json(host)
+
+    def _write_json(self, host) -> None:
+        if self._json_sinks:
+            encoded = encode_host(host)
+            for sink in self._json_sinks:
+                sink.write_host(host, encoded)
+
+    def write_hosts(self, hosts: Iterable, render_workers: int = 1) -> None:
+        """
+        Writes all hosts. With ``render_workers`` > 1, Markdown sections
+        are rendered in a process pool (see render_host_sections) and the
+        other sinks are fed each chunk's hosts as its text comes back.
+        """
+        markdown = [s for s in self.sinks if isinstance(s, MarkdownReportWriter)]
+        if render_workers <= 1 or not markdown:
+            for host in hosts:
+                self.write_host(host)
+            return
+
+        others = [s for s in self._plain_sinks if not isinstance(s, MarkdownReportWriter)]
+        hosts = list(hosts)
+        for start, end, text in _render_chunks(hosts, render_workers):
+            for sink in markdown:
+                sink.write_rendered(text)
+            for host in hosts[start:end]:
+                for sink in others:
+                    sink.write_host(host)
+                self._write_json(host)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
@@ -0,0 +1,294 @@
+"""
+result_index.py – Indexed queries over scan results.
+
+Answers questions like "which hosts have 445 open with an old Samba" from
+saved scan output without grepping the Markdown report. ResultIndex keeps
+inverted indexes (value -> set of host numbers) over open ports, services,
+products, versions, OS families and script ids, so a query intersects a
+few small sets instead of looking at every port of every host.
+
+load_results() reads any of the formats SonarTrace writes: JSON / NDJSON
+reports, raw nmap XML (plain, gzip sidecar or .sxa archive, including the
+concatenated per-shard documents of a sharded scan) and the SQLite result
+store (latest result per address).
+"""
+
+import gzip
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from .nmap_parser import NmapParser
+from .result_objects import HostResult, PortInfo
+from .result_store import ResultStore
+from .targets import TargetSet
+from .xml_archive import ARCHIVE_MAGIC, XmlArchive
+
+# Substrings of nmap's osmatch name -> OS family (first match wins)
+OS_FAMILIES = (
+    ("windows", ("windows",)),
+    ("macos", ("mac os", "macos", "os x", "apple")),
+    ("linux", ("linux", "android")),
+    ("bsd", ("bsd",)),
+    ("network", ("cisco", "juniper", "junos", "routeros", "fortios", "ios")),
+    ("solaris", ("solaris", "sunos")),
+)
+
+FIELDS = ("port", "service", "product", "version", "os", "script")
+# Criteria that describe a single port (must all hold for the same port)
+PORT_FIELDS = ("port", "service", "product", "version")
+
+Criterion = Union[None, str, int, Iterable[Union[str, int]]]
+
+
+def os_family(os_name: str) -> str:
+    """Coarse OS family of an nmap OS guess ("unknown" if there is none)."""
+    name = (os_name or "").lower()
+    if not name:
+        return "unknown"
+    for family, needles in OS_FAMILIES:
+        if any(n in name for n in needles):
+            return family
+    return "other"
+
+
+def _values(criterion: Criterion) -> List[Any]:
+    if criterion is None:
+        return []
+    if isinstance(criterion, (str, int)):
+        return [criterion]
+    return list(criterion)
+
+
+class ResultIndex:
+    """
+    Inverted indexes over a list of HostResult objects.
+
+    Port, service, product and version entries only cover open ports.
+    Service names, OS families and script ids match exactly (case-
+    insensitive); products and versions match by substring.
+    """
+
+    def __init__(self, hosts: Iterable[HostResult]) -> None:
+        self.hosts: List[HostResult] = list(hosts)
+        self._index: Dict[str, Dict[Any, Set[int]]] = {name: defaultdict(set) for name in FIELDS}
+        self._up: Set[int] = set()
+        for i, host in enumerate(self.hosts):
+            self._add(i, host)
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+    def _add(self, i: int, host: HostResult) -> None:
+        if host.is_up:
+            self._up.add(i)
+        index = self._index
+        for p in host.ports:
+            if p.state != "open":
+                continue
+            index["port"][p.port].add(i)
+            if p.service:
+                index["service"][p.service.lower()].add(i)
+            if p.product:
+                index["product"][p.product.lower()].add(i)
+            if p.version:
+                index["version"][p.version.lower()].add(i)
+        index["os"][os_family(host.os_name)].add(i)
+        for script_id in host.scripts:
+            index["script"][script_id.lower()].add(i)
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def select(
+        self,
+        port: Criterion = None,
+        service: Criterion = None,
+        product: Criterion = None,
+        version: Criterion = None,
+        os: Criterion = None,
+        script: Criterion = None,
+        within: Optional[TargetSet] = None,
+        up_only: bool = False,
+    ) -> List[HostResult]:
+        """
+        Hosts matching every given criterion, in their original order.
+
+        Each criterion takes one value or several (any of them matches).
+        When more than one of ``port``/``service``/``product``/``version``
+        is given, they must all hold for the same open port.
+        """
+        criteria = {
+            "port": [int(v) for v in _values(port)],
+            "service": [str(v).lower() for v in _values(service)],
+            "product": [str(v).lower() for v in _values(product)],
+            "version": [str(v).lower() for v in _values(version)],
+            "os": [str(v).lower() for v in _values(os)],
+            "script": [str(v).lower() for v in _values(script)],
+        }
+        postings = [self._postings(name, values) for name, values in criteria.items() if values]
+        if up_only:
+            postings.append(self._up)
+
+        if postings:
+            postings.sort(key=len)
+            matched = set(postings[0]).intersection(*postings[1:])
+        else:
+            matched = set(range(len(self.hosts)))
+
+        port_criteria = {name: criteria[name] for name in PORT_FIELDS if criteria[name]}
+        hosts = [self.hosts[i] for i in sorted(matched)]
+        if len(port_criteria) > 1:
+            hosts = [h for h in hosts if self._matching_ports(h, port_criteria)]
+        if within is not None:
+            hosts = [h for h in hosts if h.ip in within]
+        return hosts
+
+    def matching_ports(self, host: HostResult, **criteria: Criterion) -> List[PortInfo]:
+        """Open ports of ``host`` that satisfy the port-level criteria given."""
+        normalized = {
+            name: [int(v) if name == "port" else str(v).lower() for v in _values(criteria.get(name))]
+            for name in PORT_FIELDS
+        }
+        return self._matching_ports(host, {k: v for k, v in normalized.items() if v})
+
+    def count_by(self, name: str, hosts: Optional[Iterable[HostResult]] = None) -> Counter:
+        """Number of hosts per value of ``name`` (one of FIELDS), optionally among ``hosts``."""
+        if name not in FIELDS:
+            raise ValueError(f"unknown field {name!r}, expected one of {', '.join(FIELDS)}")
+        postings = self._index[name]
+        if hosts is None:
+            return Counter({value: len(ids) for value, ids in postings.items()})
+        wanted = {id(h) for h in hosts}
+        subset = {i for i, h in enumerate(self.hosts) if id(h) in wanted}
+        counts = Counter({value: len(ids & subset) for value, ids in postings.items()})
+        return +counts  # drop zero counts
+
+    def _postings(self, name: str, values: List[Any]) -> Set[int]:
+        index = self._index[name]
+        if name in ("product", "version"):
+            # Few distinct products/versions: scan the keys, not the hosts
+            values = [key for key in index if any(v in key for v in values)]
+        result: Set[int] = set()
+        for value in values:
+            result |= index.get(value, set())
+        return result
+
+    @staticmethod
+    def _matching_ports(host: HostResult, criteria: Dict[str, List[Any]]) -> List[PortInfo]:
+        def ok(p: PortInfo) -> bool:
+            if p.state != "open":
+                return False
+            if "port" in criteria and p.port not in criteria["port"]:
+                return False
+            if "service" in criteria and (p.service or "").lower() not in criteria["service"]:
+                return False
+            for name in ("product", "version"):
+                if name in criteria:
+                    value = (getattr(p, name) or "").lower()
+                    if not value or not any(v in value for v in criteria[name]):
+                        return False
+            return True
+
+        return [p for p in host.ports if ok(p)]
+
+
+# ------------------------------------------------------------
+# Loading saved results
+# ------------------------------------------------------------
+def load_results(path: Union[str, Path]) -> List[HostResult]:
+    """
+    Reads hosts from a JSON/NDJSON report, raw nmap XML (.xml, .xml.gz,
+    .sxa) or a SQLite result store; the format is detected from the file.
+
+    Raw XML of staged scans reports a host once per phase; those are
+    merged into one result per address.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        head = f.read(16)
+
+    if head.startswith(b"SQLite format 3"):
+        with ResultStore(str(path)) as store:
+            return store.load_hosts(profile=None)
+    if head.startswith(ARCHIVE_MAGIC):
+        with XmlArchive(path) as archive:
+            return _merge_phases(_iter_xml_hosts(_split_lines(archive.iter_text())))
+
+    opener = gzip.open if head.startswith(b"\x1f\x8b") else open
+    with opener(path, "rt", encoding="utf-8") as fh:
+        first = fh.read(1)
+        while first.isspace():
+            first = fh.read(1)
+        fh.seek(0)
+        if first == "<":
+            return _merge_phases(_iter_xml_hosts(fh))
+        if first == "{" and not _is_ndjson(path):
+            data = json.load(fh)
+            if "hosts" not in data:
+                raise ValueError(f"{path}: JSON without a 'hosts' list is not a SonarTrace report")
+            return [HostResult.from_dict(h) for h in data["hosts"]]
+        if first == "{":
+            return [HostResult.from_dict(json.loads(line)) for line in fh if line.strip()]
+    raise ValueError(f"{path}: not a SonarTrace report, raw nmap XML or result store")
+
+
+def _is_ndjson(path: Path) -> bool:
+    suffixes = [s.lower() for s in path.suffixes]
+    return any(s in (".ndjson", ".jsonl") for s in suffixes)
+
+
+def _split_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Re-splits arbitrary text chunks (e.g. archive blocks) into lines."""
+    rest = ""
+    for chunk in chunks:
+        lines = (rest + chunk).split("\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if rest:
+        yield rest
+
+
+def _iter_xml_hosts(lines: Iterable[str]) -> Iterator[HostResult]:
+    """Hosts of one or more concatenated nmap XML documents (e.g. a sidecar)."""
+    parser = NmapParser()
+    it = iter(lines)
+    carry: List[Optional[str]] = [next(it, None)]
+
+    def document() -> Iterator[str]:
+        head, carry[0] = carry[0], None
+        yield head
+        for line in it:
+            # A cut-off document is directly followed by the next one
+            cut = line.find("<?xml")
+            if cut != -1:
+                if cut:
+                    yield line[:cut]
+                carry[0] = line[cut:]
+                return
+            yield line
+
+    while carry[0] is not None:
+        yield from parser.iter_parse(document())
+
+
+def _merge_phases(hosts: Iterable[HostResult]) -> List[HostResult]:
+    """One result per address; later reports of a host refine earlier ones."""
+    merged: Dict[str, HostResult] = {}
+    for host in hosts:
+        earlier = merged.get(host.ip)
+        if earlier is None:
+            merged[host.ip] = host
+            continue
+        known = {(p.port, p.protocol) for p in host.ports}
+        host.ports.extend(p for p in earlier.ports if (p.port, p.protocol) not in known)
+        host.ports.sort(key=lambda p: (p.protocol, p.port))
+        host.hostname = host.hostname or earlier.hostname
+        host.os_name, host.os_accuracy = (
+            (host.os_name, host.os_accuracy) if host.os_name else (earlier.os_name, earlier.os_accuracy)
+        )
+        host.scripts = {**earlier.scripts, **host.scripts}
+        merged[host.ip] = host
+    return list(merged.values())
@@ -2,13 +2,26 @@
 result_objects.py
 
 Basic data classes used to store host and port information for SonarTrace.
+
+The classes use __slots__ and intern their small set of repeated strings
+(state, protocol, reason, service), so million-port result sets stay
+compact. PortTable offers an even denser, array-backed view for bulk
+analysis.
 """
 
+import sys
+from array import array
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Share one copy of a frequently repeated string (None passes through)."""
+    return sys.intern(value) if type(value) is str else value
 
 
-@dataclass
+@dataclass(slots=True)
 class PortInfo:
     """Stores information about a single scanned port."""
     port: int                  # Port number
@@ -19,8 +32,39 @@ class PortInfo:
     product: Optional[str] = None   # Detected software
     version: Optional[str] = None   # Version, if Nmap finds one
 
+    def __post_init__(self) -> None:
+        # "tcp", "open", "syn-ack", "http"... repeat on almost every port
+        self.protocol = _intern(self.protocol)
+        self.state = _intern(self.state)
+        self.reason = _intern(self.reason)
+        self.service = _intern(self.service)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready representation (stable key order)."""
+        return {
+            "port": self.port,
+            "protocol": self.protocol,
+            "state": self.state,
+            "reason": self.reason,
+            "service": self.service,
+            "product": self.product,
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PortInfo":
+        return cls(
+            port=int(data["port"]),
+            protocol=data.get("protocol", ""),
+            state=data.get("state", "unknown"),
+            reason=data.get("reason"),
+            service=data.get("service"),
+            product=data.get("product"),
+            version=data.get("version"),
+        )
+
 
-@dataclass
+@dataclass(slots=True)
 class HostResult:
     """Stores all scan results for a single host."""
     ip: str                    # Host IP address
@@ -31,6 +75,11 @@ class HostResult:
 
     ports: List[PortInfo] = field(default_factory=list)  # List of open ports
     scripts: Dict[str, str] = field(default_factory=dict)  # Script output
+    regex_parsed: Dict[str, List[str]] = field(default_factory=dict)  # Regex hits in scripts
+    incomplete: bool = False   # Host timed out or its XML was cut off
+
+    def __post_init__(self) -> None:
+        self.status = _intern(self.status)
 
     @property
     def is_up(self) -> bool:
@@ -43,3 +92,120 @@ class HostResult:
         if not self.os_name:
             return False
         return "windows" in self.os_name.lower()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready representation (stable key order)."""
+        return {
+            "ip": self.ip,
+            "hostname": self.hostname,
+            "status": self.status,
+            "os_name": self.os_name,
+            "os_accuracy": self.os_accuracy,
+            "is_windows": self.is_windows,
+            "ports": [p.to_dict() for p in self.ports],
+            "scripts": dict(self.scripts),
+            "regex_parsed": {k: list(v) for k, v in self.regex_parsed.items()},
+            "incomplete": self.incomplete,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HostResult":
+        return cls(
+            ip=data["ip"],
+            hostname=data.get("hostname", ""),
+            status=data.get("status", "unknown"),
+            os_name=data.get("os_name", ""),
+            os_accuracy=data.get("os_accuracy"),
+            ports=[PortInfo.from_dict(p) for p in data.get("ports", [])],
+            scripts=dict(data.get("scripts", {})),
+            regex_parsed={k: list(v) for k, v in data.get("regex_parsed", {}).items()},
+            incomplete=bool(data.get("incomplete", False)),
+        )
+
+
+class PortTable:
+    """
+    Columnar, array-backed table of ports for bulk analysis.
+
+    Each port costs a few bytes: host index and port number live in typed
+    arrays, and string columns are stored as 16-bit codes into a shared
+    vocabulary. Useful for counting/filtering across very large scans
+    without keeping one PortInfo object per port around.
+    """
+
+    STRING_COLUMNS = ("protocol", "state", "reason", "service", "product", "version")
+
+    def __init__(self) -> None:
+        self.ips: List[str] = []
+        self.host_index = array("I")
+        self.port = array("H")
+        self._codes: Dict[str, array] = {name: array("H") for name in self.STRING_COLUMNS}
+        # Code 0 is reserved for None
+        self._vocab: List[Optional[str]] = [None]
+        self._lookup: Dict[Optional[str], int] = {None: 0}
+
+    @classmethod
+    def from_hosts(cls, hosts: List[HostResult]) -> "PortTable":
+        table = cls()
+        for host in hosts:
+            table.add_host(host)
+        return table
+
+    def _code(self, value: Optional[str]) -> int:
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self._vocab)
+            if code > 0xFFFF:
+                raise OverflowError("PortTable vocabulary is limited to 65535 distinct strings")
+            self._vocab.append(value)
+            self._lookup[value] = code
+        return code
+
+    def add_host(self, host: HostResult) -> None:
+        idx = len(self.ips)
+        self.ips.append(host.ip)
+        for p in host.ports:
+            self.host_index.append(idx)
+            self.port.append(p.port)
+            for name in self.STRING_COLUMNS:
+                self._codes[name].append(self._code(getattr(p, name)))
+
+    def __len__(self) -> int:
+        return len(self.port)
+
+    def column(self, name: str) -> Iterator[Optional[str]]:
+        """Yields the decoded values of one string column."""
+        vocab = self._vocab
+        return (vocab[c] for c in self._codes[name])
+
+    def row(self, i: int) -> Tuple[str, PortInfo]:
+        """Returns (ip, PortInfo) for row ``i``."""
+        values = {name: self._vocab[self._codes[name][i]] for name in self.STRING_COLUMNS}
+        return self.ips[self.host_index[i]], PortInfo(port=self.port[i], **values)
+
+    def count_by(self, name: str) -> Counter:
+        """Counts rows per value of a string column (or "port")."""
+        if name == "port":
+            return Counter(self.port)
+        counts = Counter(self._codes[name])
+        return Counter({self._vocab[code]: n for code, n in counts.items()})
+
+    def select(self, **criteria: Any) -> List[int]:
+        """
+        Row numbers matching all criteria, e.g. select(port=445, state="open").
+        Keys are "port" or any string column name.
+        """
+        checks = []
+        for name, value in criteria.items():
+            if name == "port":
+                checks.append((self.port, value))
+            else:
+                code = self._lookup.get(value)
+                if code is None:
+                    return []
+                checks.append((self._codes[name], code))
+
+        return [
+            i for i in range(len(self))
+            if all(column[i] == wanted for column, wanted in checks)
+        ]
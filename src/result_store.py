@@ -0,0 +1,255 @@
+"""
+result_store.py – Persistent SQLite store for scan results.
+
+Every scan is saved with its timestamp, port spec and nmap arguments, along
+with the address ranges it covered. Incremental runs use that coverage to
+skip targets that were scanned with the same profile recently and reuse
+their stored results instead.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from .result_objects import HostResult, PortInfo
+from .targets import TargetSet
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at  REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    profile     TEXT NOT NULL,
+    port_spec   TEXT,
+    nmap_args   TEXT NOT NULL,
+    command     TEXT
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    scan_id     INTEGER NOT NULL REFERENCES scans(id),
+    profile     TEXT NOT NULL,
+    scanned_at  REAL NOT NULL,
+    range_start INTEGER NOT NULL,
+    range_end   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id     INTEGER NOT NULL REFERENCES scans(id),
+    profile     TEXT NOT NULL,
+    scanned_at  REAL NOT NULL,
+    ip          TEXT NOT NULL,
+    hostname    TEXT,
+    status      TEXT,
+    os_name     TEXT,
+    os_accuracy INTEGER,
+    scripts     TEXT,
+    regex_parsed TEXT,
+    incomplete  INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS ports (
+    host_id     INTEGER NOT NULL REFERENCES hosts(id),
+    port        INTEGER NOT NULL,
+    protocol    TEXT,
+    state       TEXT,
+    reason      TEXT,
+    service     TEXT,
+    product     TEXT,
+    version     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_coverage_profile ON coverage(profile, scanned_at);
+CREATE INDEX IF NOT EXISTS idx_hosts_profile ON hosts(profile, ip, scanned_at);
+CREATE INDEX IF NOT EXISTS idx_ports_host ON ports(host_id);
+"""
+
+# Columns added to existing tables after their first release: stores created
+# by older versions get them on open (ALTER TABLE ADD COLUMN, in this order).
+ADDED_COLUMNS = [
+    ("hosts", "regex_parsed", "TEXT"),
+    ("hosts", "incomplete", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+def scan_profile(port_spec: Optional[str], nmap_args: Iterable[str]) -> str:
+    """
+    Short fingerprint of the scan settings.
+    Results are only reused between scans with the same profile.
+    """
+    payload = json.dumps([port_spec or "", list(nmap_args)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ResultStore:
+    """
+    SQLite-backed store of HostResult/PortInfo records.
+
+    The connection is shared between threads and guarded by a lock.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            self._add_missing_columns()
+
+    def _add_missing_columns(self) -> None:
+        for table, column, decl in ADDED_COLUMNS:
+            existing = {r["name"] for r in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------------- Writing ----------------
+    def record_scan(
+        self,
+        hosts: List[HostResult],
+        coverage: TargetSet,
+        port_spec: Optional[str],
+        nmap_args: List[str],
+        command: str = "",
+        started_at: Optional[float] = None,
+    ) -> int:
+        """
+        Saves one completed scan and returns its id.
+
+        ``coverage`` is the set of addresses the scan actually covered,
+        including addresses that turned out to be down.
+        """
+        finished_at = time.time()
+        started_at = started_at or finished_at
+        profile = scan_profile(port_spec, nmap_args)
+
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO scans (started_at, finished_at, profile, port_spec, nmap_args, command) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (started_at, finished_at, profile, port_spec, json.dumps(nmap_args), command),
+            )
+            scan_id = cur.lastrowid
+
+            self._conn.executemany(
+                "INSERT INTO coverage (scan_id, profile, scanned_at, range_start, range_end) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((scan_id, profile, finished_at, s, e) for s, e in coverage.intervals()),
+            )
+
+            for host in hosts:
+                cur = self._conn.execute(
+                    "INSERT INTO hosts (scan_id, profile, scanned_at, ip, hostname, status, "
+                    "os_name, os_accuracy, scripts, regex_parsed, incomplete) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        scan_id, profile, finished_at, host.ip, host.hostname, host.status,
+                        host.os_name, host.os_accuracy, json.dumps(host.scripts),
+                        json.dumps(host.regex_parsed), int(host.incomplete),
+                    ),
+                )
+                host_id = cur.lastrowid
+                self._conn.executemany(
+                    "INSERT INTO ports (host_id, port, protocol, state, reason, service, "
+                    "product, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (host_id, p.port, p.protocol, p.state, p.reason,
+                         p.service, p.product, p.version)
+                        for p in host.ports
+                    ),
+                )
+
+        return scan_id
+
+    # ---------------- Reading ----------------
+    def fresh_coverage(self, profile: str, max_age: float) -> TargetSet:
+        """Addresses scanned with ``profile`` within the last ``max_age`` seconds."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT range_start, range_end FROM coverage WHERE profile = ? AND scanned_at >= ?",
+                (profile, cutoff),
+            ).fetchall()
+        return TargetSet((r["range_start"], r["range_end"]) for r in rows)
+
+    def load_hosts(
+        self,
+        profile: Optional[str],
+        max_age: Optional[float] = None,
+        within: Optional[TargetSet] = None,
+    ) -> List[HostResult]:
+        """
+        Returns the most recent stored result per IP for ``profile``
+        (None: the most recent result per IP of any profile).
+
+        - max_age: only consider results newer than this many seconds
+        - within: only return hosts whose IP is in this set
+        """
+        cutoff = time.time() - max_age if max_age is not None else 0.0
+
+        with self._lock:
+            if profile is not None:
+                host_rows = self._conn.execute(
+                    "SELECT h.* FROM hosts h JOIN ("
+                    "  SELECT ip, MAX(scanned_at) AS latest FROM hosts"
+                    "  WHERE profile = ? AND scanned_at >= ? GROUP BY ip"
+                    ") l ON h.ip = l.ip AND h.scanned_at = l.latest "
+                    "WHERE h.profile = ? ORDER BY h.id",
+                    (profile, cutoff, profile),
+                ).fetchall()
+            else:
+                host_rows = self._conn.execute(
+                    "SELECT h.* FROM hosts h JOIN ("
+                    "  SELECT ip, MAX(scanned_at) AS latest FROM hosts"
+                    "  WHERE scanned_at >= ? GROUP BY ip"
+                    ") l ON h.ip = l.ip AND h.scanned_at = l.latest "
+                    "GROUP BY h.ip ORDER BY h.id",
+                    (cutoff,),
+                ).fetchall()
+
+            if within is not None:
+                host_rows = [r for r in host_rows if r["ip"] in within]
+
+            ports_by_host = {}
+            for r in host_rows:
+                ports_by_host[r["id"]] = self._conn.execute(
+                    "SELECT * FROM ports WHERE host_id = ? ORDER BY rowid", (r["id"],)
+                ).fetchall()
+
+        hosts: List[HostResult] = []
+        for r in host_rows:
+            host = HostResult(
+                ip=r["ip"],
+                hostname=r["hostname"] or "",
+                status=r["status"] or "unknown",
+                os_name=r["os_name"] or "",
+                os_accuracy=r["os_accuracy"],
+                scripts=json.loads(r["scripts"] or "{}"),
+                regex_parsed=json.loads(r["regex_parsed"] or "{}"),
+                incomplete=bool(r["incomplete"]),
+            )
+            host.ports = [
+                PortInfo(
+                    port=p["port"],
+                    protocol=p["protocol"],
+                    state=p["state"],
+                    reason=p["reason"],
+                    service=p["service"],
+                    product=p["product"],
+                    version=p["version"],
+                )
+                for p in ports_by_host[r["id"]]
+            ]
+            hosts.append(host)
+
+        return hosts
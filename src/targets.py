@@ -8,11 +8,14 @@ import ipaddress
 # Regex to validate DNS hostnames
 import re
 
-from typing import List, Tuple
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
 
 # Regex pattern that checks if a string looks like a valid hostname
-HOSTNAME_RE = re.compile(r"^[a-zA-Z0-9\.\-]+$")
+# (never with a leading "-", which nmap would read as an option)
+HOSTNAME_RE = re.compile(r"^[a-zA-Z0-9\.][a-zA-Z0-9\.\-]*$")
 
 
 def split_items(raw: str) -> List[str]:
@@ -50,6 +53,43 @@ def classify(item: str) -> str:
     raise ValueError(f"Unrecognized target: {item}")
 
 
+def partition_targets(items: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Splits target specs (each may be comma-separated) into the ones a
+    TargetSet can hold and the rest, e.g. IPv6, which only nmap understands.
+    """
+    known: List[str] = []
+    other: List[str] = []
+    for value in items:
+        for item in split_items(value):
+            try:
+                classify(item)
+            except ValueError:
+                other.append(item)
+            else:
+                known.append(item)
+    return known, other
+
+
+def check_target_items(kind: str, values: Iterable[str]) -> None:
+    """
+    Raises ValueError unless every comma-separated item of ``values`` is a
+    target spec nmap can be handed safely: never an option (leading "-"),
+    always something classify() accepts or an IP network (e.g. IPv6).
+    """
+    for value in values:
+        for item in split_items(value) or [value]:
+            if item.startswith("-"):
+                raise ValueError(f"invalid {kind} {item!r}: must not start with '-'")
+            try:
+                classify(item)
+            except ValueError:
+                try:
+                    ipaddress.ip_network(item, strict=False)  # IPv6 is left to nmap
+                except ValueError:
+                    raise ValueError(f"invalid {kind} {item!r}") from None
+
+
 def separate_targets(raw: str) -> Tuple[List[str], List[str]]:
     """
     Splits all targets into two lists:
@@ -69,3 +109,233 @@ def separate_targets(raw: str) -> Tuple[List[str], List[str]]:
             cidrs.append(i)
 
     return singles, cidrs
+
+
+def _ip_to_int(ip: str) -> int:
+    return int(ipaddress.IPv4Address(ip))
+
+
+def _merge_intervals(intervals: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Sorts (start, end) pairs and merges any that overlap or touch.
+    Example: [(5, 9), (1, 3), (4, 4)] → [(1, 9)]
+    """
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class TargetSet:
+    """
+    Compact set of scan targets.
+
+    IPv4 addresses and CIDR ranges are stored as sorted, merged integer
+    intervals (two flat arrays), so a /8 costs two integers instead of
+    16 million strings. DNS names are kept as-is, since they cannot be
+    placed on the number line without resolving them.
+
+    Supports lazy iteration, O(log n) membership, len(), union (|),
+    difference (-) and chunking into shards for parallel scans.
+    """
+
+    __slots__ = ("_starts", "_ends", "_hostnames")
+
+    def __init__(
+        self,
+        intervals: Iterable[Tuple[int, int]] = (),
+        hostnames: Iterable[str] = (),
+    ) -> None:
+        merged = _merge_intervals(intervals)
+        self._starts = array("I", (s for s, _ in merged))
+        self._ends = array("I", (e for _, e in merged))
+        # dict keeps insertion order while removing duplicates
+        self._hostnames: Tuple[str, ...] = tuple(dict.fromkeys(h.lower() for h in hostnames))
+
+    # ---------------- Construction ----------------
+    @classmethod
+    def from_string(cls, raw: str) -> "TargetSet":
+        """
+        Builds a TargetSet from a comma-separated target string.
+        Example: "10.0.0.0/24, 10.0.1.5, host1.com"
+        """
+        singles, cidrs = separate_targets(raw)
+        intervals: List[Tuple[int, int]] = []
+        hostnames: List[str] = []
+
+        for item in singles:
+            if classify(item) == "ipv4":
+                n = _ip_to_int(item)
+                intervals.append((n, n))
+            else:
+                hostnames.append(item)
+
+        for item in cidrs:
+            net = ipaddress.IPv4Network(item, strict=False)
+            intervals.append((int(net.network_address), int(net.broadcast_address)))
+
+        return cls(intervals, hostnames)
+
+    @classmethod
+    def from_items(cls, items: Iterable[str]) -> "TargetSet":
+        """Builds a TargetSet from a list of targets (each may be comma-separated)."""
+        return cls.from_string(",".join(items))
+
+    # ---------------- Basic set behaviour ----------------
+    @property
+    def hostnames(self) -> Tuple[str, ...]:
+        """DNS names in the set (lower-cased, in first-seen order)."""
+        return self._hostnames
+
+    def intervals(self) -> List[Tuple[int, int]]:
+        """Merged (start, end) integer intervals, inclusive and sorted."""
+        return list(zip(self._starts, self._ends))
+
+    def address_count(self) -> int:
+        """Number of IPv4 addresses in the set (hostnames not included)."""
+        return sum(e - s + 1 for s, e in zip(self._starts, self._ends))
+
+    def __len__(self) -> int:
+        return self.address_count() + len(self._hostnames)
+
+    def __bool__(self) -> bool:
+        return bool(self._starts) or bool(self._hostnames)
+
+    def __iter__(self) -> Iterator[str]:
+        """Yields every target as a string, one at a time (never materialized)."""
+        for s, e in zip(self._starts, self._ends):
+            for n in range(s, e + 1):
+                yield str(ipaddress.IPv4Address(n))
+        yield from self._hostnames
+
+    def __contains__(self, item: Union[str, int]) -> bool:
+        if isinstance(item, str):
+            try:
+                item = _ip_to_int(item)
+            except ValueError:
+                return item.lower() in self._hostnames
+
+        # Last interval starting at or before item
+        idx = bisect_right(self._starts, item) - 1
+        return idx >= 0 and item <= self._ends[idx]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TargetSet):
+            return NotImplemented
+        return (
+            self._starts == other._starts
+            and self._ends == other._ends
+            and set(self._hostnames) == set(other._hostnames)
+        )
+
+    def __repr__(self) -> str:
+        return f"TargetSet({', '.join(self.to_specs())})"
+
+    # ---------------- Set algebra ----------------
+    def union(self, other: "TargetSet") -> "TargetSet":
+        return TargetSet(
+            self.intervals() + other.intervals(),
+            self._hostnames + other._hostnames,
+        )
+
+    def difference(self, other: "TargetSet") -> "TargetSet":
+        """Removes every address (and hostname) of ``other`` from this set."""
+        result: List[Tuple[int, int]] = []
+        other_iv = other.intervals()
+        j = 0
+
+        for start, end in self.intervals():
+            # Skip exclusions entirely below this interval
+            while j < len(other_iv) and other_iv[j][1] < start:
+                j += 1
+
+            k = j
+            while k < len(other_iv) and other_iv[k][0] <= end:
+                ex_start, ex_end = other_iv[k]
+                if ex_start > start:
+                    result.append((start, ex_start - 1))
+                start = max(start, ex_end + 1)
+                if start > end:
+                    break
+                k += 1
+
+            if start <= end:
+                result.append((start, end))
+
+        removed = set(other._hostnames)
+        return TargetSet(result, (h for h in self._hostnames if h not in removed))
+
+    __or__ = union
+    __sub__ = difference
+
+    # ---------------- Nmap / sharding helpers ----------------
+    def to_specs(self) -> List[str]:
+        """
+        Shortest list of nmap target specs covering the set.
+        Intervals are collapsed into CIDR blocks; lone addresses stay plain IPs.
+        """
+        specs: List[str] = []
+        for s, e in zip(self._starts, self._ends):
+            nets = ipaddress.summarize_address_range(
+                ipaddress.IPv4Address(s), ipaddress.IPv4Address(e)
+            )
+            for net in nets:
+                specs.append(str(net.network_address) if net.prefixlen == 32 else str(net))
+        specs.extend(self._hostnames)
+        return specs
+
+    def chunks(
+        self,
+        size: Optional[int] = None,
+        prefix: Optional[int] = None,
+    ) -> Iterator["TargetSet"]:
+        """
+        Splits the set into shards.
+
+        - size: maximum number of targets per shard
+        - prefix: shards never cross a /prefix boundary (e.g. 24 = per /24)
+
+        Hostnames are packed into their own shard(s) at the end.
+        """
+        if size is not None and size < 1:
+            raise ValueError("Shard size must be at least 1")
+        if prefix is not None and not 0 <= prefix <= 32:
+            raise ValueError("Shard prefix must be between 0 and 32")
+
+        block = 1 << (32 - prefix) if prefix is not None else None
+        current: List[Tuple[int, int]] = []
+        count = 0
+        key = None
+
+        for start, end in zip(self._starts, self._ends):
+            while start <= end:
+                piece_end = end
+
+                if block is not None:
+                    piece_key = start // block
+                    if current and piece_key != key:
+                        yield TargetSet(current)
+                        current, count = [], 0
+                    key = piece_key
+                    piece_end = min(piece_end, (piece_key + 1) * block - 1)
+
+                if size is not None:
+                    if count >= size:
+                        yield TargetSet(current)
+                        current, count = [], 0
+                    piece_end = min(piece_end, start + (size - count) - 1)
+
+                current.append((start, piece_end))
+                count += piece_end - start + 1
+                start = piece_end + 1
+
+        if current:
+            yield TargetSet(current)
+
+        step = size or len(self._hostnames)
+        for i in range(0, len(self._hostnames), max(1, step)):
+            yield TargetSet(hostnames=self._hostnames[i:i + step])
@@ -24,6 +24,9 @@ def expand_cidr(cidr: str) -> List[str]:
     """
     Takes a CIDR range like 192.168.1.0/24 and returns
     a list of every usable host address inside that network.
+
+    Only suitable for small ranges; use targets.TargetSet to plan
+    large ranges without materializing one string per host.
     """
     net = ipaddress.IPv4Network(cidr, strict=False)
     return [str(h) for h in net.hosts()]
\ No newline at end of file
@@ -1,5 +1,9 @@
-from typing import List, Dict, Any, Tuple
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import asyncio
 import socket
+import threading
 
 from .result_objects import HostResult
 
@@ -15,68 +19,148 @@ class WindowsEnumerator:
 
     This satisfies the requirement for actual SMB/NetBIOS enumeration attempts
     instead of just printing generic advice.
+
+    Probes for all hosts are run concurrently on an asyncio event loop, capped
+    at ``max_concurrency`` open connections overall and ``per_host_limit``
+    per host, so the phase takes about as long as the slowest probe.
     """
 
-    def __init__(self, timeout: float = 2.0) -> None:
+    def __init__(
+        self,
+        timeout: float = 2.0,
+        max_concurrency: int = 256,
+        per_host_limit: int = 2,
+    ) -> None:
         # Socket timeout in seconds for SMB/NetBIOS probes
         self.timeout = timeout
+        # Concurrency caps for the asyncio probe engine
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        # Number of SMB/NetBIOS probes attempted so far (for run metrics)
+        self.probes_run = 0
 
     # ---------------------------
     # Public API
     # ---------------------------
     def enumerate(self, hosts: List[HostResult]) -> None:
-        for host in hosts:
-            if not getattr(host, "is_windows", False) or not getattr(host, "is_up", False):
-                continue
-
-            smb_ports = self._find_smb_ports(host)
-            enum_notes: List[str] = []
+        candidates = [
+            host for host in hosts
+            if getattr(host, "is_windows", False) and getattr(host, "is_up", False)
+        ]
+
+        # Probe every host/port pair in one concurrent batch first...
+        smb_ports = {id(host): self._find_smb_ports(host) for host in candidates}
+        pairs = [(host.ip, port) for host in candidates for port in smb_ports[id(host)]]
+        self.probes_run += len(pairs)
+        probe_results = self._run_probes(pairs)
+
+        # ...then write the notes host by host, in the original order
+        for host in candidates:
+            self._record_host(host, smb_ports[id(host)], probe_results)
+
+    def enumerate_stream(self, hosts: Iterable[HostResult]) -> Iterator[HostResult]:
+        """Enumerate hosts as they are streamed in, yielding each once it is done.
+
+        Probes are submitted to one background event loop as hosts arrive, so
+        they overlap with the probes of later hosts under the same concurrency
+        caps as :meth:`enumerate`. Hosts are yielded in arrival order.
+        """
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="smb-probes", daemon=True)
+        thread.start()
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
 
+        pending: Deque[Tuple[HostResult, List[int], Optional[Future]]] = deque()
+        try:
+            for host in hosts:
+                if getattr(host, "is_windows", False) and getattr(host, "is_up", False):
+                    smb_ports = self._find_smb_ports(host)
+                    pairs = [(host.ip, port) for port in smb_ports]
+                    self.probes_run += len(pairs)
+                    future = asyncio.run_coroutine_threadsafe(
+                        self._probe_pairs(pairs, global_limit, host_limits), loop
+                    )
+                    pending.append((host, smb_ports, future))
+                else:
+                    pending.append((host, [], None))
+
+                # Hand on every host at the head whose probes have finished
+                while pending and (pending[0][2] is None or pending[0][2].done()):
+                    yield self._finish_streamed(*pending.popleft())
+
+            while pending:
+                yield self._finish_streamed(*pending.popleft())
+        finally:
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def _finish_streamed(
+        self, host: HostResult, smb_ports: List[int], future: Optional[Future]
+    ) -> HostResult:
+        """Write the notes for a streamed host once its probes are in."""
+        if future is not None:
+            self._record_host(host, smb_ports, future.result())
+        return host
+
+    def _record_host(
+        self,
+        host: HostResult,
+        smb_ports: List[int],
+        probe_results: Dict[Tuple[str, int], Tuple[str, str]],
+    ) -> None:
+        """Build the enumeration notes for one host from its probe results."""
+        enum_notes: List[str] = []
+
+        enum_notes.append(
+            f"Host {host.ip} appears to be Windows ({getattr(host, 'os_name', 'Unknown OS')})."
+        )
+
+        if not smb_ports:
+            enum_notes.append("No open SMB/NetBIOS ports (137/139/445) detected in scan.")
+        else:
             enum_notes.append(
-                f"Host {host.ip} appears to be Windows ({getattr(host, 'os_name', 'Unknown OS')})."
+                "Detected potential SMB/NetBIOS ports from scan: "
+                + ", ".join(str(p) for p in smb_ports)
             )
-
-            if not smb_ports:
-                enum_notes.append("No open SMB/NetBIOS ports (137/139/445) detected in scan.")
-            else:
-                enum_notes.append(
-                    "Detected potential SMB/NetBIOS ports from scan: "
-                    + ", ".join(str(p) for p in smb_ports)
-                )
-                # Real enumeration attempt: TCP connect to 445/139
-                for port in sorted(smb_ports):
-                    status, detail = self._probe_smb_port(host.ip, port)
-                    enum_notes.append(f"SMB probe on {host.ip}:{port} → {status}")
-                    if detail:
-                        enum_notes.append(f"    {detail}")
-
-            # Summarise any existing nmap smb-* scripts (if present)
-            script_summary = self._summarise_smb_scripts(getattr(host, "scripts", {}))
-            if script_summary:
-                enum_notes.append("")
-                enum_notes.append("Summary of SMB-related script output from scan:")
-                enum_notes.extend(f"  - {line}" for line in script_summary)
-
-            # Always include some guidance as well
+            # Real enumeration attempt: TCP connect to 445/139
+            for port in sorted(smb_ports):
+                status, detail = probe_results[(host.ip, port)]
+                enum_notes.append(f"SMB probe on {host.ip}:{port} → {status}")
+                if detail:
+                    enum_notes.append(f"    {detail}")
+
+        # Summarise any existing nmap smb-* scripts (if present)
+        script_summary = self._summarise_smb_scripts(getattr(host, "scripts", {}))
+        if script_summary:
             enum_notes.append("")
-            enum_notes.append("Suggested follow-up (manual) checks:")
-            enum_notes.append("  - Inspect SMB shares and SMB signing configuration.")
-            enum_notes.append("  - Review RDP exposure and authentication settings.")
-            enum_notes.append("  - Check for legacy protocols (SMBv1, LM/NTLM).")
-            enum_notes.append(
-                "  - Perform authenticated patch level review if credentials are available."
-            )
-
-            # Store detailed enumeration results under a dedicated key
-            scripts_obj = getattr(host, "scripts", None)
-            if scripts_obj is None or not isinstance(scripts_obj, dict):
-                scripts_obj = {}
-                setattr(host, "scripts", scripts_obj)
-
-            scripts_obj.setdefault(
-                "sonartrace-windows-enum",
-                "\n".join(enum_notes),
-            )
+            enum_notes.append("Summary of SMB-related script output from scan:")
+            enum_notes.extend(f"  - {line}" for line in script_summary)
+
+        # Always include some guidance as well
+        enum_notes.append("")
+        enum_notes.append("Suggested follow-up (manual) checks:")
+        enum_notes.append("  - Inspect SMB shares and SMB signing configuration.")
+        enum_notes.append("  - Review RDP exposure and authentication settings.")
+        enum_notes.append("  - Check for legacy protocols (SMBv1, LM/NTLM).")
+        enum_notes.append(
+            "  - Perform authenticated patch level review if credentials are available."
+        )
+
+        # Store detailed enumeration results under a dedicated key
+        scripts_obj = getattr(host, "scripts", None)
+        if scripts_obj is None or not isinstance(scripts_obj, dict):
+            scripts_obj = {}
+            setattr(host, "scripts", scripts_obj)
+
+        scripts_obj.setdefault(
+            "sonartrace-windows-enum",
+            "\n".join(enum_notes),
+        )
 
     # ---------------------------
     # Internal helpers
@@ -109,6 +193,92 @@ class WindowsEnumerator:
 
         return sorted(set(smb_ports))
 
+    def _run_probes(
+        self, pairs: List[Tuple[str, int]]
+    ) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        """Probe all (ip, port) pairs concurrently and return their results."""
+        if not pairs:
+            return {}
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._probe_all(pairs))
+
+        # Already inside an event loop (can't nest asyncio.run): run the
+        # batch on a loop of its own in a helper thread
+        future: Future = Future()
+
+        def _run() -> None:
+            try:
+                future.set_result(asyncio.run(self._probe_all(pairs)))
+            except BaseException as e:
+                future.set_exception(e)
+
+        thread = threading.Thread(target=_run, name="smb-probes", daemon=True)
+        thread.start()
+        thread.join()
+        return future.result()
+
+    async def _probe_all(
+        self, pairs: List[Tuple[str, int]]
+    ) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+        return await self._probe_pairs(pairs, global_limit, host_limits)
+
+    async def _probe_pairs(
+        self,
+        pairs: List[Tuple[str, int]],
+        global_limit: asyncio.Semaphore,
+        host_limits: Dict[str, asyncio.Semaphore],
+    ) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        async def _bounded(ip: str, port: int) -> Tuple[str, str]:
+            host_limit = host_limits.setdefault(ip, asyncio.Semaphore(self.per_host_limit))
+            async with host_limit, global_limit:
+                return await self._probe_smb_port_async(ip, port)
+
+        results = await asyncio.gather(*(_bounded(ip, port) for ip, port in pairs))
+        return dict(zip(pairs, results))
+
+    async def _probe_smb_port_async(self, ip: str, port: int) -> Tuple[str, str]:
+        """Asyncio version of :meth:`_probe_smb_port` with identical results."""
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, port), timeout=self.timeout
+            )
+        except (ConnectionRefusedError, TimeoutError, asyncio.TimeoutError):
+            return (
+                "unreachable",
+                "TCP connection failed or timed out — service may be filtered or closed.",
+            )
+        except OSError as e:
+            return ("error", f"OS error during SMB probe: {e!r}")
+
+        try:
+            try:
+                data = await asyncio.wait_for(reader.read(64), timeout=self.timeout)
+            except (TimeoutError, asyncio.TimeoutError):
+                data = b""
+        except OSError as e:
+            return ("error", f"OS error during SMB probe: {e!r}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+        if data:
+            return (
+                "reachable (received response bytes)",
+                f"Received {len(data)} bytes from {ip}:{port} (raw SMB/NetBIOS response).",
+            )
+        return (
+            "reachable (no immediate banner)",
+            "TCP handshake to SMB port succeeded, but no banner within timeout.",
+        )
+
     def _probe_smb_port(self, ip: str, port: int) -> Tuple[str, str]:
         """Attempt a real TCP connection to an SMB/NetBIOS port.
 
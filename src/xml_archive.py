@@ -0,0 +1,278 @@
+"""
+xml_archive.py – Compressed raw nmap XML with a per-host index.
+
+The gzip sidecar (report_builder.open_raw_sidecar) has to be decompressed
+from the start to find anything in it. An archive instead stores the raw
+XML as a series of independently zlib-compressed blocks, and a separate
+index file maps every host address to the block and byte range of its
+``<host>`` element, so one host's raw output can be read by decompressing
+a single block.
+
+Archive (``*.sxa``)::
+
+    b"SXA1"  then per block:  uint32 length | zlib data
+
+Blocks hold about BLOCK_SIZE bytes of XML and are only cut between
+``<host>`` elements, so a host never spans two blocks. Decompressing all
+blocks in order gives back exactly the text that was written.
+
+Index (``*.sxa.idx``), written when the archive is closed::
+
+    b"SXI1" | uint32 count  then ``count`` records sorted by address:
+    uint32 ipv4 | uint64 block offset | uint32 offset in block | uint32 length
+
+Readers memory-map the index and binary-search it, so lookups cost a few
+page reads however large the archive is. Hosts without an IPv4 address
+are kept in the archive but not indexed.
+"""
+
+import ipaddress
+import mmap
+import re
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+ARCHIVE_MAGIC = b"SXA1"
+INDEX_MAGIC = b"SXI1"
+ARCHIVE_SUFFIX = ".sxa"
+INDEX_SUFFIX = ".idx"
+# Uncompressed bytes per block: large enough to compress well, small
+# enough that reading one host stays cheap
+BLOCK_SIZE = 256 * 1024
+
+_BLOCK_HEADER = struct.Struct(">I")
+_INDEX_HEADER = struct.Struct(">4sI")
+_RECORD = struct.Struct(">IQII")
+
+_HOST_START_RE = re.compile(rb"<host[\s>]")
+# A host ends with </host>, or (cut-off output) where the next document starts
+_HOST_END_RE = re.compile(rb"</host>|<\?xml")
+_ADDRESS_RE = re.compile(rb'<address addr="([0-9.]+)" addrtype="ipv4"')
+
+
+def index_path(archive_path: Union[str, Path]) -> Path:
+    archive_path = Path(archive_path)
+    return archive_path.with_name(archive_path.name + INDEX_SUFFIX)
+
+
+class XmlArchiveWriter:
+    """
+    Writes raw nmap XML to an archive; used like a text file.
+
+    ``write()`` may be called from several threads (sharded scans hand
+    over each shard's output from its own thread). The index is only
+    written by ``close()``.
+    """
+
+    def __init__(self, path: Union[str, Path], block_size: int = BLOCK_SIZE) -> None:
+        self.path = Path(path)
+        self.block_size = block_size
+        self._fh: BinaryIO = open(self.path, "wb")
+        self._fh.write(ARCHIVE_MAGIC)
+        self._lock = threading.Lock()
+        self._buf = bytearray()
+        self._scan_pos = 0
+        self._host_start: Optional[int] = None
+        # (start, end) of complete hosts in _buf, in order
+        self._hosts: List[Tuple[int, int]] = []
+        # Where _buf can be cut without splitting a host
+        self._safe_cut = 0
+        self._records: List[Tuple[int, int, int, int]] = []
+        self._closed = False
+
+    def __enter__(self) -> "XmlArchiveWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, text: str) -> int:
+        data = text.encode("utf-8")
+        with self._lock:
+            self._buf += data
+            self._scan()
+            if self._safe_cut >= self.block_size:
+                self._flush_block(self._safe_cut)
+        return len(text)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._host_start is not None:
+                # Output ended inside a host: keep what there is of it
+                self._hosts.append((self._host_start, len(self._buf)))
+                self._host_start = None
+            if self._buf:
+                self._flush_block(len(self._buf))
+            self._fh.close()
+            self._write_index()
+
+    # ------------------------------------------------------------
+    # Internals (called with the lock held)
+    # ------------------------------------------------------------
+    def _scan(self) -> None:
+        """Finds the host elements completed by the data just added."""
+        while True:
+            if self._host_start is None:
+                m = _HOST_START_RE.search(self._buf, self._scan_pos)
+                if m is None:
+                    # A tag may be split across writes; rescan its beginning
+                    self._scan_pos = max(self._scan_pos, len(self._buf) - 6)
+                    self._safe_cut = self._scan_pos
+                    return
+                self._host_start = m.start()
+                self._scan_pos = m.end()
+            m = _HOST_END_RE.search(self._buf, self._scan_pos)
+            if m is None:
+                self._scan_pos = max(self._scan_pos, len(self._buf) - 6)
+                self._safe_cut = self._host_start
+                return
+            end = m.end() if m.group() == b"</host>" else m.start()
+            self._hosts.append((self._host_start, end))
+            self._host_start = None
+            self._scan_pos = end
+            self._safe_cut = end
+
+    def _flush_block(self, cut: int) -> None:
+        block_offset = self._fh.tell()
+        compressed = zlib.compress(bytes(self._buf[:cut]), 6)
+        self._fh.write(_BLOCK_HEADER.pack(len(compressed)))
+        self._fh.write(compressed)
+
+        kept: List[Tuple[int, int]] = []
+        for start, end in self._hosts:
+            if end > cut:
+                kept.append((start - cut, end - cut))
+                continue
+            m = _ADDRESS_RE.search(self._buf, start, end)
+            if m is not None:
+                ip = int(ipaddress.IPv4Address(m.group(1).decode("ascii")))
+                self._records.append((ip, block_offset, start, end - start))
+
+        del self._buf[:cut]
+        self._hosts = kept
+        self._scan_pos = max(0, self._scan_pos - cut)
+        self._safe_cut = max(0, self._safe_cut - cut)
+        if self._host_start is not None:
+            self._host_start -= cut
+
+    def _write_index(self) -> None:
+        # Sorted by address, then archive order (a staged scan reports a host once per phase)
+        self._records.sort()
+        with open(index_path(self.path), "wb") as f:
+            f.write(_INDEX_HEADER.pack(INDEX_MAGIC, len(self._records)))
+            for record in self._records:
+                f.write(_RECORD.pack(*record))
+
+
+class XmlArchive:
+    """
+    Read access to an archive written by XmlArchiveWriter.
+
+    ``host_xml(ip)`` returns the raw ``<host>`` element(s) of one address
+    by decompressing only the block(s) they are in; ``text()`` /
+    ``iter_text()`` give back the complete raw output.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._fh: BinaryIO = open(self.path, "rb")
+        if self._fh.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            self._fh.close()
+            raise ValueError(f"{self.path} is not a SonarTrace XML archive")
+
+        self._index: Optional[mmap.mmap] = None
+        self._count = 0
+        idx = index_path(self.path)
+        if idx.exists():
+            with open(idx, "rb") as f:
+                self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self._count = _INDEX_HEADER.unpack_from(self._index, 0)
+            if magic != INDEX_MAGIC:
+                self.close()
+                raise ValueError(f"{idx} is not a SonarTrace archive index")
+
+    def __enter__(self) -> "XmlArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        self._fh.close()
+
+    def __len__(self) -> int:
+        """Number of indexed host elements."""
+        return self._count
+
+    # ------------------------------------------------------------
+    # Per-host access
+    # ------------------------------------------------------------
+    def host_xml(self, ip: str) -> List[str]:
+        """Raw ``<host>`` elements reported for ``ip``, in archive order."""
+        key = int(ipaddress.IPv4Address(ip))
+        i = self._lower_bound(key)
+        elements: List[str] = []
+        block_cache: Tuple[int, bytes] = (-1, b"")
+        while i < self._count:
+            address, block_offset, start, length = self._record(i)
+            if address != key:
+                break
+            if block_cache[0] != block_offset:
+                block_cache = (block_offset, self._read_block(block_offset))
+            elements.append(block_cache[1][start:start + length].decode("utf-8"))
+            i += 1
+        return elements
+
+    def addresses(self) -> Iterator[str]:
+        """Indexed addresses in ascending order (each once)."""
+        previous = None
+        for i in range(self._count):
+            address = self._record(i)[0]
+            if address != previous:
+                previous = address
+                yield str(ipaddress.IPv4Address(address))
+
+    def _record(self, i: int) -> Tuple[int, int, int, int]:
+        return _RECORD.unpack_from(self._index, _INDEX_HEADER.size + i * _RECORD.size)
+
+    def _lower_bound(self, key: int) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # ------------------------------------------------------------
+    # Whole-archive access
+    # ------------------------------------------------------------
+    def iter_text(self) -> Iterator[str]:
+        """The complete raw XML, one decompressed block at a time."""
+        offset = len(ARCHIVE_MAGIC)
+        while True:
+            self._fh.seek(offset)
+            header = self._fh.read(_BLOCK_HEADER.size)
+            if len(header) < _BLOCK_HEADER.size:
+                return
+            (length,) = _BLOCK_HEADER.unpack(header)
+            yield zlib.decompress(self._fh.read(length)).decode("utf-8")
+            offset += _BLOCK_HEADER.size + length
+
+    def text(self) -> str:
+        return "".join(self.iter_text())
+
+    def _read_block(self, offset: int) -> bytes:
+        self._fh.seek(offset)
+        (length,) = _BLOCK_HEADER.unpack(self._fh.read(_BLOCK_HEADER.size))
+        return zlib.decompress(self._fh.read(length))
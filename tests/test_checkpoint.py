@@ -0,0 +1,75 @@
+"""
+test_checkpoint.py – Run directories: journal ordering and resuming.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from src.checkpoint import RunDirectory, shard_key
+from src.enumerator import enumerate_hosts
+from src.nmap_handler import NmapHandler
+
+FAKE_NMAP = f"{sys.executable} {Path(__file__).resolve().parents[1] / 'benchmarks' / 'fake-nmap'}"
+
+
+def _handler(**kwargs):
+    return NmapHandler(
+        ["127.0.0.0/28"], shard_size=4, workers=2,
+        nmap_binary=f"{FAKE_NMAP} --fake-up-ratio 1", **kwargs,
+    )
+
+
+def _saved_hosts(run_dir, key):
+    if not run_dir.hosts_path.exists():
+        return 0
+    with open(run_dir.hosts_path, encoding="utf-8") as f:
+        return sum(1 for line in f if json.loads(line)["shard"] == key)
+
+
+class RecordingRunDirectory(RunDirectory):
+    """Remembers how many hosts were saved per shard when it was journaled."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorded = {}
+        self.saved_at_done = {}
+
+    def record_host(self, shard_idx, host):
+        super().record_host(shard_idx, host)
+        self.recorded[shard_idx] = self.recorded.get(shard_idx, 0) + 1
+
+    def shard_done(self, shard_idx):
+        key = shard_key(self._shards[shard_idx])
+        self.saved_at_done[shard_idx] = _saved_hosts(self, key)
+        super().shard_done(shard_idx)
+
+
+def test_shard_is_journaled_after_all_its_hosts(tmp_path):
+    run_dir = RecordingRunDirectory.create(tmp_path / "run", ["127.0.0.0/28"])
+    hosts, _, _ = enumerate_hosts(_handler(), checkpoint=run_dir)
+
+    assert len(hosts) == 16
+    assert len(run_dir.completed_shards()) == 4
+    assert run_dir.saved_at_done == run_dir.recorded
+    assert sum(run_dir.saved_at_done.values()) == 16
+
+
+def test_resume_skips_finished_shards(tmp_path):
+    path = tmp_path / "run"
+    first = RunDirectory.create(path, ["127.0.0.0/28"])
+    enumerate_hosts(_handler(), checkpoint=first)
+
+    # Crash after two shards: only their journal lines made it to disk
+    lines = first.journal_path.read_text(encoding="utf-8").splitlines(keepends=True)
+    first.journal_path.write_text("".join(lines[:2]), encoding="utf-8")
+    done = [json.loads(line)["targets"] for line in lines[:2]]
+
+    resumed = RunDirectory.open(path)
+    hosts, _, command = enumerate_hosts(_handler(), checkpoint=resumed)
+
+    assert command.startswith("(resumed: 2 shard(s)")
+    for targets in done:
+        assert " ".join(targets) not in command
+    assert sorted(h.ip for h in hosts) == sorted(f"127.0.0.{n}" for n in range(16))
+    assert len(resumed.completed_shards()) == 4
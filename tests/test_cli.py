@@ -0,0 +1,21 @@
+"""
+test_cli.py – cli.main runs the same pipeline as ``python -m src``.
+"""
+
+import sys
+from pathlib import Path
+
+from src import cli
+
+FAKE_NMAP = f"{sys.executable} {Path(__file__).resolve().parents[1] / 'benchmarks' / 'fake-nmap'}"
+
+
+def test_cli_main_writes_the_report(tmp_path):
+    report = tmp_path / "report.md"
+    cli.main([
+        "127.0.0.0/30", "--nmap-binary", f"{FAKE_NMAP} --fake-up-ratio 1", "-o", str(report),
+    ])
+
+    text = report.read_text(encoding="utf-8")
+    assert "127.0.0.0/30" in text
+    assert "127.0.0.3" in text
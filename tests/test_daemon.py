@@ -0,0 +1,85 @@
+"""
+test_daemon.py – Validation of scan requests and request bodies submitted to the daemon.
+"""
+
+import http.client
+import socket
+import threading
+
+import pytest
+
+from src.daemon import RequestError, ScanPolicy, ScanRequest, ScanService, make_server
+from src.targets import classify
+
+
+@pytest.mark.parametrize("targets", [
+    ["--script", "http-shellshock", "10.0.0.1"],
+    ["-oN", "/tmp/pwn", "10.0.0.1"],
+    ["10.0.0.1,-iL"],
+    ["not a target"],
+])
+@pytest.mark.parametrize("allow_dns", [False, True])
+def test_option_like_targets_are_rejected(targets, allow_dns):
+    with pytest.raises(RequestError):
+        ScanRequest.from_json({"targets": targets}, ScanPolicy(allow_dns=allow_dns))
+
+
+def test_option_like_excludes_are_rejected():
+    with pytest.raises(RequestError):
+        ScanRequest.from_json(
+            {"targets": ["10.0.0.0/24"], "excludes": ["-oN"]}, ScanPolicy(allow_dns=True)
+        )
+
+
+def test_hostnames_and_ranges_pass_with_allow_dns():
+    request = ScanRequest.from_json(
+        {"targets": ["host.example.com", "10.0.0.1-50"], "excludes": ["10.0.0.5"]},
+        ScanPolicy(allow_dns=True),
+    )
+    assert request.targets == ["host.example.com", "10.0.0.1-50"]
+
+
+def test_hostname_never_starts_with_dash():
+    with pytest.raises(ValueError):
+        classify("-oN")
+    assert classify("host-1.example.com") == "dns"
+
+
+@pytest.mark.parametrize("field", [{"shard_prefix": 40}, {"shard_size": 0}, {"workers": 0}])
+def test_out_of_range_sharding_is_rejected(field):
+    with pytest.raises(RequestError):
+        ScanRequest.from_json(dict({"targets": ["10.0.0.0/24"]}, **field), ScanPolicy())
+
+
+@pytest.fixture
+def api(tmp_path):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = make_server(f"127.0.0.1:{port}", ScanService(tmp_path / "jobs", ScanPolicy()))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def _post(address, length, body=b""):
+    conn = http.client.HTTPConnection(*address, timeout=5)
+    conn.putrequest("POST", "/jobs")
+    if length is not None:
+        conn.putheader("Content-Length", length)
+    conn.endheaders(body)
+    status = conn.getresponse().status
+    conn.close()
+    return status
+
+
+@pytest.mark.parametrize("length,status", [(None, 411), ("abc", 400), ("-5", 400)])
+def test_bad_content_length_is_rejected(api, length, status):
+    assert _post(api, length) == status
+
+
+def test_job_with_content_length_is_accepted(api):
+    body = b'{"targets": ["10.0.0.1"]}'
+    assert _post(api, str(len(body)), body) == 202
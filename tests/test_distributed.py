@@ -0,0 +1,115 @@
+"""
+test_distributed.py – Coordinator addresses, authentication and local clusters.
+"""
+
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from src.distributed import Coordinator, check_unit, handshake_proof, parse_address, run_worker
+from src.enumerator import enumerate_hosts
+from src.nmap_handler import NmapHandler
+
+FAKE_NMAP = f"{sys.executable} {Path(__file__).resolve().parents[1] / 'benchmarks' / 'fake-nmap'}"
+
+
+def test_bare_port_binds_loopback():
+    assert parse_address(":7700") == ("tcp", ("127.0.0.1", 7700))
+    assert parse_address("unix:/run/st.sock") == ("unix", "/run/st.sock")
+
+
+@pytest.mark.parametrize("address", ["0.0.0.0:7700", "10.1.2.3:7700", "[::]:7700", "scan.example:7700"])
+def test_token_required_beyond_loopback(address):
+    with pytest.raises(ValueError, match="cluster token"):
+        Coordinator(address)
+    Coordinator(address, token="s3cret")
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1:7700", ":7700", "[::1]:7700", "localhost:7700", "unix:/tmp/st.sock"])
+def test_no_token_needed_locally(address):
+    Coordinator(address)
+
+
+def test_handshake_proves_the_token_both_ways():
+    coordinator = Coordinator("127.0.0.1:7700", token="s3cret")
+    hello = {"type": "hello", "worker": "scan-01", "nonce": "n-worker"}
+    challenge = coordinator.challenge(hello)
+
+    assert "s3cret" not in str(challenge)
+    nonces = ("n-worker", challenge["nonce"])
+    assert challenge["proof"] == handshake_proof("s3cret", "coordinator", *nonces)
+    assert challenge["proof"] != handshake_proof("guess", "coordinator", *nonces)
+
+    def auth(token):
+        proof = handshake_proof(token, "worker", challenge["nonce"], "n-worker")
+        return {"type": "auth", "proof": proof}
+
+    assert coordinator.connect(hello, challenge, auth("guess"), "peer") is None
+    assert coordinator.connect(hello, challenge, auth(None), "peer") is None
+    assert coordinator.connect(hello, challenge, auth("s3cret"), "peer").startswith("scan-01@peer")
+
+
+def _unit(targets=("10.0.0.0/30",), **options):
+    return {"id": 0, "targets": list(targets), "options": options}
+
+
+@pytest.mark.parametrize("unit", [
+    _unit(["--script", "http-shellshock", "10.0.0.1"]),
+    _unit(["10.0.0.1,-iL"]),
+    _unit(["not a target"]),
+    _unit(excludes=["-oN"]),
+    _unit(extra_args=["--script", "smb-brute"]),
+    _unit(ports="80 --script x"),
+    _unit(host_timeout="15m; rm"),
+    _unit(max_rate="100"),
+])
+def test_worker_refuses_unsafe_units(unit):
+    with pytest.raises(ValueError):
+        check_unit(unit)
+
+
+def test_worker_accepts_target_specs_and_allowed_nmap_args():
+    check_unit(_unit(["10.0.0.0/30", "host-1.example.com", "10.0.1.1-50", "2001:db8::/126"],
+                     excludes=["10.0.0.1", "::1"], ports="T:22,80-90,U:53", max_rate=500,
+                     host_timeout="15m"))
+    check_unit(_unit(extra_args=["-sV", "--version-light"]), allow_nmap_args=True)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _handler():
+    return NmapHandler(["127.0.0.0/27"], shard_size=4, workers=3, nmap_binary=FAKE_NMAP)
+
+
+def test_local_workers_scan_all_units_and_hosts_are_merged():
+    address = f"127.0.0.1:{_free_port()}"
+    coordinator = Coordinator(address, token="s3cret")
+    outcome = {}
+
+    def _coordinate():
+        outcome["hosts"], _, outcome["command"] = enumerate_hosts(
+            _handler(), coordinator=coordinator
+        )
+
+    thread = threading.Thread(target=_coordinate)
+    thread.start()
+    # Slow enough that every worker connects before the units run out
+    slow_nmap = f"{FAKE_NMAP} --fake-latency 0.2"
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        scanned = list(pool.map(
+            lambda n: run_worker(address, slow_nmap, token="s3cret", name=f"w{n}"), range(3)
+        ))
+    thread.join(timeout=60)
+
+    expected, _, _ = enumerate_hosts(_handler())
+    assert sum(scanned) == 8 and min(scanned) >= 1 and expected
+    assert [h.to_dict() for h in outcome["hosts"]] == [h.to_dict() for h in expected]
+    assert outcome["command"].count("[w") == 8
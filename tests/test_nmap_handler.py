@@ -0,0 +1,49 @@
+"""
+test_nmap_handler.py – Exclude handling in the nmap command line.
+"""
+
+import pytest
+
+from src.nmap_handler import NmapHandler
+
+
+def _exclude_arg(cmd):
+    return cmd[cmd.index("--exclude") + 1] if "--exclude" in cmd else None
+
+
+def test_address_targets_subtract_excludes_client_side():
+    cmd = NmapHandler(["10.0.0.0/30"], excludes=["10.0.0.1"]).build_command()
+    assert _exclude_arg(cmd) is None
+    assert cmd[-2:] == ["10.0.0.0", "10.0.0.2/31"]
+
+
+def test_range_target_passes_address_excludes_to_nmap():
+    cmd = NmapHandler(["10.0.0.1-50"], excludes=["10.0.0.5"]).build_command()
+    assert _exclude_arg(cmd) == "10.0.0.5"
+    assert cmd[-1] == "10.0.0.1-50"
+
+
+def test_hostname_target_passes_address_excludes_to_nmap():
+    cmd = NmapHandler(
+        ["scanme.example.com", "10.0.0.0/24"],
+        excludes=["10.0.0.5", "192.168.1.0/24", "old.example.com"],
+    ).build_command()
+    assert _exclude_arg(cmd).split(",") == ["10.0.0.5", "192.168.1.0/24", "old.example.com"]
+    assert "scanme.example.com" in cmd
+
+
+def test_hostname_exclude_alone_is_passed_to_nmap():
+    cmd = NmapHandler(["10.0.0.0/24"], excludes=["old.example.com"]).build_command()
+    assert _exclude_arg(cmd) == "old.example.com"
+
+
+def test_ipv6_excludes_are_passed_to_nmap_unchanged():
+    handler = NmapHandler(["10.0.0.0/30"], excludes=["::1", "10.0.0.1", "2001:db8::/64"])
+    cmd = handler.build_command()
+    assert _exclude_arg(cmd) == "::1,2001:db8::/64"
+    assert cmd[-2:] == ["10.0.0.0", "10.0.0.2/31"]
+
+
+def test_unrecognized_exclude_is_still_rejected():
+    with pytest.raises(ValueError, match="Unrecognized target"):
+        NmapHandler(["10.0.0.0/30"], excludes=["-oN"])
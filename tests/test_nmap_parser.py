@@ -0,0 +1,60 @@
+"""
+test_nmap_parser.py – Salvaging hosts from truncated nmap XML.
+"""
+
+import pytest
+
+from src.nmap_parser import NmapParser
+
+HOST_XML = (
+    '<host><status state="up"/><address addr="{ip}" addrtype="ipv4"/>'
+    '<ports><port protocol="tcp" portid="{port}"><state state="open"/>'
+    '<service name="svc"/></port></ports></host>\n'
+)
+DOCUMENT = (
+    '<?xml version="1.0"?>\n<nmaprun scanner="nmap" args="nmap -oX - 10.0.0.0/30">\n'
+    '<taskprogress task="SYN Stealth Scan" percent="50.00"/>\n'
+    + HOST_XML.format(ip="10.0.0.1", port=22)
+    + HOST_XML.format(ip="10.0.0.2", port=80)
+    + '<runstats><finished time="1"/></runstats></nmaprun>\n'
+)
+
+
+def _chunks(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_complete_document_parses_the_same_in_chunks():
+    parser = NmapParser()
+    whole = [(h.ip, [p.port for p in h.ports], h.incomplete) for h in parser.parse(DOCUMENT)]
+    streamed = [(h.ip, [p.port for p in h.ports], h.incomplete)
+                for h in parser.iter_parse(_chunks(DOCUMENT))]
+    assert whole == streamed == [("10.0.0.1", [22], False), ("10.0.0.2", [80], False)]
+
+
+def test_truncated_output_keeps_complete_hosts_and_marks_the_partial_one():
+    cut = DOCUMENT.index("<service", DOCUMENT.index("10.0.0.2"))
+    hosts = list(NmapParser().iter_parse(_chunks(DOCUMENT[:cut])))
+
+    assert [(h.ip, h.incomplete) for h in hosts] == [("10.0.0.1", False), ("10.0.0.2", True)]
+    assert [p.port for p in hosts[0].ports] == [22]
+    assert NmapParser().parse(DOCUMENT[:cut])[1].incomplete is True
+
+
+def test_truncated_before_an_address_drops_the_partial_host():
+    cut = DOCUMENT.index('<address addr="10.0.0.2"')
+    assert [h.ip for h in NmapParser().iter_parse([DOCUMENT[:cut]])] == ["10.0.0.1"]
+
+
+def test_partial_host_is_yielded_before_a_reader_error():
+    cut = DOCUMENT.index("<ports>", DOCUMENT.index("10.0.0.2"))
+
+    def reader():
+        yield DOCUMENT[:cut]
+        raise OSError("pipe closed")
+
+    seen = []
+    with pytest.raises(OSError):
+        for host in NmapParser().iter_parse(reader()):
+            seen.append((host.ip, host.incomplete))
+    assert seen == [("10.0.0.1", False), ("10.0.0.2", True)]
@@ -0,0 +1,106 @@
+"""
+test_progress.py – Progress tracking from nmap's --stats-every XML output.
+"""
+
+import pytest
+
+from src.nmap_parser import NmapParser
+from src.progress import ScanProgress
+
+# Shape of `nmap -oX - --stats-every 5s -sS 10.0.0.0/30` (nmap 7.94)
+NMAP_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE nmaprun>
+<nmaprun scanner="nmap" args="nmap -oX - --stats-every 5s -sS 10.0.0.0/30" start="1700000000" version="7.94" xmloutputversion="1.05">
+<scaninfo type="syn" protocol="tcp" numservices="1000" services="1-1000"/>
+<verbose level="0"/>
+<debugging level="0"/>
+<taskbegin task="Ping Scan" time="1700000000"/>
+<taskprogress task="Ping Scan" time="1700000005" percent="50.00" remaining="5" etc="1700000010"/>
+<taskend task="Ping Scan" time="1700000008" extrainfo="4 total hosts"/>
+<taskbegin task="SYN Stealth Scan" time="1700000008"/>
+<taskprogress task="SYN Stealth Scan" time="1700000013" percent="62.50" remaining="3" etc="1700000016"/>
+<host starttime="1700000008" endtime="1700000016"><status state="up" reason="echo-reply" reason_ttl="63"/>
+<address addr="10.0.0.1" addrtype="ipv4"/>
+<hostnames>
+</hostnames>
+<ports><port protocol="tcp" portid="22"><state state="open" reason="syn-ack" reason_ttl="63"/><service name="ssh" method="table" conf="3"/></port>
+</ports>
+<times srtt="1021" rttvar="571" to="100000"/>
+</host>
+<taskend task="SYN Stealth Scan" time="1700000016" extrainfo="1000 total ports"/>
+<runstats><finished time="1700000016" timestr="Tue Nov 14 22:13:36 2023" summary="Nmap done at Tue Nov 14 22:13:36 2023; 4 IP addresses (1 host up) scanned in 16.00 seconds" elapsed="16.00" exit="success"/><hosts up="1" down="3" total="4"/>
+</runstats>
+</nmaprun>
+"""
+
+
+def test_taskprogress_drives_percent_task_and_eta():
+    progress = ScanProgress(["10.0.0.0/30"])
+    lines = NMAP_XML.splitlines(keepends=True)
+    cut = next(i for i, line in enumerate(lines) if 'percent="62.50"' in line) + 1
+
+    for line in lines[:cut]:
+        progress.stdout_line(line)
+    assert progress.task == "SYN Stealth Scan"
+    # Ping scan done (10%), SYN scan 62.5% of its 70% share
+    assert progress.percent == pytest.approx(53.75)
+    assert progress.remaining == 3
+
+    for line in lines[cut:]:
+        progress.stdout_line(line)
+    assert progress.hosts_completed == 1
+    assert progress.hosts_up == 1
+    assert progress.open_ports == 1
+    progress.finish(ok=True)
+    assert progress.percent == pytest.approx(100.0)
+
+
+def _task_line(element, task, percent=None, extrainfo=None):
+    extra = f' percent="{percent}" remaining="9"' if percent is not None else ""
+    extra += f' extrainfo="{extrainfo}"' if extrainfo else ""
+    return f'<{element} task="{task}" time="1700000000"{extra}/>\n'
+
+
+def test_finished_ping_scan_does_not_pin_progress_at_100():
+    progress = ScanProgress(["10.0.0.0/24"])
+    for line in (
+        _task_line("taskbegin", "Ping Scan"),
+        _task_line("taskprogress", "Ping Scan", "100.00"),
+        _task_line("taskend", "Ping Scan", extrainfo="256 total hosts"),
+        _task_line("taskbegin", "SYN Stealth Scan"),
+        _task_line("taskprogress", "SYN Stealth Scan", "50.00"),
+    ):
+        progress.stdout_line(line)
+    assert progress.percent == pytest.approx(45.0)
+
+    for line in (
+        _task_line("taskend", "SYN Stealth Scan"),
+        _task_line("taskbegin", "Service scan"),
+        _task_line("taskprogress", "Service scan", "50.00"),
+    ):
+        progress.stdout_line(line)
+    assert progress.percent == pytest.approx(85.0)
+    assert progress.task == "Service scan"
+
+
+def test_hostgroups_add_up_instead_of_restarting():
+    progress = ScanProgress(["10.0.0.0/24"])
+    group = (
+        _task_line("taskbegin", "Ping Scan"),
+        _task_line("taskend", "Ping Scan", extrainfo="128 total hosts"),
+        _task_line("taskbegin", "SYN Stealth Scan"),
+        _task_line("taskprogress", "SYN Stealth Scan", "50.00"),
+    )
+    for line in group:
+        progress.stdout_line(line)
+    assert progress.percent == pytest.approx(22.5)
+
+    for line in (_task_line("taskend", "SYN Stealth Scan"),) + group:
+        progress.stdout_line(line)
+    assert progress.percent == pytest.approx(72.5)
+
+
+def test_parser_skips_progress_elements():
+    hosts = list(NmapParser().iter_parse(NMAP_XML.splitlines(keepends=True)))
+    assert [h.ip for h in hosts] == ["10.0.0.1"]
+    assert hosts[0].ports[0].port == 22
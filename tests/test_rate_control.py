@@ -0,0 +1,65 @@
+"""
+test_rate_control.py – Congestion signals from nmap XML and the AIMD rate.
+"""
+
+from src.rate_control import CongestionMonitor, CongestionReport, RateController
+
+# Host elements as nmap 7.94 writes them with -oX -
+HOST = """<host starttime="1700000000" endtime="1700000012"><status state="up" reason="syn-ack" reason_ttl="63"/>
+<address addr="10.0.0.{n}" addrtype="ipv4"/>
+<hostnames>
+</hostnames>
+<ports><port protocol="tcp" portid="22"><state state="open" reason="syn-ack" reason_ttl="63"/><service name="ssh" method="table" conf="3"/></port>
+</ports>
+<times srtt="{srtt}" rttvar="{rttvar}" to="100000"/>
+</host>
+"""
+TIMED_OUT_HOST = """<host starttime="1700000000" endtime="1700000900" timedout="true"><status state="up" reason="echo-reply" reason_ttl="63"/>
+<address addr="10.0.0.99" addrtype="ipv4"/>
+<hostnames>
+</hostnames>
+<times srtt="2100" rttvar="800" to="100000"/>
+</host>
+"""
+
+
+def _shard_xml(srtts):
+    return "".join(HOST.format(n=i, srtt=s, rttvar=s // 4) for i, s in enumerate(srtts))
+
+
+def _report(xml):
+    monitor = CongestionMonitor()
+    for line in xml.splitlines(keepends=True):
+        monitor.feed(line)
+    return monitor.report()
+
+
+def test_monitor_reads_rtt_and_timeouts_from_nmap_xml():
+    report = _report(_shard_xml([1000, 3000, 2000]) + TIMED_OUT_HOST)
+    assert report == CongestionReport(host_timeouts=1, median_srtt=2050, min_srtt=1000)
+    assert CongestionReport.from_xml(_shard_xml([1000])).median_srtt == 1000
+
+
+def test_clean_shards_keep_or_raise_the_rate():
+    controller = RateController(budget=2000, slots=2)
+    assert controller.record(_report(_shard_xml([1500, 1700, 1600]))) == 1000
+    # A farther but steady network is not congestion
+    assert controller.record(_report(_shard_xml([2800, 3000, 2900]))) == 1000
+
+
+def test_host_timeouts_halve_the_rate():
+    controller = RateController(budget=2000, slots=2)
+    assert controller.record(_report(_shard_xml([1500]) + TIMED_OUT_HOST)) == 500
+
+
+def test_queueing_delay_within_a_shard_halves_the_rate():
+    controller = RateController(budget=2000, slots=2)
+    # First probes see an empty queue, later ones wait behind it
+    assert controller.record(_report(_shard_xml([1200, 14000, 21000, 25000]))) == 500
+
+
+def test_rtt_inflated_against_earlier_shards_halves_the_rate():
+    controller = RateController(budget=2000, slots=2)
+    controller.record(_report(_shard_xml([1500, 1600, 1700])))
+    assert controller.record(_report(_shard_xml([12000, 13000, 14000]))) == 500
+    assert controller.record(_report(_shard_xml([1500, 1600, 1700]))) == 600
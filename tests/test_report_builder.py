@@ -0,0 +1,52 @@
+"""
+test_report_builder.py – Parallel rendering matches serial output byte for byte.
+"""
+
+from src import report_builder
+from src.report_builder import ReportBuilder, render_host_section, render_host_sections
+from src.result_objects import HostResult, PortInfo
+
+
+def _hosts(count):
+    hosts = []
+    for n in range(count):
+        ports = [
+            PortInfo(port=p, protocol="tcp", state="open", service="svc", product="Prod ünï",
+                     version=str(n))
+            for p in range(20, 20 + n % 7)
+        ]
+        hosts.append(HostResult(
+            ip=f"10.0.{n // 256}.{n % 256}",
+            hostname=f"h{n}.example" if n % 3 else "",
+            status="up",
+            os_name="Linux 5.X" if n % 2 else "",
+            os_accuracy=95 if n % 2 else None,
+            ports=ports,
+            scripts={"banner": f"line one\nline {n}"} if n % 5 == 0 else {},
+            incomplete=n % 11 == 0,
+        ))
+    return hosts
+
+
+def test_parallel_sections_are_identical_to_serial(monkeypatch):
+    monkeypatch.setattr(report_builder, "PARALLEL_RENDER_MIN_HOSTS", 10)
+    monkeypatch.setattr(report_builder, "PARALLEL_RENDER_MIN_CHUNK", 7)
+    hosts = _hosts(61)
+
+    serial = "\n".join(render_host_section(h) for h in hosts)
+    chunks = list(render_host_sections(hosts, workers=3))
+    assert len(chunks) > 3
+    assert "\n".join(chunks) == serial
+
+
+def test_parallel_report_is_identical_to_serial(monkeypatch):
+    monkeypatch.setattr(report_builder, "PARALLEL_RENDER_MIN_HOSTS", 10)
+    monkeypatch.setattr(report_builder, "PARALLEL_RENDER_MIN_CHUNK", 7)
+    hosts = _hosts(40)
+    args = (hosts, ["10.0.0.0/24"], [], "nmap -oX - 10.0.0.0/24", "<nmaprun/>")
+
+    builder = ReportBuilder()
+    serial = builder.build_text_report(*args)
+    parallel = builder.build_text_report(*args, render_workers=2)
+    # Only the "Generated" line may differ
+    assert parallel.split("\n", 3)[3] == serial.split("\n", 3)[3]
@@ -0,0 +1,72 @@
+"""
+test_result_index.py – Inverted-index queries over scan results.
+"""
+
+import json
+
+import pytest
+
+from src.result_index import ResultIndex, load_results
+from src.result_objects import HostResult, PortInfo
+from src.targets import TargetSet
+
+
+def _port(port, service, product="", version="", state="open"):
+    return PortInfo(port=port, protocol="tcp", state=state, service=service,
+                    product=product, version=version)
+
+
+HOSTS = [
+    HostResult(ip="10.0.0.1", hostname="", status="up", os_name="Microsoft Windows 10",
+               ports=[_port(445, "microsoft-ds"), _port(3389, "ms-wbt-server")],
+               scripts={"smb-os-discovery": "Windows 10"}),
+    HostResult(ip="10.0.0.2", hostname="", status="up", os_name="Linux 5.X",
+               ports=[_port(445, "netbios-ssn", "Samba smbd", "3.6.25"),
+                      _port(22, "ssh", "OpenSSH", "7.4")]),
+    HostResult(ip="10.0.1.3", hostname="", status="up", os_name="Linux 4.X",
+               ports=[_port(445, "netbios-ssn", "Samba smbd", "4.15.13"),
+                      _port(80, "http", "nginx", "3.6", state="filtered")]),
+    HostResult(ip="10.0.1.4", hostname="", status="down"),
+]
+
+
+def _ips(hosts):
+    return [h.ip for h in hosts]
+
+
+def test_select_intersects_criteria_in_host_order():
+    index = ResultIndex(HOSTS)
+    assert _ips(index.select(port=445)) == ["10.0.0.1", "10.0.0.2", "10.0.1.3"]
+    assert _ips(index.select(port=445, os="linux")) == ["10.0.0.2", "10.0.1.3"]
+    assert _ips(index.select(product="samba", version="3.6")) == ["10.0.0.2"]
+    assert _ips(index.select(service=["SSH", "ms-wbt-server"])) == ["10.0.0.1", "10.0.0.2"]
+    assert _ips(index.select(script="smb-os-discovery")) == ["10.0.0.1"]
+    assert _ips(index.select(port=445, within=TargetSet.from_items(["10.0.1.0/24"]))) == [
+        "10.0.1.3",
+    ]
+    assert _ips(index.select(up_only=True)) == ["10.0.0.1", "10.0.0.2", "10.0.1.3"]
+    assert len(index.select()) == 4
+
+
+def test_port_criteria_must_hold_for_the_same_open_port():
+    index = ResultIndex(HOSTS)
+    # 10.0.0.2 runs Samba on 445 and OpenSSH 7.4 on 22: no single port matches both
+    assert index.select(port=22, product="samba") == []
+    # The filtered nginx 3.6 on 10.0.1.3 is not indexed
+    assert _ips(index.select(version="3.6")) == ["10.0.0.2"]
+    assert [p.port for p in index.matching_ports(HOSTS[1], product="samba")] == [445]
+
+
+def test_count_by_field_and_subset():
+    index = ResultIndex(HOSTS)
+    assert index.count_by("os") == {"windows": 1, "linux": 2, "unknown": 1}
+    assert index.count_by("port", index.select(os="linux")) == {445: 2, 22: 1}
+    with pytest.raises(ValueError):
+        index.count_by("color")
+
+
+def test_load_results_reads_ndjson(tmp_path):
+    path = tmp_path / "hosts.ndjson"
+    path.write_text("".join(json.dumps(h.to_dict()) + "\n" for h in HOSTS), encoding="utf-8")
+    loaded = ResultIndex(load_results(path))
+    assert _ips(loaded.select(product="samba", version="4.15")) == ["10.0.1.3"]
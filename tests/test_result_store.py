@@ -0,0 +1,91 @@
+"""
+test_result_store.py – Host fields survive JSON and the result store; incremental scans.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+from src.enumerator import enumerate_hosts
+from src.nmap_handler import NmapHandler
+from src.result_objects import HostResult, PortInfo
+from src.result_store import ResultStore
+from src.targets import TargetSet
+
+FAKE_NMAP = f"{sys.executable} {Path(__file__).resolve().parents[1] / 'benchmarks' / 'fake-nmap'}"
+
+
+def _host():
+    return HostResult(
+        ip="10.0.0.7",
+        hostname="db.example",
+        status="up",
+        ports=[PortInfo(port=3306, protocol="tcp", state="open", service="mysql")],
+        scripts={"banner": "5.7.44-log"},
+        regex_parsed={"version": ["5.7.44"]},
+        incomplete=True,
+    )
+
+
+def test_json_round_trip_keeps_regex_hits_and_incomplete():
+    restored = HostResult.from_dict(_host().to_dict())
+    assert restored.regex_parsed == {"version": ["5.7.44"]}
+    assert restored.incomplete is True
+
+
+def test_store_round_trip_keeps_regex_hits_and_incomplete(tmp_path):
+    with ResultStore(str(tmp_path / "scans.db")) as store:
+        store.record_scan([_host()], TargetSet.from_items(["10.0.0.0/29"]), "3306", ["-sS"])
+        (restored,) = store.load_hosts(None)
+    assert restored.regex_parsed == {"version": ["5.7.44"]}
+    assert restored.incomplete is True
+
+
+def test_store_from_older_version_gains_new_columns(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE hosts (id INTEGER PRIMARY KEY AUTOINCREMENT, scan_id INTEGER NOT NULL, "
+        "profile TEXT NOT NULL, scanned_at REAL NOT NULL, ip TEXT NOT NULL, hostname TEXT, "
+        "status TEXT, os_name TEXT, os_accuracy INTEGER, scripts TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO hosts (scan_id, profile, scanned_at, ip, status, scripts) "
+        "VALUES (1, 'p', 1.0, '10.0.0.1', 'up', '{}')"
+    )
+    conn.commit()
+    conn.close()
+
+    with ResultStore(path) as store:
+        (old,) = store.load_hosts("p")
+        store.record_scan([_host()], TargetSet.from_items(["10.0.0.7"]), None, [])
+        assert {h.ip: h.incomplete for h in store.load_hosts(None)} == {
+            "10.0.0.1": False, "10.0.0.7": True,
+        }
+    assert old.regex_parsed == {}
+
+
+def _scan(store, targets, ports="22", max_age=3600):
+    handler = NmapHandler(targets, ports=ports, nmap_binary=f"{FAKE_NMAP} --fake-up-ratio 1")
+    return enumerate_hosts(handler, store=store, max_age=max_age)
+
+
+def test_incremental_scan_skips_fresh_addresses(tmp_path):
+    with ResultStore(str(tmp_path / "scans.db")) as store:
+        _scan(store, ["127.0.0.0/30"])
+        hosts, _, command = _scan(store, ["127.0.0.0/29"])
+
+    assert "127.0.0.4/30" in command and "127.0.0.0/30" not in command
+    assert sorted(h.ip for h in hosts) == [f"127.0.0.{n}" for n in range(8)]
+
+
+def test_incremental_scan_only_reuses_the_same_profile(tmp_path):
+    with ResultStore(str(tmp_path / "scans.db")) as store:
+        _scan(store, ["127.0.0.0/30"])
+        _, _, other_ports = _scan(store, ["127.0.0.0/30"], ports="80")
+        _, _, expired = _scan(store, ["127.0.0.0/30"], max_age=0)
+        _, _, fresh = _scan(store, ["127.0.0.0/30"])
+
+    assert "127.0.0.0/30" in other_ports
+    assert "127.0.0.0/30" in expired
+    assert "127.0.0.0/30" not in fresh
@@ -0,0 +1,62 @@
+"""
+test_targets.py – TargetSet algebra, specs and sharding.
+"""
+
+import pytest
+
+from src.nmap_handler import NmapHandler
+from src.targets import TargetSet, partition_targets
+
+
+def _set(*items):
+    return TargetSet.from_items(items)
+
+
+def test_union_merges_overlapping_and_adjacent_ranges():
+    merged = _set("10.0.0.0/25", "10.0.0.100", "host.example")
+    merged |= _set("10.0.0.128/25", "HOST.example")
+    assert merged.intervals() == _set("10.0.0.0/24").intervals()
+    assert merged.hostnames == ("host.example",)
+    assert len(merged) == 257
+
+
+def test_difference_splits_intervals_and_drops_hostnames():
+    left = _set("10.0.0.0/24", "a.example", "b.example")
+    left -= _set("10.0.0.64/26", "10.0.0.1", "a.example")
+    assert left.to_specs() == [
+        "10.0.0.0", "10.0.0.2/31", "10.0.0.4/30", "10.0.0.8/29", "10.0.0.16/28",
+        "10.0.0.32/27", "10.0.0.128/25", "b.example",
+    ]
+    assert "10.0.0.1" not in left and "10.0.0.200" in left
+    assert not (_set("10.0.0.0/30") - _set("10.0.0.0/24"))
+
+
+def test_to_specs_uses_the_fewest_cidr_blocks():
+    assert _set("10.0.0.1", "10.0.0.2", "10.0.0.3").to_specs() == ["10.0.0.1", "10.0.0.2/31"]
+    assert _set("0.0.0.0/0").to_specs() == ["0.0.0.0/0"]
+
+
+def test_chunks_by_size_and_prefix():
+    targets = _set("10.0.0.250/31", "10.0.0.252/30", "10.0.1.0/30", "host.example")
+    by_size = [c.to_specs() for c in targets.chunks(size=4)]
+    assert by_size == [["10.0.0.250/31", "10.0.0.252/31"], ["10.0.0.254/31", "10.0.1.0/31"],
+                       ["10.0.1.2/31"], ["host.example"]]
+    by_prefix = [c.to_specs() for c in targets.chunks(prefix=24)]
+    assert by_prefix == [["10.0.0.250/31", "10.0.0.252/30"], ["10.0.1.0/30"], ["host.example"]]
+    assert [c.to_specs() for c in _set("10.0.0.0/30").chunks(prefix=0)] == [["10.0.0.0/30"]]
+    assert [len(c) for c in _set("10.0.0.0/30").chunks(prefix=32)] == [1, 1, 1, 1]
+
+
+@pytest.mark.parametrize("kwargs", [{"size": 0}, {"prefix": 33}, {"prefix": -1}])
+def test_chunks_reject_out_of_range_sizes(kwargs):
+    with pytest.raises(ValueError):
+        list(_set("10.0.0.0/24").chunks(**kwargs))
+
+
+def test_ipv6_targets_are_left_to_nmap_in_one_shard():
+    assert partition_targets(["10.0.0.0/30,::1", "host.example"]) == (
+        ["10.0.0.0/30", "host.example"], ["::1"],
+    )
+    handler = NmapHandler(["10.0.0.0/29", "::1", "2001:db8::/126"], shard_size=4)
+    assert handler.plan_shards() == [["10.0.0.0/30"], ["10.0.0.4/30"], ["::1", "2001:db8::/126"]]
+    assert NmapHandler(["::1"], shard_prefix=24).plan_shards() == [["::1"]]
@@ -0,0 +1,59 @@
+"""
+test_windows_enum.py – SMB enumeration overlaps probes across hosts, streamed or batched.
+"""
+
+import asyncio
+import time
+
+from src.result_objects import HostResult, PortInfo
+from src.windows_enum import WindowsEnumerator
+
+PROBE_DELAY = 0.2
+
+
+class SlowProbeEnumerator(WindowsEnumerator):
+    """Probes that take PROBE_DELAY seconds and never touch the network."""
+
+    async def _probe_smb_port_async(self, ip, port):
+        await asyncio.sleep(PROBE_DELAY)
+        return ("reachable (no immediate banner)", "")
+
+
+def _host(n, windows=True):
+    return HostResult(
+        ip=f"10.0.0.{n}",
+        hostname="",
+        status="up",
+        os_name="Microsoft Windows 10" if windows else "Linux 5.X",
+        ports=[PortInfo(port=445, protocol="tcp", state="open")],
+    )
+
+
+def test_stream_overlaps_probes_and_keeps_arrival_order():
+    hosts = [_host(n, windows=n != 3) for n in range(1, 9)]
+    enumerator = SlowProbeEnumerator()
+
+    started = time.monotonic()
+    streamed = list(enumerator.enumerate_stream(iter(hosts)))
+    elapsed = time.monotonic() - started
+
+    assert [h.ip for h in streamed] == [h.ip for h in hosts]
+    assert elapsed < PROBE_DELAY * 3
+    assert enumerator.probes_run == 7
+    assert "sonartrace-windows-enum" not in streamed[2].scripts
+    assert "10.0.0.1:445" in streamed[0].scripts["sonartrace-windows-enum"]
+
+
+def test_batch_inside_a_running_loop_still_runs_concurrently():
+    hosts = [_host(n) for n in range(1, 9)]
+    enumerator = SlowProbeEnumerator()
+
+    async def caller():
+        started = time.monotonic()
+        enumerator.enumerate(hosts)
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(caller())
+    assert elapsed < PROBE_DELAY * 3
+    assert enumerator.probes_run == 8
+    assert all("sonartrace-windows-enum" in h.scripts for h in hosts)
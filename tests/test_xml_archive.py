@@ -0,0 +1,64 @@
+"""
+test_xml_archive.py – Per-host lookups in .sxa archives.
+"""
+
+from src.xml_archive import XmlArchive, XmlArchiveWriter, index_path
+
+
+def _host(ip, port):
+    return (
+        f'<host><status state="up"/><address addr="{ip}" addrtype="ipv4"/>'
+        f'<ports><port protocol="tcp" portid="{port}"/></ports></host>'
+    )
+
+
+def _document(hosts):
+    return '<?xml version="1.0"?>\n<nmaprun>\n' + "\n".join(hosts) + "\n</nmaprun>\n"
+
+
+def _write(path, texts, block_size=64):
+    with XmlArchiveWriter(path, block_size=block_size) as writer:
+        for text in texts:
+            # Small, uneven writes split tags across calls and hosts across blocks
+            for i in range(0, len(text), 13):
+                writer.write(text[i:i + 13])
+
+
+def test_host_lookup_reads_back_every_element(tmp_path):
+    path = tmp_path / "raw.sxa"
+    hosts = [_host(f"10.0.{n // 256}.{n % 256}", 80 + n) for n in range(300, 0, -1)]
+    document = _document(hosts)
+    _write(path, [document])
+
+    assert index_path(path).exists()
+    with XmlArchive(path) as archive:
+        assert len(archive) == 300
+        assert archive.text() == document
+        assert archive.host_xml("10.0.0.7") == [_host("10.0.0.7", 87)]
+        assert archive.host_xml("10.0.1.44") == [_host("10.0.1.44", 380)]
+        assert archive.host_xml("10.0.0.0") == []
+        assert archive.host_xml("192.168.1.1") == []
+        assert list(archive.addresses())[:2] == ["10.0.0.1", "10.0.0.2"]
+
+
+def test_host_reported_by_several_documents_keeps_archive_order(tmp_path):
+    path = tmp_path / "staged.sxa"
+    _write(path, [
+        _document([_host("10.0.0.2", 22), _host("10.0.0.1", 22)]),
+        _document([_host("10.0.0.2", 443)]),
+    ])
+
+    with XmlArchive(path) as archive:
+        assert archive.host_xml("10.0.0.2") == [_host("10.0.0.2", 22), _host("10.0.0.2", 443)]
+        assert list(archive.addresses()) == ["10.0.0.1", "10.0.0.2"]
+
+
+def test_cut_off_host_is_still_indexed(tmp_path):
+    path = tmp_path / "cut.sxa"
+    partial = _host("10.0.0.9", 80)[:-30]
+    truncated = _document([_host("10.0.0.1", 22)])[:-11] + "\n" + partial
+    _write(path, [truncated])
+
+    with XmlArchive(path) as archive:
+        assert archive.text() == truncated
+        assert archive.host_xml("10.0.0.9") == [partial]